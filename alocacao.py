@@ -0,0 +1,145 @@
+# alocacao.py
+#
+# Reaproveitamento de temporários (opção --alocar do main.py).
+#
+# O gerador de código cria um temporário novo (t0, t1, ...) para cada
+# subexpressão e cada literal, sem nunca reaproveitar nenhum. Aqui, para
+# cada unidade do código (corpo de função ou trecho fora de funções):
+#
+#   1. monta-se o grafo de fluxo de controle e calcula-se a vivacidade dos
+#      temporários (fluxo.py);
+#   2. cada temporário recebe um intervalo de vida na ordem linear do
+#      código;
+#   3. uma alocação por varredura linear (linear scan) atribui a cada
+#      intervalo uma posição (slot) livre, reaproveitando as posições
+#      dos temporários que já morreram;
+#   4. os temporários são renomeados para t<slot>.
+#
+# Pontos do intervalo: a leitura na instrução i é o ponto 2*i e a escrita
+# é o ponto 2*i+1. Assim, em "t5 = t3 + t4", se t3 morre ali, t5 pode
+# ocupar a posição de t3 (a instrução lê antes de escrever).
+#
+# Depois da alocação um mesmo temporário pode ser escrito mais de uma
+# vez; por isso ela deve ser o último passo (depois de otimizador.py).
+
+
+import heapq
+
+from instrucoes import *
+from fluxo import construir_cfg, definicao, unidades, usos, vivacidade
+from relatorio import RESUMO, SAIDA_PADRAO
+
+
+def intervalos_de_vida(codigo, inicio, fim):
+    """
+    Intervalos de vida dos temporários do trecho [inicio, fim).
+
+    Retorna:
+        dicionário temporário -> [primeiro ponto, último ponto]
+    """
+    classes = codigo.classes
+    blocos = construir_cfg(codigo, inicio, fim)
+    vivos_entrada, vivos_saida = vivacidade(codigo, blocos, TEMP)
+
+    intervalos = {}
+
+    def estender(t, ponto):
+        intervalo = intervalos.get(t)
+        if intervalo is None:
+            intervalos[t] = [ponto, ponto]
+        elif ponto < intervalo[0]:
+            intervalo[0] = ponto
+        elif ponto > intervalo[1]:
+            intervalo[1] = ponto
+
+    for b, bloco in enumerate(blocos):
+        for t in vivos_entrada[b]:
+            estender(t, 2 * bloco.inicio)
+        for t in vivos_saida[b]:
+            estender(t, 2 * bloco.fim)
+        for i in range(bloco.inicio, bloco.fim):
+            q = codigo[i]
+            for u in usos(q):
+                if classes[u] == TEMP:
+                    estender(u, 2 * i)
+            d = definicao(q)
+            if d != NENHUM and classes[d] == TEMP:
+                estender(d, 2 * i + 1)
+
+    return intervalos
+
+
+def varredura_linear(intervalos):
+    """
+    Alocação por varredura linear: percorre os intervalos em ordem de
+    início e dá a cada um a menor posição livre, liberando as posições
+    dos intervalos que já terminaram.
+
+    Retorna:
+        (dicionário temporário -> posição, número de posições usadas)
+    """
+    posicao = {}
+    ativos = []     # heap de (fim do intervalo, posição)
+    livres = []     # heap de posições livres
+    usadas = 0
+
+    for t, (comeco, final) in sorted(intervalos.items(), key=lambda item: item[1][0]):
+        while ativos and ativos[0][0] < comeco:
+            heapq.heappush(livres, heapq.heappop(ativos)[1])
+        if livres:
+            p = heapq.heappop(livres)
+        else:
+            p = usadas
+            usadas += 1
+        posicao[t] = p
+        heapq.heappush(ativos, (final, p))
+
+    return posicao, usadas
+
+
+def alocar_temporarios(codigo):
+    """
+    Renomeia os temporários de cada unidade do código para t0 .. tK-1,
+    reaproveitando os que já morreram.
+
+    Retorna:
+        (temporários antes, temporários depois, dicionário unidade -> K),
+        em que a unidade é o nome da função (ou None fora de funções)
+    """
+    classes = codigo.classes
+    antes = {op for q in codigo for op in (q.dest, q.arg1, q.arg2)
+             if op != NENHUM and classes[op] == TEMP}
+
+    por_unidade = {}
+    for nome, inicio, fim in unidades(codigo):
+        posicao, usadas = varredura_linear(intervalos_de_vida(codigo, inicio, fim))
+        if not usadas:
+            continue
+        por_unidade[nome] = max(usadas, por_unidade.get(nome, 0))
+
+        novo = {t: codigo.operando(TEMP, f"t{p}") for t, p in posicao.items()}
+        for i in range(inicio, fim):
+            q = codigo[i]
+            if q.dest in novo:
+                q.dest = novo[q.dest]
+            if q.op in (OP_ROTULO, OP_GOTO, OP_CALL):
+                continue
+            if q.arg1 in novo:
+                q.arg1 = novo[q.arg1]
+            if q.arg2 in novo and q.op != OP_SE_FALSO:
+                q.arg2 = novo[q.arg2]
+
+    return len(antes), max(por_unidade.values(), default=0), por_unidade
+
+
+def imprimir_alocacao(antes, depois, por_unidade, relatorio=SAIDA_PADRAO):
+    """Registra o resumo da alocação de temporários."""
+    if not relatorio.ativo(RESUMO):
+        return
+    linhas = ["\n=== Alocação de temporários (--alocar) ==="]
+    for nome, k in por_unidade.items():
+        rotulo = nome if nome is not None else "(fora de funções)"
+        linhas.append(f"{rotulo}: {k} temporário(s)")
+    linhas.append(f"Total: {antes} -> {depois} temporários distintos")
+    relatorio.registrar(RESUMO, "alocacao", "\n".join(linhas), antes=antes, depois=depois,
+                        por_funcao={str(nome): k for nome, k in por_unidade.items()})
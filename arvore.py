@@ -0,0 +1,439 @@
+# arvore.py
+#
+# Árvore sintática abstrata (AST) da linguagem ConvCC-2025-2.
+#
+# A árvore é construída pelo analisador sintático LL(1) durante a sua única
+# passada sobre os tokens (ver sintatico.analisador_sintatico com
+# construir_ast=True) e depois percorrida pelo semântico e pelo gerador de
+# código intermediário, que assim não precisam reescanear a lista de tokens.
+#
+# - Comandos são representados pelas classes abaixo (com __slots__).
+# - Expressões são representadas diretamente por semantico.ExprNode, com dois
+#   atributos extras: 'tok' (índice do token principal do nó) e 'fim'
+#   (índice do último token da subexpressão, usado nas mensagens de erro).
+# - Posições são sempre índices na lista de tokens (tokens[no.tok].l/.c).
+
+
+from semantico import ExprNode
+
+
+class No:
+    """Classe base dos nós de comando da AST."""
+    __slots__ = ()
+
+    def __repr__(self):
+        campos = ", ".join(f"{nome}={getattr(self, nome)!r}" for nome in self.__slots__)
+        return f"{type(self).__name__}({campos})"
+
+
+class Programa(No):
+    """PROGRAM -> FUNCLIST | STATEMENT | &"""
+    __slots__ = ("funcoes", "comandos")
+
+    def __init__(self, funcoes, comandos):
+        self.funcoes = funcoes      # lista de FuncDef
+        self.comandos = comandos    # lista de comandos (programa sem funções)
+
+
+class FuncDef(No):
+    """def ident ( PARAMLIST ) { STATELIST }"""
+    __slots__ = ("tok", "params", "corpo", "escopo")
+
+    def __init__(self, tok, params, corpo):
+        self.tok = tok              # índice do ident com o nome da função
+        self.params = params        # lista de (tipo, índice do ident)
+        self.corpo = corpo          # Bloco
+        self.escopo = None          # Escopo da função (preenchido no semântico)
+
+
+class Bloco(No):
+    """{ STATELIST }"""
+    __slots__ = ("tok", "comandos", "escopo")
+
+    def __init__(self, tok, comandos):
+        self.tok = tok              # índice do '{'
+        self.comandos = comandos
+        self.escopo = None          # Escopo do bloco (preenchido no semântico)
+
+
+class VarDecl(No):
+    """TIPO ident CONSTANTE"""
+    __slots__ = ("tipo", "tok", "dims")
+
+    def __init__(self, tipo, tok, dims):
+        self.tipo = tipo            # 'int', 'float' ou 'string'
+        self.tok = tok              # índice do ident
+        self.dims = dims            # índices dos const_inteiro das dimensões
+
+
+class Atrib(No):
+    """LVALUE = EXPRESSION | LVALUE = ALLOCEXPRESSION"""
+    __slots__ = ("tok", "indices", "expr", "simbolo")
+
+    def __init__(self, tok, indices, expr):
+        self.tok = tok              # índice do ident do lado esquerdo
+        self.indices = indices      # ExprNode de cada [ NUMEXPRESSION ]
+        self.expr = expr            # ExprNode do lado direito
+        self.simbolo = None         # SimboloSemantico do alvo (preenchido no semântico)
+
+
+class Print(No):
+    """print EXPRESSION"""
+    __slots__ = ("tok", "expr")
+
+    def __init__(self, tok, expr):
+        self.tok = tok
+        self.expr = expr
+
+
+class Read(No):
+    """read LVALUE"""
+    __slots__ = ("tok", "alvo", "indices")
+
+    def __init__(self, tok, alvo, indices):
+        self.tok = tok
+        self.alvo = alvo            # índice do ident lido
+        self.indices = indices
+
+
+class Return(No):
+    """return"""
+    __slots__ = ("tok",)
+
+    def __init__(self, tok):
+        self.tok = tok
+
+
+class If(No):
+    """if ( EXPRESSION ) STATEMENT [else STATEMENT]"""
+    __slots__ = ("tok", "cond", "entao", "senao")
+
+    def __init__(self, tok, cond, entao, senao):
+        self.tok = tok
+        self.cond = cond
+        self.entao = entao
+        self.senao = senao          # None quando não há 'else'
+
+
+class For(No):
+    """for ( ATRIBSTAT ; EXPRESSION ; ATRIBSTAT ) STATEMENT"""
+    __slots__ = ("tok", "init", "cond", "passo", "corpo")
+
+    def __init__(self, tok, init, cond, passo, corpo):
+        self.tok = tok
+        self.init = init            # Atrib
+        self.cond = cond            # ExprNode
+        self.passo = passo          # Atrib
+        self.corpo = corpo
+
+
+class Break(No):
+    """break"""
+    __slots__ = ("tok",)
+
+    def __init__(self, tok):
+        self.tok = tok
+
+
+class Vazio(No):
+    """Comando vazio: ;"""
+    __slots__ = ("tok",)
+
+    def __init__(self, tok):
+        self.tok = tok
+
+
+# ----------------------------------------------------------------------
+# Construção da AST a partir das reduções do analisador LL(1)
+# ----------------------------------------------------------------------
+#
+# O analisador sintático chama a ação r_<NT>(filhos, ultimo) sempre que termina
+# de reconhecer um não-terminal NT (NT' corresponde a r_<NT>_linha):
+#   - filhos : valores dos símbolos do lado direito da produção, em ordem
+#              (terminal -> índice do token; não-terminal -> valor da sua redução)
+#   - ultimo : índice do último token consumido
+#
+# As listas da gramática (STATELIST, PARAMLIST', NUMEXPRESSION', ...) são
+# recursivas à direita; para não copiar listas a cada nível, os não-terminais
+# "linha" acrescentam o elemento no fim (ordem invertida) e quem usa a lista
+# a inverte uma única vez.
+
+class ConstrutorAST:
+    """
+    Conjunto de ações de redução que montam a AST.
+
+    Parâmetros:
+        tokens          : lista de tokens (para tipos, valores e posições)
+        tabela_simbolos : tabela léxica (nome de cada ident)
+    """
+
+    def __init__(self, tokens, tabela_simbolos):
+        self.tokens = tokens
+        self.tabela_simbolos = tabela_simbolos
+
+    def acoes(self):
+        """Dicionário nome do não-terminal -> função de redução."""
+        acoes = {}
+        for nome in dir(self):
+            if nome.startswith("r_"):
+                acoes[nome[2:].replace("_linha", "'")] = getattr(self, nome)
+        return acoes
+
+    # ---------------- auxiliares ----------------
+
+    def _nome(self, i):
+        return self.tabela_simbolos[self.tokens[i].valor][0]
+
+    def _binario(self, op_idx, esquerda, direita):
+        op = self.tokens[op_idx].tipo
+        node = ExprNode(op, esquerda, direita, valor=op)
+        node.tok = op_idx
+        node.fim = direita.fim
+        return node
+
+    @staticmethod
+    def _linha(filhos):
+        # X' -> sep A X' | &   (ordem invertida)
+        if not filhos:
+            return []
+        resto = filhos[-1]
+        resto.append(filhos[-2])
+        return resto
+
+    @staticmethod
+    def _lista(filhos):
+        # X -> A X' | &
+        if not filhos:
+            return []
+        resto = filhos[1]
+        resto.append(filhos[0])
+        resto.reverse()
+        return resto
+
+    # ---------------- programa e funções ----------------
+
+    def r_PROGRAM(self, filhos, ultimo):
+        if not filhos:
+            return Programa([], [])
+        if isinstance(filhos[0], list):
+            return Programa(filhos[0], [])
+        return Programa([], [filhos[0]])
+
+    def r_FUNCLIST(self, filhos, ultimo):
+        return self._lista(filhos)
+
+    def r_FUNCLIST_linha(self, filhos, ultimo):
+        return self._linha(filhos)
+
+    def r_FUNCDEF(self, filhos, ultimo):
+        _, ident, _, params, _, chave, comandos, _ = filhos
+        comandos.reverse()
+        return FuncDef(ident, params, Bloco(chave, comandos))
+
+    def r_PARAMLIST(self, filhos, ultimo):
+        return self._lista(filhos)
+
+    def r_PARAMLIST_linha(self, filhos, ultimo):
+        return self._linha(filhos)
+
+    def r_PARAMETRO(self, filhos, ultimo):
+        return (self.tokens[filhos[0]].tipo, filhos[1])
+
+    # ---------------- comandos ----------------
+
+    def r_STATELIST(self, filhos, ultimo):
+        # STATELIST -> STATEMENT STATELIST | &  (ordem invertida)
+        if not filhos:
+            return []
+        resto = filhos[1]
+        resto.append(filhos[0])
+        return resto
+
+    def r_STATEMENT(self, filhos, ultimo):
+        primeiro = filhos[0]
+        if len(filhos) == 3:
+            # { STATELIST }
+            comandos = filhos[1]
+            comandos.reverse()
+            return Bloco(primeiro, comandos)
+        if isinstance(primeiro, int):
+            # break ;   ou   ;
+            if self.tokens[primeiro].tipo == "break":
+                return Break(primeiro)
+            return Vazio(primeiro)
+        return primeiro
+
+    def r_VARDECL(self, filhos, ultimo):
+        dims = filhos[2]
+        dims.reverse()
+        return VarDecl(self.tokens[filhos[0]].tipo, filhos[1], dims)
+
+    def r_CONSTANTE(self, filhos, ultimo):
+        # CONSTANTE -> [ const_inteiro ] CONSTANTE | &  (ordem invertida)
+        if not filhos:
+            return []
+        resto = filhos[3]
+        resto.append(filhos[1])
+        return resto
+
+    def r_ATRIBSTAT(self, filhos, ultimo):
+        ident, indices = filhos[0]
+        return Atrib(ident, indices, filhos[2])
+
+    def r_ATRIBSTAT_linha(self, filhos, ultimo):
+        return filhos[0]
+
+    def r_PRINTSTAT(self, filhos, ultimo):
+        return Print(filhos[0], filhos[1])
+
+    def r_READSTAT(self, filhos, ultimo):
+        ident, indices = filhos[1]
+        return Read(filhos[0], ident, indices)
+
+    def r_RETURNSTAT(self, filhos, ultimo):
+        return Return(filhos[0])
+
+    def r_IFSTAT(self, filhos, ultimo):
+        return If(filhos[0], filhos[2], filhos[4], filhos[5])
+
+    def r_IFSTAT_linha(self, filhos, ultimo):
+        return filhos[1] if filhos else None
+
+    def r_FORSTAT(self, filhos, ultimo):
+        return For(filhos[0], filhos[2], filhos[4], filhos[6], filhos[8])
+
+    def r_LVALUE(self, filhos, ultimo):
+        indices = filhos[1]
+        indices.reverse()
+        return (filhos[0], indices)
+
+    def r_LVALUE_linha(self, filhos, ultimo):
+        # LVALUE' -> [ NUMEXPRESSION ] LVALUE' | &  (ordem invertida)
+        if not filhos:
+            return []
+        resto = filhos[3]
+        resto.append(filhos[1])
+        return resto
+
+    # ---------------- alocação ----------------
+
+    def r_ALLOCEXPRESSION(self, filhos, ultimo):
+        node = ExprNode("new", None, None, valor=filhos[1])
+        node.args = [filhos[3]] + filhos[5]
+        node.tok = filhos[0]
+        node.fim = ultimo
+        return node
+
+    def r_ALLOCEXPRESSION_linha(self, filhos, ultimo):
+        return [filhos[1]] if filhos else []
+
+    def r_TIPO(self, filhos, ultimo):
+        return self.tokens[filhos[0]].tipo
+
+    # ---------------- expressões ----------------
+
+    def r_EXPRESSION(self, filhos, ultimo):
+        node, comparacao = filhos
+        if comparacao is not None:
+            op_idx, direita = comparacao
+            node = self._binario(op_idx, node, direita)
+        return node
+
+    def r_COMPARACAO(self, filhos, ultimo):
+        return (filhos[0], filhos[1]) if filhos else None
+
+    def r_NUMEXPRESSION(self, filhos, ultimo):
+        node, resto = filhos
+        for op_idx, direita in reversed(resto):
+            node = self._binario(op_idx, node, direita)
+        return node
+
+    def r_NUMEXPRESSION_linha(self, filhos, ultimo):
+        # (+|-) TERM NUMEXPRESSION' | &  (ordem invertida)
+        if not filhos:
+            return []
+        resto = filhos[2]
+        resto.append((filhos[0], filhos[1]))
+        return resto
+
+    def r_TERM(self, filhos, ultimo):
+        return self.r_NUMEXPRESSION(filhos, ultimo)
+
+    def r_TERM_linha(self, filhos, ultimo):
+        return self.r_NUMEXPRESSION_linha(filhos, ultimo)
+
+    def r_UNARYEXPR(self, filhos, ultimo):
+        op_idx, factor = filhos
+        if op_idx is None:
+            return factor
+        op = self.tokens[op_idx].tipo
+        node = ExprNode("unary" + op, factor, None, valor=op)
+        node.tok = op_idx
+        node.fim = factor.fim
+        return node
+
+    def r_OPERADORES(self, filhos, ultimo):
+        return filhos[0] if filhos else None
+
+    def r_FACTOR(self, filhos, ultimo):
+        i = filhos[0]
+        if len(filhos) == 3:
+            # ( NUMEXPRESSION )
+            node = filhos[1]
+            node.fim = ultimo
+            return node
+
+        if len(filhos) == 2:
+            # ident CHAMADA
+            nome = self._nome(i)
+            chamada = filhos[1]
+            if isinstance(chamada, tuple):
+                node = ExprNode("call", None, None, valor=nome)
+                node.args = chamada[1]
+            else:
+                chamada.reverse()
+                node = ExprNode("id", None, None, valor=nome)
+                node.indices = chamada
+            node.tok = i
+            node.fim = ultimo
+            return node
+
+        tok = self.tokens[i]
+        if tok.tipo == "const_inteiro":
+            node = ExprNode("int", None, None, valor=tok.valor)
+        elif tok.tipo == "const_float":
+            node = ExprNode("float", None, None, valor=tok.valor)
+        elif tok.tipo == "const_string":
+            node = ExprNode("string", None, None, valor=tok.valor)
+        else:
+            node = ExprNode("null", None, None, valor="null")
+        node.tok = i
+        node.fim = i
+        return node
+
+    def r_CHAMADA(self, filhos, ultimo):
+        return filhos[0]
+
+    def r_FUNCCALL(self, filhos, ultimo):
+        return ("call", filhos[1])
+
+    def r_PARAMLISTCALL(self, filhos, ultimo):
+        if not filhos:
+            return []
+        resto = filhos[1]
+        resto.append(self._argumento(filhos[0]))
+        resto.reverse()
+        return resto
+
+    def r_PARAMLISTCALL_linha(self, filhos, ultimo):
+        if not filhos:
+            return []
+        resto = filhos[2]
+        resto.append(self._argumento(filhos[1]))
+        return resto
+
+    def _argumento(self, i):
+        node = ExprNode("id", None, None, valor=self._nome(i))
+        node.tok = i
+        node.fim = i
+        return node
@@ -0,0 +1,197 @@
+# bench_expressoes.py
+#
+# Compara as versões com pilha explícita e as versões recursivas de:
+#
+#   - semantico.parse_expression     x semantico.parse_expression_recursiva
+#   - intermediario.gerar_expr       x intermediario.gerar_expr_recursiva
+#   - semantico.texto_preordem       x semantico.texto_preordem_recursivo
+#
+# em expressões de três formatos, de tamanhos crescentes:
+#
+#   profundo : parênteses aninhados, ((((x + 1))))
+#   largo    : cadeia de operadores, x + y * 2 - x ...
+#   chamadas : chamadas aninhadas, f(f(f(x)))
+#
+# Para cada expressão, confere que as duas versões produzem a mesma
+# árvore (texto em pré-ordem) e o mesmo código de 3 endereços, e mostra o
+# menor tempo (ms) de cada uma. Quando a versão recursiva passa do limite
+# de recursão do Python, a coluna mostra "recursão".
+#
+# Uso:
+#   python bench_expressoes.py
+#   python bench_expressoes.py --formato profundo --tamanhos 100,1000,10000
+#
+# Termina com código 1 se alguma expressão deu resultados diferentes.
+
+
+import argparse
+import math
+import sys
+import time
+
+from lexico import analisar
+from instrucoes import CodigoIntermediario
+from intermediario import gerar_expr, gerar_expr_recursiva
+from semantico import (
+    Escopo, declara_funcao, declara_variavel,
+    parse_expression, parse_expression_recursiva,
+    texto_preordem, texto_preordem_recursivo,
+)
+
+
+# Tamanhos percorridos por formato (padrão)
+FORMATOS = {
+    "profundo": (10, 100, 1000, 5000),
+    "largo": (10, 100, 1000, 5000),
+    "chamadas": (10, 100, 500, 2000),
+}
+
+# Declarações visíveis às expressões: int x, int y e a função f
+DECLARACOES = "x y f"
+
+
+def texto_expressao(formato, tamanho):
+    """Texto de uma expressão do 'formato' com 'tamanho' níveis ou termos."""
+    if formato == "profundo":
+        return "(" * tamanho + "x + 1" + ")" * tamanho
+    if formato == "largo":
+        operadores = "+*-"
+        termos = ["x"]
+        for k in range(1, tamanho):
+            termos.append(operadores[k % 3])
+            termos.append("y" if k % 2 else "2")
+        return " ".join(termos)
+    return "f(" * tamanho + "x" + ")" * tamanho
+
+
+def preparar(texto):
+    """
+    Tokens da expressão 'texto' (sem o ';' final) e o escopo global com
+    as declarações de DECLARACOES.
+    """
+    tokens, tabela_simbolos = analisar(f"{DECLARACOES} {texto} ;")
+    tokens = list(tokens)
+    global_ = Escopo("global", None, "global")
+    pilha_escopos = [global_]
+    x, y, f = tokens[:3]
+    declara_variavel("x", "int", x, pilha_escopos)
+    declara_variavel("y", "int", y, pilha_escopos)
+    declara_funcao("f", f, pilha_escopos)
+    return tokens[3:], tabela_simbolos, global_
+
+
+def cronometrar(funcao, repeticoes):
+    """
+    Menor tempo (s) de 'repeticoes' chamadas de funcao() e o último
+    resultado, ou (None, None) se funcao passou do limite de recursão.
+    """
+    melhor = math.inf
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        try:
+            resultado = funcao()
+        except RecursionError:
+            return None, None
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def medir(formato, tamanho, repeticoes):
+    """
+    Mede as seis funções numa expressão.
+
+    Retorna:
+        (tempos, iguais): tempos é a lista (iterativa, recursiva) de cada
+        etapa (parse, geração, pré-ordem), com None para recursão
+        excedida; iguais é False se as versões divergiram
+    """
+    tokens, tabela_simbolos, escopo = preparar(texto_expressao(formato, tamanho))
+    fim = len(tokens) - 1
+
+    def analisar_com(parse):
+        def executar():
+            # As ligações dos tokens aos símbolos ficariam da medição anterior
+            escopo.resolucao.ligacoes.clear()
+            return parse(tokens, 0, tabela_simbolos, escopo, fim)[0]
+        return executar
+
+    def gerar_com(gerar):
+        def executar():
+            codigo = CodigoIntermediario()
+            gerar(arvore, codigo)
+            return codigo.linhas()
+        return executar
+
+    def texto_com(texto):
+        return lambda: texto(arvore)
+
+    tempos = []
+    arvores = []
+    for parse in (parse_expression, parse_expression_recursiva):
+        tempo, resultado = cronometrar(analisar_com(parse), repeticoes)
+        tempos.append(tempo)
+        arvores.append(resultado)
+    arvore = arvores[0]
+    iguais = arvores[1] is None or texto_preordem(arvores[1]) == texto_preordem(arvore)
+
+    for iterativa, recursiva in ((gerar_com(gerar_expr), gerar_com(gerar_expr_recursiva)),
+                                 (texto_com(texto_preordem), texto_com(texto_preordem_recursivo))):
+        t_iterativa, r_iterativa = cronometrar(iterativa, repeticoes)
+        t_recursiva, r_recursiva = cronometrar(recursiva, repeticoes)
+        tempos += [t_iterativa, t_recursiva]
+        if r_recursiva is not None and r_recursiva != r_iterativa:
+            iguais = False
+    return tempos, iguais
+
+
+def imprimir_cabecalho():
+    etapas = ("parse", "gerar_expr", "preordem")
+    print(f"{'formato':>9} {'tamanho':>8}" + "".join(f"{e:>22}" for e in etapas))
+    print(" " * 18 + "".join(f"{'pilha':>11}{'recursiva':>11}" for _ in etapas))
+
+
+def imprimir_linha(formato, tamanho, tempos, iguais):
+    linha = f"{formato:>9} {tamanho:>8}"
+    for t in tempos:
+        linha += f"{'recursão':>11}" if t is None else f"{t * 1000:>11.2f}"
+    if not iguais:
+        linha += "  DIFERENTES"
+    print(linha)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="bench_expressoes.py",
+        description="Expressões com pilha explícita x versões recursivas",
+    )
+    parser.add_argument("--formato", choices=[*FORMATOS, "todos"], default="todos",
+                        help="formato das expressões (padrão: todos)")
+    parser.add_argument("--tamanhos", metavar="N,N,...",
+                        help="tamanhos das expressões (padrão: os de FORMATOS)")
+    parser.add_argument("--repeticoes", type=int, default=5,
+                        help="execuções de cada função; vale o menor tempo (padrão: 5)")
+    args = parser.parse_args()
+
+    formatos = list(FORMATOS) if args.formato == "todos" else [args.formato]
+    print(f"Limite de recursão do Python: {sys.getrecursionlimit()}\n")
+    imprimir_cabecalho()
+
+    divergencias = 0
+    for formato in formatos:
+        if args.tamanhos:
+            tamanhos = [int(n) for n in args.tamanhos.split(",")]
+        else:
+            tamanhos = FORMATOS[formato]
+        for tamanho in tamanhos:
+            tempos, iguais = medir(formato, tamanho, args.repeticoes)
+            imprimir_linha(formato, tamanho, tempos, iguais)
+            divergencias += not iguais
+
+    if divergencias:
+        print(f"\n{divergencias} expressões com resultados diferentes")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
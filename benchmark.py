@@ -0,0 +1,194 @@
+# benchmark.py
+#
+# Mede o tempo de cada fase do compilador em programas sintéticos
+# (gerador.py) de tamanhos crescentes e aponta as fases cujo tempo cresce
+# mais que linearmente com o tamanho da entrada.
+#
+# Para cada eixo (funcoes, comandos, profundidade, tamanho_expr,
+# identificadores), os demais ficam nos valores de gerador.PADRAO e o eixo
+# percorre a lista de tamanhos. Cada programa é compilado 'repeticoes'
+# vezes (com main.compilar, medindo as fases com perfil.Perfil, sem
+# tracemalloc) e fica o menor tempo de cada fase.
+#
+# O crescimento é estimado pelo expoente k de tempo ~ tokens^k (reta de
+# mínimos quadrados em escala log-log). Fases com k acima do limite
+# (padrão 1.3) são apontadas; fases que levam menos de TEMPO_MINIMO no
+# maior programa não são avaliadas (o ruído domina).
+#
+# Uso:
+#   python benchmark.py                          # todos os eixos
+#   python benchmark.py --eixo funcoes --tamanhos 50,100,200,400
+#   python benchmark.py --opcoes="--fundido -O" --json resultado.json
+#   python benchmark.py --opcoes=-q              # sem o custo da saída
+#
+# Termina com código 1 se alguma fase cresceu de forma superlinear.
+
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import shlex
+import sys
+
+from lexico import analisar
+from gerador import PADRAO, gerar_programa
+from perfil import Perfil
+from relatorio import NIVEIS, Relatorio
+from main import compilar, ler_argumentos
+
+
+# Tamanhos percorridos por eixo (padrão)
+EIXOS = {
+    "funcoes": (25, 50, 100, 200),
+    "comandos": (25, 50, 100, 200),
+    "profundidade": (8, 16, 32, 64),
+    "tamanho_expr": (8, 16, 32, 64),
+    "identificadores": (16, 32, 64, 128),
+}
+
+LIMITE_EXPOENTE = 1.3
+
+# Fases abaixo deste tempo (s) no maior programa não são avaliadas
+TEMPO_MINIMO = 0.005
+
+
+def medir(texto, args, repeticoes):
+    """
+    Compila 'texto' 'repeticoes' vezes, descartando a saída.
+
+    Retorna:
+        (número de tokens, dicionário fase -> menor tempo em segundos)
+    """
+    melhores = {}
+    n_tokens = 0
+    for _ in range(repeticoes):
+        perfil = Perfil(memoria=False, contadores=False)
+        descarte = io.StringIO()
+        relatorio = Relatorio(NIVEIS[args.verbosidade], args.saida, descarte)
+        with contextlib.redirect_stdout(descarte):
+            with perfil.fase("lexico"):
+                tokens, tabela_simbolos = analisar(texto, args.lexico, args.compacto)
+            n_tokens = len(tokens)
+            compilar(tokens, tabela_simbolos, args, perfil, relatorio)
+            relatorio.descarregar()
+        for fase in perfil.fases:
+            nome = fase["nome"]
+            melhores[nome] = min(melhores.get(nome, math.inf), fase["tempo"])
+    return n_tokens, melhores
+
+
+def expoente(tamanhos, tempos):
+    """Inclinação da reta de mínimos quadrados de log(tempo) x log(tamanho)."""
+    xs = [math.log(n) for n in tamanhos]
+    ys = [math.log(max(t, 1e-9)) for t in tempos]
+    media_x = sum(xs) / len(xs)
+    media_y = sum(ys) / len(ys)
+    variancia = sum((x - media_x) ** 2 for x in xs)
+    if variancia == 0:
+        return 0.0
+    return sum((x - media_x) * (y - media_y) for x, y in zip(xs, ys)) / variancia
+
+
+def executar_eixo(eixo, tamanhos, args, semente=0, repeticoes=3, limite=LIMITE_EXPOENTE):
+    """
+    Mede todas as fases ao longo de um eixo.
+
+    Retorna um dicionário (serializável em JSON) com:
+        eixo, tamanhos, tokens, tempos (fase -> lista de tempos),
+        expoentes (fase -> k) e superlineares (fases com k > limite)
+    """
+    n_tokens = []
+    tempos = {}
+    for tamanho in tamanhos:
+        texto = gerar_programa(semente, **{eixo: tamanho})
+        n, melhores = medir(texto, args, repeticoes)
+        n_tokens.append(n)
+        for fase, t in melhores.items():
+            tempos.setdefault(fase, []).append(t)
+    tempos["total"] = [sum(por_fase) for por_fase in zip(*tempos.values())]
+
+    expoentes = {fase: expoente(n_tokens, ts) for fase, ts in tempos.items()}
+    superlineares = [
+        fase for fase, k in expoentes.items()
+        if k > limite and tempos[fase][-1] >= TEMPO_MINIMO
+    ]
+    return {
+        "eixo": eixo,
+        "tamanhos": list(tamanhos),
+        "tokens": n_tokens,
+        "tempos": tempos,
+        "expoentes": expoentes,
+        "superlineares": superlineares,
+    }
+
+
+def imprimir_eixo(resultado):
+    """Tabela de tempos (ms) por fase e expoente de crescimento."""
+    fases = list(resultado["tempos"])
+    largura = max(9, *(len(f) + 1 for f in fases))
+
+    print(f"\n=== Eixo: {resultado['eixo']} ===")
+    print(f"{'tamanho':>8} {'tokens':>8}" + "".join(f"{f:>{largura}}" for f in fases))
+    for i, tamanho in enumerate(resultado["tamanhos"]):
+        linha = f"{tamanho:>8} {resultado['tokens'][i]:>8}"
+        linha += "".join(f"{resultado['tempos'][f][i] * 1000:>{largura}.1f}" for f in fases)
+        print(linha)
+
+    linha = f"{'expoente':>17}"
+    for f in fases:
+        marca = "!" if f in resultado["superlineares"] else " "
+        linha += f"{resultado['expoentes'][f]:>{largura - 1}.2f}{marca}"
+    print(linha)
+
+    for f in resultado["superlineares"]:
+        print(f"Crescimento superlinear: {f} (tempo ~ tokens^{resultado['expoentes'][f]:.2f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="benchmark.py",
+        description="Tempo das fases do compilador em programas sintéticos crescentes",
+    )
+    parser.add_argument("--eixo", choices=[*EIXOS, "todos"], default="todos",
+                        help="eixo de tamanho a variar (padrão: todos)")
+    parser.add_argument("--tamanhos", metavar="N,N,...",
+                        help="tamanhos do eixo (padrão: os de EIXOS)")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--repeticoes", type=int, default=3,
+                        help="compilações por programa; vale o menor tempo (padrão: 3)")
+    parser.add_argument("--limite", type=float, default=LIMITE_EXPOENTE,
+                        help="expoente acima do qual o crescimento é apontado "
+                             "(padrão: %(default)s)")
+    parser.add_argument("--opcoes", default="",
+                        help='opções do compilador (main.py), ex.: "--fundido -O"')
+    parser.add_argument("--json", metavar="ARQ",
+                        help="grava os resultados em JSON")
+    args = parser.parse_args()
+
+    args_compilador = ler_argumentos(shlex.split(args.opcoes))
+    eixos = list(EIXOS) if args.eixo == "todos" else [args.eixo]
+
+    resultados = []
+    for eixo in eixos:
+        if args.tamanhos:
+            tamanhos = [int(n) for n in args.tamanhos.split(",")]
+        else:
+            tamanhos = EIXOS[eixo]
+        resultado = executar_eixo(eixo, tamanhos, args_compilador, args.semente,
+                                  args.repeticoes, args.limite)
+        imprimir_eixo(resultado)
+        resultados.append(resultado)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"parametros": PADRAO, "opcoes": args.opcoes, "semente": args.semente,
+                       "resultados": resultados}, f, ensure_ascii=False, indent=2)
+
+    if any(r["superlineares"] for r in resultados):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
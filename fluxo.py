@@ -0,0 +1,239 @@
+# fluxo.py
+#
+# Grafo de fluxo de controle (CFG) e análise de vivacidade sobre o código
+# intermediário (instrucoes.py).
+#
+# O código é dividido em unidades (o corpo de cada função e os trechos
+# fora de funções); cada unidade é dividida em blocos básicos, ligados
+# pelos desvios (goto, if not ... goto) e pela passagem de um bloco ao
+# seguinte. O fim do corpo de uma função não passa para a função seguinte.
+#
+# A vivacidade (análise para trás, iterada até o ponto fixo) diz, para
+# cada bloco, quais operandos estão vivos na entrada e na saída: ainda
+# podem ser lidos antes de serem redefinidos. É a base do alocador de
+# temporários (alocacao.py) e serve ao otimizador e a outros back-ends.
+
+
+from instrucoes import *
+
+
+# Instruções que encerram um bloco básico
+OPS_FIM_BLOCO = frozenset({OP_GOTO, OP_SE_FALSO, OP_RETURN})
+
+
+# ---------------------------------------------------------------------
+# Leituras e escritas de cada instrução
+# ---------------------------------------------------------------------
+
+def usos(q):
+    """Operandos lidos pela instrução 'q'."""
+    if q.op in (OP_ROTULO, OP_GOTO, OP_RETURN, OP_CALL):
+        return ()
+    if q.op == OP_SE_FALSO:
+        return (q.arg1,)
+    if q.arg2 != NENHUM:
+        return (q.arg1, q.arg2)
+    return (q.arg1,)
+
+
+def definicao(q):
+    """Operando escrito pela instrução 'q' (ou NENHUM)."""
+    if q.op in (OP_ROTULO, OP_GOTO, OP_SE_FALSO, OP_PARAM, OP_PRINT, OP_RETURN):
+        return NENHUM
+    return q.dest
+
+
+# ---------------------------------------------------------------------
+# Unidades e blocos básicos
+# ---------------------------------------------------------------------
+
+def entradas_funcoes(codigo, removidas=()):
+    """
+    Índices em que começa o corpo de alguma função.
+
+    As posições de 'removidas' (instruções já eliminadas, à espera da
+    compactação do código) não contam: o corpo começa na primeira
+    instrução restante.
+    """
+    if not removidas:
+        return {f.inicio for f in codigo.funcoes.values()}
+    n = len(codigo)
+    entradas = set()
+    for funcao in codigo.funcoes.values():
+        i = funcao.inicio
+        while i < n and i in removidas:
+            i += 1
+        entradas.add(i)
+    return entradas
+
+
+def unidades(codigo):
+    """
+    Divide o código em unidades independentes: o corpo de cada função e
+    os trechos entre elas (código fora de funções, como o 'return' final).
+
+    Retorna:
+        lista de (nome, início, fim), na ordem do código; o nome é None
+        para os trechos fora de funções
+    """
+    resultado = []
+    posicao = 0
+    for funcao in sorted(codigo.funcoes.values(), key=lambda f: f.inicio):
+        if funcao.inicio > posicao:
+            resultado.append((None, posicao, funcao.inicio))
+        resultado.append((funcao.nome, funcao.inicio, funcao.fim))
+        posicao = funcao.fim
+    if posicao < len(codigo):
+        resultado.append((None, posicao, len(codigo)))
+    return resultado
+
+
+def blocos_basicos(codigo, inicio=0, fim=None, removidas=()):
+    """
+    Divide o trecho [inicio, fim) do código em blocos básicos.
+
+    Um bloco começa no início do trecho, no início do corpo de cada
+    função, em cada rótulo e logo após cada desvio (goto, if not ... goto)
+    ou return. As posições de 'removidas' são ignoradas: os blocos são os
+    do código já sem elas, e cada bloco vai da sua primeira à sua última
+    instrução restante (podendo conter posições removidas no meio).
+
+    Retorna:
+        lista de pares (início, fim) de índices em 'codigo' (fim exclusivo)
+    """
+    if fim is None:
+        fim = len(codigo)
+    entradas = entradas_funcoes(codigo, removidas)
+    blocos = []
+    comeco = None       # primeira instrução do bloco atual
+    ultima = None       # última instrução do bloco atual
+    for i in range(inicio, fim):
+        if i in removidas:
+            continue
+        q = codigo[i]
+        if (q.op == OP_ROTULO or i in entradas) and comeco is not None:
+            blocos.append((comeco, ultima + 1))
+            comeco = None
+        if comeco is None:
+            comeco = i
+        ultima = i
+        if q.op in OPS_FIM_BLOCO:
+            blocos.append((comeco, i + 1))
+            comeco = None
+    if comeco is not None:
+        blocos.append((comeco, ultima + 1))
+    return blocos
+
+
+# ---------------------------------------------------------------------
+# Grafo de fluxo de controle
+# ---------------------------------------------------------------------
+
+class BlocoBasico:
+    """
+    Nó do grafo de fluxo de controle.
+
+    Campos:
+        inicio, fim   : trecho do bloco em 'codigo' (fim exclusivo)
+        sucessores    : índices (na lista de blocos da unidade) dos blocos
+                        que podem ser executados logo após este
+        predecessores : índices dos blocos que podem levar a este
+    """
+
+    __slots__ = ("inicio", "fim", "sucessores", "predecessores")
+
+    def __init__(self, inicio, fim):
+        self.inicio = inicio
+        self.fim = fim
+        self.sucessores = []
+        self.predecessores = []
+
+    def __repr__(self):
+        return f"BlocoBasico({self.inicio}, {self.fim}, {self.sucessores})"
+
+
+def construir_cfg(codigo, inicio=0, fim=None):
+    """
+    Monta o grafo de fluxo de controle do trecho [inicio, fim) (em geral,
+    uma das unidades de 'unidades').
+
+    Retorna:
+        lista de BlocoBasico, na ordem do código; o primeiro é a entrada
+    """
+    blocos = [BlocoBasico(i, f) for i, f in blocos_basicos(codigo, inicio, fim)]
+
+    # Bloco de cada rótulo do trecho
+    bloco_do_rotulo = {}
+    for b, bloco in enumerate(blocos):
+        q = codigo[bloco.inicio]
+        if q.op == OP_ROTULO:
+            bloco_do_rotulo[q.arg1] = b
+
+    for b, bloco in enumerate(blocos):
+        ultima = codigo[bloco.fim - 1]
+        if ultima.op == OP_GOTO:
+            alvos = [bloco_do_rotulo[ultima.arg1]]
+        elif ultima.op == OP_SE_FALSO:
+            alvos = [b + 1, bloco_do_rotulo[ultima.arg2]]
+        elif ultima.op == OP_RETURN:
+            alvos = []
+        else:
+            alvos = [b + 1]
+
+        for alvo in alvos:
+            if alvo < len(blocos) and alvo not in bloco.sucessores:
+                bloco.sucessores.append(alvo)
+                blocos[alvo].predecessores.append(b)
+
+    return blocos
+
+
+# ---------------------------------------------------------------------
+# Vivacidade
+# ---------------------------------------------------------------------
+
+def vivacidade(codigo, blocos, classe=TEMP):
+    """
+    Análise de vivacidade (para trás) dos operandos da 'classe' dada
+    sobre os blocos de construir_cfg.
+
+    Retorna:
+        (vivos_entrada, vivos_saida): listas de conjuntos de operandos,
+        uma posição por bloco
+    """
+    classes = codigo.classes
+
+    # Conjuntos locais: lidos antes de escritos no bloco / escritos no bloco
+    lidos = []
+    escritos = []
+    for bloco in blocos:
+        l, e = set(), set()
+        for i in range(bloco.inicio, bloco.fim):
+            q = codigo[i]
+            for u in usos(q):
+                if classes[u] == classe and u not in e:
+                    l.add(u)
+            d = definicao(q)
+            if d != NENHUM and classes[d] == classe:
+                e.add(d)
+        lidos.append(l)
+        escritos.append(e)
+
+    vivos_entrada = [set() for _ in blocos]
+    vivos_saida = [set() for _ in blocos]
+
+    # Ponto fixo; percorrer de trás para frente acelera a convergência
+    mudou = True
+    while mudou:
+        mudou = False
+        for b in range(len(blocos) - 1, -1, -1):
+            saida = set()
+            for s in blocos[b].sucessores:
+                saida |= vivos_entrada[s]
+            entrada = lidos[b] | (saida - escritos[b])
+            if entrada != vivos_entrada[b] or saida != vivos_saida[b]:
+                vivos_entrada[b] = entrada
+                vivos_saida[b] = saida
+                mudou = True
+
+    return vivos_entrada, vivos_saida
@@ -0,0 +1,218 @@
+# gerador.py
+#
+# Gerador de programas ConvCC-2025-2 sintéticos e válidos (léxica,
+# sintática e semanticamente), usado pelo benchmark.py.
+#
+# O tamanho do programa é controlado por eixos independentes:
+#
+#   funcoes         : número de funções além de 'main'
+#   comandos        : comandos por função (um if/for/{ } conta como um
+#                     comando, mais os comandos do seu corpo)
+#   profundidade    : aninhamento máximo de { } / if / for; cada função
+#                     começa com um aninhamento exatamente dessa profundidade
+#   tamanho_expr    : operandos por expressão
+#   identificadores : variáveis declaradas (e usadas) em cada função
+#
+# A mesma semente e os mesmos parâmetros geram sempre o mesmo programa.
+#
+# Para que o programa seja válido:
+#   - todas as variáveis são int e declaradas no início da função;
+#   - cada função f<k> recebe (int a, int b) e só chama funções anteriores;
+#   - 'break' só aparece dentro de 'for';
+#   - divisores e restos são sempre constantes diferentes de zero.
+#
+# Uso direto:
+#   python gerador.py --funcoes 100 --comandos 50 --semente 1 > prog.conv
+
+
+import argparse
+import random
+
+
+# Parâmetros usados quando um eixo não é informado
+PADRAO = {
+    "funcoes": 10,
+    "comandos": 20,
+    "profundidade": 2,
+    "tamanho_expr": 4,
+    "identificadores": 8,
+}
+
+
+class GeradorProgramas:
+    """
+    Gera o texto de um programa a partir de uma semente e dos eixos de
+    tamanho (ver PADRAO).
+    """
+
+    def __init__(self, semente=0, **eixos):
+        desconhecidos = set(eixos) - set(PADRAO)
+        if desconhecidos:
+            raise ValueError(f"Eixos desconhecidos: {', '.join(sorted(desconhecidos))}")
+        self.parametros = {**PADRAO, **eixos}
+        self.aleatorio = random.Random(semente)
+        self.linhas = []
+        self.variaveis = []
+        self.funcoes = []
+
+    # -----------------------------------------------------------------
+    # Programa e funções
+    # -----------------------------------------------------------------
+
+    def gerar(self):
+        """Retorna o texto do programa."""
+        for k in range(self.parametros["funcoes"]):
+            self._funcao(f"f{k}", "int a, int b")
+            self.funcoes.append(f"f{k}")
+        self._funcao("main", "")
+        return "\n".join(self.linhas) + "\n"
+
+    def _funcao(self, nome, parametros):
+        p = self.parametros
+        self.variaveis = [f"v{k}" for k in range(max(1, p["identificadores"]))]
+
+        self.linhas.append(f"def {nome}({parametros}){{")
+        for v in self.variaveis:
+            self._emitir(1, f"int {v};")
+        for v in self.variaveis:
+            self._emitir(1, f"{v} = {self._constante()};")
+        if parametros:
+            self.variaveis += ["a", "b"]
+
+        # Aninhamento de profundidade máxima, depois comandos aleatórios
+        restantes = max(0, p["comandos"] - p["profundidade"] - 1)
+        self._aninhamento(1, p["profundidade"], dentro_laco=False)
+        self._comandos(1, restantes, p["profundidade"], dentro_laco=False)
+        self._emitir(1, "return;")
+        self.linhas.append("}")
+        self.linhas.append("")
+
+    # -----------------------------------------------------------------
+    # Comandos
+    # -----------------------------------------------------------------
+
+    def _emitir(self, nivel, texto):
+        self.linhas.append("    " * nivel + texto)
+
+    def _aninhamento(self, nivel, profundidade, dentro_laco):
+        """
+        Cadeia de comandos compostos com exatamente 'profundidade' níveis
+        (iterativa: a profundidade pode passar do limite de recursão).
+        """
+        abertos = []
+        for k in range(profundidade, 0, -1):
+            tipo = ("if", "for", "bloco")[k % 3]
+            self._abrir(nivel, tipo)
+            abertos.append((nivel, tipo, dentro_laco))
+            dentro_laco = dentro_laco or tipo == "for"
+            nivel += 1
+        self._simples(nivel, dentro_laco)
+        for nivel, tipo, dentro_laco in reversed(abertos):
+            self._fechar(nivel, tipo, dentro_laco)
+
+    def _comandos(self, nivel, quantidade, profundidade, dentro_laco):
+        """Emite 'quantidade' comandos com aninhamento de até 'profundidade'."""
+        r = self.aleatorio
+        while quantidade > 0:
+            if profundidade > 0 and quantidade > 1 and r.random() < 0.25:
+                corpo = r.randint(1, min(quantidade - 1, 8))
+                tipo = r.choice(("if", "for", "bloco"))
+                self._composto(nivel, tipo, dentro_laco,
+                               lambda n, laco: self._comandos(n, corpo, profundidade - 1, laco))
+                quantidade -= corpo + 1
+            else:
+                self._simples(nivel, dentro_laco)
+                quantidade -= 1
+
+    def _composto(self, nivel, tipo, dentro_laco, corpo):
+        """Emite um if/for/{ } cujo corpo é gerado por corpo(nivel, dentro_laco)."""
+        self._abrir(nivel, tipo)
+        corpo(nivel + 1, dentro_laco or tipo == "for")
+        self._fechar(nivel, tipo, dentro_laco)
+
+    def _abrir(self, nivel, tipo):
+        if tipo == "if":
+            self._emitir(nivel, f"if ({self._condicao()}) {{")
+        elif tipo == "for":
+            v = self.aleatorio.choice(self.variaveis)
+            self._emitir(nivel, f"for ({v} = 0; {v} < {self._constante()}; {v} = {v} + 1) {{")
+        else:
+            self._emitir(nivel, "{")
+
+    def _fechar(self, nivel, tipo, dentro_laco):
+        if tipo == "if":
+            self._emitir(nivel, "} else {")
+            self._simples(nivel + 1, dentro_laco)
+        self._emitir(nivel, "}")
+
+    def _simples(self, nivel, dentro_laco):
+        """Atribuição, print, chamada de função ou break."""
+        r = self.aleatorio
+        k = r.random()
+        alvo = r.choice(self.variaveis)
+        if k < 0.6:
+            self._emitir(nivel, f"{alvo} = {self._expressao()};")
+        elif k < 0.8:
+            self._emitir(nivel, f"print {self._expressao()};")
+        elif k < 0.95 and self.funcoes:
+            funcao = r.choice(self.funcoes)
+            x, y = r.choice(self.variaveis), r.choice(self.variaveis)
+            self._emitir(nivel, f"{alvo} = {funcao}({x}, {y});")
+        elif dentro_laco:
+            self._emitir(nivel, "break;")
+        else:
+            self._emitir(nivel, f"print {alvo};")
+
+    # -----------------------------------------------------------------
+    # Expressões
+    # -----------------------------------------------------------------
+
+    def _constante(self):
+        return str(self.aleatorio.randint(1, 9))
+
+    def _operando(self):
+        r = self.aleatorio
+        if r.random() < 0.3:
+            return self._constante()
+        return r.choice(self.variaveis)
+
+    def _expressao(self):
+        """Expressão aritmética com tamanho_expr operandos."""
+        r = self.aleatorio
+        texto = self._operando()
+        for _ in range(self.parametros["tamanho_expr"] - 1):
+            op = r.choice("+-*/%")
+            operando = self._constante() if op in "/%" else self._operando()
+            if r.random() < 0.15:
+                texto = f"({texto})"
+            texto = f"{texto} {op} {operando}"
+        return texto
+
+    def _condicao(self):
+        r = self.aleatorio
+        comparacao = r.choice(("<", ">", "<=", ">=", "==", "!="))
+        return f"{self._expressao()} {comparacao} {self._operando()}"
+
+
+def gerar_programa(semente=0, **eixos):
+    """Texto de um programa sintético (ver GeradorProgramas e PADRAO)."""
+    return GeradorProgramas(semente, **eixos).gerar()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="gerador.py",
+        description="Gera um programa ConvCC-2025-2 sintético e válido",
+    )
+    parser.add_argument("--semente", type=int, default=0)
+    for eixo, padrao in PADRAO.items():
+        parser.add_argument(f"--{eixo.replace('_', '-')}", dest=eixo, type=int,
+                            default=padrao, metavar="N",
+                            help=f"(padrão: {padrao})")
+    args = parser.parse_args()
+    eixos = {eixo: getattr(args, eixo) for eixo in PADRAO}
+    print(gerar_programa(args.semente, **eixos), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+# incremental.py
+#
+# Cache incremental em disco (opção --cache DIRETORIO do main.py).
+#
+# O programa é dividido nas mesmas unidades da geração por função
+# (intermediario.unidades_de_geracao): cada 'def' e cada trecho fora de
+# funções. Cada unidade recebe uma chave (SHA-256) calculada a partir de:
+#
+#   - o conteúdo dos seus tokens (tipo e valor; identificadores pelo nome,
+#     não pelo índice na tabela de símbolos; sem linha e coluna, de modo
+#     que mover uma função no arquivo não invalida a sua entrada);
+#   - a tabela global de funções (nome e lista de parâmetros de cada def,
+#     as mesmas funções que o semântico declara com declara_funcao);
+#   - o código-fonte das fases cujo resultado é guardado.
+#
+# Para cada unidade compilada com sucesso, guarda-se num arquivo
+# <chave>.pkl:
+#
+#   - as árvores de expressão já analisadas e tipadas pelo semântico
+#     (CacheExpressoes.extrair), que na próxima compilação entram no
+#     CacheExpressoes antes da análise semântica: as expressões das
+#     unidades inalteradas não são analisadas de novo;
+#   - o código intermediário da unidade (gerado com temporários e rótulos
+#     locais), anexado diretamente ao código final.
+#
+# A análise léxica, a sintática e a parte de declarações e escopos do
+# semântico continuam sendo feitas sobre o arquivo inteiro: são elas que
+# permitem calcular as chaves e detectar erros nas unidades alteradas.
+#
+# Entradas antigas são removidas por idade e, depois, das menos usadas
+# para as mais usadas, até o diretório caber no tamanho máximo.
+
+
+import hashlib
+import os
+import pickle
+import time
+from pathlib import Path
+
+from intermediario import unidades_de_geracao
+from semantico import fechamento
+from relatorio import RESUMO, SAIDA_PADRAO
+
+
+# Arquivos cujo comportamento determina o conteúdo das entradas
+_FONTES = ("lexico.py", "semantico.py", "intermediario.py", "instrucoes.py")
+
+
+def _versao_compilador():
+    """Resumo do código-fonte das fases cujo resultado é guardado."""
+    resumo = hashlib.sha256()
+    pasta = Path(__file__).resolve().parent
+    for nome in _FONTES:
+        resumo.update((pasta / nome).read_bytes())
+    return resumo.digest()
+
+
+VERSAO_COMPILADOR = _versao_compilador()
+
+
+def _texto_token(tok, tabela_simbolos):
+    """Conteúdo de um token para a chave: tipo e valor (nome, se ident)."""
+    if tok.tipo == "ident":
+        return f"ident\0{tabela_simbolos[tok.valor][0]}"
+    if tok.valor is None:
+        return tok.tipo
+    return f"{tok.tipo}\0{tok.valor}"
+
+
+def assinaturas_funcoes(tokens, tabela_simbolos, pares, intervalos):
+    """
+    Tabela global de funções: para cada 'def', o nome e os tokens da
+    lista de parâmetros, na ordem do programa (em forma de texto).
+    """
+    partes = []
+    for inicio, fim in intervalos:
+        if tokens[inicio].tipo != "def":
+            continue
+        fecha_parametros = fechamento(pares, inicio + 2, fim)
+        partes.append(" ".join(_texto_token(tokens[k], tabela_simbolos)
+                               for k in range(inicio + 1, fecha_parametros)))
+    return "\n".join(partes)
+
+
+def chave_unidade(tokens, tabela_simbolos, inicio, fim, assinaturas):
+    """Chave (hexadecimal) da unidade [inicio, fim)."""
+    resumo = hashlib.sha256(VERSAO_COMPILADOR)
+    resumo.update(assinaturas.encode())
+    resumo.update(b"\1")
+    texto = "\1".join([_texto_token(tokens[k], tabela_simbolos) for k in range(inicio, fim)])
+    resumo.update(texto.encode())
+    return resumo.hexdigest()
+
+
+class CacheIncremental:
+    """
+    Diretório de entradas do cache incremental.
+
+    Campos:
+        diretorio   : Path do diretório das entradas
+        max_bytes   : tamanho máximo do diretório (após a limpeza)
+        max_idade   : idade máxima (segundos) de uma entrada não usada
+        unidades    : (intervalo, chave) de cada unidade da compilação atual
+        prontas     : intervalos cujas entradas foram encontradas
+        acertos, falhas, gravadas, removidas : estatísticas desta execução
+    """
+
+    def __init__(self, diretorio, max_bytes=64 * 1024 * 1024, max_idade=30 * 24 * 3600):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_idade = max_idade
+        self.unidades = []
+        self.prontas = set()
+        self.acertos = 0
+        self.falhas = 0
+        self.gravadas = 0
+        self.removidas = 0
+
+    def _arquivo(self, chave):
+        return self.diretorio / f"{chave}.pkl"
+
+    def carregar(self, tokens, tabela_simbolos, pares, cache):
+        """
+        Procura as entradas das unidades do programa. Para cada entrada
+        encontrada, as árvores de expressão vão para 'cache'
+        (CacheExpressoes) e o código da unidade para o dicionário
+        retornado (intervalo -> CodigoIntermediario), que deve ser
+        passado a intermediario.analisador_intermediario (partes).
+        """
+        intervalos = unidades_de_geracao(tokens, pares)
+        assinaturas = assinaturas_funcoes(tokens, tabela_simbolos, pares, intervalos)
+
+        partes = {}
+        self.unidades = []
+        for inicio, fim in intervalos:
+            chave = chave_unidade(tokens, tabela_simbolos, inicio, fim, assinaturas)
+            self.unidades.append(((inicio, fim), chave))
+
+            arquivo = self._arquivo(chave)
+            try:
+                with open(arquivo, "rb") as f:
+                    arvores, parte = pickle.load(f)
+            except FileNotFoundError:
+                self.falhas += 1
+                continue
+            except Exception:
+                # Entrada corrompida ou de um formato antigo: descarta
+                arquivo.unlink(missing_ok=True)
+                self.falhas += 1
+                continue
+
+            os.utime(arquivo)   # marca como usada (limpeza por uso)
+            cache.preencher(inicio, arvores)
+            partes[(inicio, fim)] = parte
+            self.prontas.add((inicio, fim))
+            self.acertos += 1
+
+        return partes
+
+    def gravar(self, cache, partes):
+        """
+        Grava as entradas das unidades que não estavam no cache, depois
+        de uma compilação bem-sucedida.
+        """
+        novas = [(intervalo, chave) for intervalo, chave in self.unidades
+                 if intervalo not in self.prontas and intervalo in partes]
+        arvores = cache.extrair([intervalo for intervalo, _ in novas])
+
+        for (intervalo, chave), arvores_unidade in zip(novas, arvores):
+            conteudo = (arvores_unidade, partes[intervalo])
+
+            # Grava num arquivo temporário e renomeia: outro processo
+            # compilando ao mesmo tempo nunca lê uma entrada incompleta
+            arquivo = self._arquivo(chave)
+            temporario = arquivo.with_suffix(f".{os.getpid()}.tmp")
+            with open(temporario, "wb") as f:
+                pickle.dump(conteudo, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporario, arquivo)
+            self.gravadas += 1
+
+    def limpar(self):
+        """
+        Remove as entradas não usadas há mais de max_idade e, depois, as
+        usadas há mais tempo, até o diretório caber em max_bytes.
+        """
+        agora = time.time()
+        entradas = []
+        for arquivo in self.diretorio.glob("*.pkl"):
+            try:
+                info = arquivo.stat()
+            except FileNotFoundError:
+                continue
+            if agora - info.st_mtime > self.max_idade:
+                arquivo.unlink(missing_ok=True)
+                self.removidas += 1
+            else:
+                entradas.append((info.st_mtime, info.st_size, arquivo))
+
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        entradas.sort()
+        for _, tamanho, arquivo in entradas:
+            if total <= self.max_bytes:
+                break
+            arquivo.unlink(missing_ok=True)
+            total -= tamanho
+            self.removidas += 1
+
+    def imprimir_estatisticas(self, relatorio=SAIDA_PADRAO):
+        """Registra os acertos e falhas desta execução."""
+        relatorio.registrar(
+            RESUMO, "cache_incremental",
+            f"\nCache incremental: {self.acertos} acertos, {self.falhas} falhas, "
+            f"{self.gravadas} entradas gravadas, {self.removidas} removidas",
+            acertos=self.acertos, falhas=self.falhas,
+            gravadas=self.gravadas, removidas=self.removidas,
+        )
@@ -0,0 +1,399 @@
+# instrucoes.py
+#
+# Representação estruturada do código intermediário de 3 endereços.
+#
+# Em vez de strings já formatadas ("t3 = t1 + t2", "if not t4 goto L1"),
+# o gerador de código (intermediario.py) produz quádruplas:
+#
+#     Quadrupla(op, dest, arg1, arg2)
+#
+# - 'op' é um código inteiro (constantes OP_* abaixo);
+# - 'dest', 'arg1' e 'arg2' são identificadores inteiros de operandos
+#   (NENHUM = -1 quando o campo não é usado).
+#
+# Os operandos (temporários, variáveis, constantes, rótulos e funções) são
+# internados em CodigoIntermediario: cada nome distinto de cada classe
+# recebe um único identificador, de modo que comparar dois operandos é
+# comparar dois inteiros. O texto do código de 3 endereços é apenas uma
+# impressão dessas quádruplas (CodigoIntermediario.formatar / linhas).
+#
+# Uma variável é identificada pelo símbolo declarado, e não pelo nome do
+# identificador: o seu operando é SimboloSemantico.operando, único entre
+# as declarações da função (x, x#1, ...; ver semantico.Escopo.qualificar).
+# Um 'int x' de um bloco interno e o 'x' externo são operandos distintos.
+
+import math
+import operator
+from array import array
+
+from relatorio import COMPLETO, SAIDA_PADRAO
+
+
+# Campo de operando não usado
+NENHUM = -1
+
+# ---------------------------------------------------------------------
+# Códigos de operação
+# ---------------------------------------------------------------------
+OP_ROTULO = 0       # arg1:                       L:
+OP_GOTO = 1         # arg1:                       goto L
+OP_SE_FALSO = 2     # arg1 = condição, arg2 = L:  if not c goto L
+OP_COPIA = 3        # dest = arg1
+OP_PARAM = 4        # param arg1
+OP_CALL = 5         # dest = call arg1 (função)
+OP_PRINT = 6        # print arg1
+OP_RETURN = 7       # return
+OP_UNARIO_MAIS = 8  # dest = unary+arg1
+OP_UNARIO_MENOS = 9 # dest = unary-arg1
+
+# Operadores binários: dest = arg1 <op> arg2
+OP_SOMA = 10
+OP_SUB = 11
+OP_MUL = 12
+OP_DIV = 13
+OP_MOD = 14
+OP_MENOR = 15
+OP_MAIOR = 16
+OP_MENOR_IGUAL = 17
+OP_MAIOR_IGUAL = 18
+OP_IGUAL = 19
+OP_DIFERENTE = 20
+
+# Símbolo do operador (ExprNode.op) -> código de operação
+OP_BINARIO = {
+    "+": OP_SOMA, "-": OP_SUB, "*": OP_MUL, "/": OP_DIV, "%": OP_MOD,
+    "<": OP_MENOR, ">": OP_MAIOR, "<=": OP_MENOR_IGUAL, ">=": OP_MAIOR_IGUAL,
+    "==": OP_IGUAL, "!=": OP_DIFERENTE,
+}
+OP_UNARIO = {"unary+": OP_UNARIO_MAIS, "unary-": OP_UNARIO_MENOS}
+
+# Código de operação -> símbolo (usado na impressão)
+SIMBOLO_OP = {op: simbolo for simbolo, op in OP_BINARIO.items()}
+SIMBOLO_OP.update({op: simbolo for simbolo, op in OP_UNARIO.items()})
+
+# ---------------------------------------------------------------------
+# Classes de operandos
+# ---------------------------------------------------------------------
+TEMP = 0            # t0, t1, ...
+VARIAVEL = 1        # variável do programa (SimboloSemantico.operando)
+CONST_INT = 2       # constante inteira
+CONST_FLOAT = 3     # constante de ponto flutuante
+CONST_STRING = 4    # constante string (sem as aspas)
+CONST_NULL = 5      # null
+ROTULO = 6          # L0, L1, ...
+FUNCAO = 7          # nome de função (em OP_CALL)
+
+# Tipo do literal (ExprNode.op) -> classe do operando
+CLASSE_LITERAL = {
+    "int": CONST_INT, "float": CONST_FLOAT,
+    "string": CONST_STRING, "null": CONST_NULL,
+}
+
+
+# ---------------------------------------------------------------------
+# Semântica das operações
+# ---------------------------------------------------------------------
+# Usada tanto pelo otimizador (dobramento de constantes) quanto pela
+# máquina virtual, para que ambos calculem exatamente o mesmo valor.
+# Divisão e resto entre inteiros truncam em direção a zero (como em C);
+# comparações resultam em 1 (verdadeiro) ou 0 (falso). Divisão por zero
+# lança ZeroDivisionError.
+
+def dividir(a, b):
+    """a / b (inteira e truncada se ambos forem inteiros)."""
+    if type(a) is int and type(b) is int:
+        q = abs(a) // abs(b)
+        return -q if (a < 0) != (b < 0) else q
+    return a / b
+
+
+def resto(a, b):
+    """Resto de a / b, com o sinal do dividendo."""
+    if type(a) is int and type(b) is int:
+        return a - b * dividir(a, b)
+    return math.fmod(a, b)
+
+
+OPERACOES = {
+    OP_SOMA: operator.add,
+    OP_SUB: operator.sub,
+    OP_MUL: operator.mul,
+    OP_DIV: dividir,
+    OP_MOD: resto,
+    OP_MENOR: lambda a, b: int(a < b),
+    OP_MAIOR: lambda a, b: int(a > b),
+    OP_MENOR_IGUAL: lambda a, b: int(a <= b),
+    OP_MAIOR_IGUAL: lambda a, b: int(a >= b),
+    OP_IGUAL: lambda a, b: int(a == b),
+    OP_DIFERENTE: lambda a, b: int(a != b),
+    OP_UNARIO_MAIS: operator.pos,
+    OP_UNARIO_MENOS: operator.neg,
+}
+
+
+def valor_constante(classe, nome):
+    """Valor Python de um operando constante (classe CONST_*)."""
+    if classe == CONST_INT:
+        return int(nome)
+    if classe == CONST_FLOAT:
+        return float(nome)
+    if classe == CONST_STRING:
+        return nome
+    return None
+
+
+class Quadrupla:
+    """Uma instrução de 3 endereços: código de operação e três operandos."""
+
+    __slots__ = ("op", "dest", "arg1", "arg2")
+
+    def __init__(self, op, dest=NENHUM, arg1=NENHUM, arg2=NENHUM):
+        self.op = op
+        self.dest = dest
+        self.arg1 = arg1
+        self.arg2 = arg2
+
+    def __repr__(self):
+        return f"Quadrupla({self.op}, {self.dest}, {self.arg1}, {self.arg2})"
+
+
+class Funcao:
+    """
+    Trecho do código que corresponde ao corpo de uma função.
+
+    O texto de 3 endereços não marca onde cada função começa; estas
+    informações ficam à parte, em CodigoIntermediario.funcoes, para quem
+    precisa delas (otimizador, máquina virtual).
+    """
+
+    __slots__ = ("nome", "inicio", "fim", "parametros")
+
+    def __init__(self, nome, inicio, parametros):
+        self.nome = nome
+        self.inicio = inicio            # índice da primeira quádrupla
+        self.fim = inicio               # índice após a última (exclusivo)
+        self.parametros = parametros    # operandos (variáveis) dos parâmetros
+
+    def __repr__(self):
+        return f"Funcao({self.nome!r}, {self.inicio}, {self.fim})"
+
+
+class CodigoIntermediario(list):
+    """
+    Lista das quádruplas de uma compilação, com a tabela de operandos.
+
+    Guarda também os contadores de temporários e rótulos, que assim são
+    próprios de cada compilação (e não globais ao módulo): duas gerações
+    de código independentes começam ambas em t0 e L0.
+
+    Operandos:
+        nomes   : identificador -> texto do operando
+        classes : identificador -> classe (TEMP, VARIAVEL, CONST_INT, ...)
+
+    Funções:
+        funcoes : nome -> Funcao (trecho do código com o corpo da função)
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.nomes = []
+        self.classes = []
+        self.ids = {}       # (classe, nome) -> identificador
+        self.funcoes = {}
+        self.temporario_counter = 0
+        self.label_counter = 0
+
+    # -----------------------------------------------------------------
+    # Operandos
+    # -----------------------------------------------------------------
+    def operando(self, classe, nome):
+        """Identificador (internado) do operando 'nome' da classe dada."""
+        chave = (classe, nome)
+        ident = self.ids.get(chave)
+        if ident is None:
+            ident = len(self.nomes)
+            self.ids[chave] = ident
+            self.nomes.append(nome)
+            self.classes.append(classe)
+        return ident
+
+    def variavel(self, nome):
+        """
+        Identificador da variável do programa cujo símbolo tem o operando
+        'nome' (SimboloSemantico.operando, e não o nome do identificador).
+        """
+        return self.operando(VARIAVEL, nome)
+
+    def novo_temp(self):
+        """
+        Gera um novo registrador temporário (t0, t1, t2, ...).
+
+        Cada chamada retorna um operando único dentro desta compilação.
+        """
+        t = f"t{self.temporario_counter}"
+        self.temporario_counter += 1
+        return self.operando(TEMP, t)
+
+    def novo_label(self):
+        """
+        Gera um novo rótulo (L0, L1, L2, ...).
+
+        Usado na geração de código para desvios condicionais e laços.
+        """
+        l = f"L{self.label_counter}"
+        self.label_counter += 1
+        return self.operando(ROTULO, l)
+
+    # -----------------------------------------------------------------
+    # Funções
+    # -----------------------------------------------------------------
+    def iniciar_funcao(self, nome, parametros):
+        """
+        Registra que o corpo da função 'nome' começa na próxima quádrupla.
+        'parametros' são os nomes dos parâmetros, na ordem da declaração
+        (as primeiras declarações da função: o operando de cada um é o
+        próprio nome).
+        O chamador ajusta Funcao.fim ao terminar de gerar o corpo.
+        """
+        funcao = Funcao(nome, len(self), [self.variavel(p) for p in parametros])
+        self.funcoes[nome] = funcao
+        return funcao
+
+    def remover(self, posicoes):
+        """
+        Remove as quádruplas nas posições do conjunto 'posicoes',
+        ajustando os trechos das funções. Retorna quantas foram removidas.
+        """
+        if not posicoes:
+            return 0
+        removidas_antes = []    # removidas_antes[i]: removidas em [0, i)
+        total = 0
+        for i in range(len(self) + 1):
+            removidas_antes.append(total)
+            if i in posicoes:
+                total += 1
+        for funcao in self.funcoes.values():
+            funcao.inicio -= removidas_antes[funcao.inicio]
+            funcao.fim -= removidas_antes[funcao.fim]
+        self[:] = [q for i, q in enumerate(self) if i not in posicoes]
+        return total
+
+    # -----------------------------------------------------------------
+    # Junção de códigos gerados separadamente
+    # -----------------------------------------------------------------
+    def anexar(self, outro):
+        """
+        Acrescenta ao fim deste código as quádruplas de 'outro', gerado
+        separadamente (com os próprios contadores, a partir de t0 e L0).
+
+        Os temporários e rótulos de 'outro' são renumerados a partir dos
+        contadores deste código, que avançam em seguida. Anexar, na ordem
+        do programa, os códigos de cada função produz exatamente o mesmo
+        código que gerá-las todas em sequência num único
+        CodigoIntermediario.
+        """
+        base_temp = self.temporario_counter
+        base_label = self.label_counter
+
+        traducao = []
+        for classe, nome in zip(outro.classes, outro.nomes):
+            if classe == TEMP:
+                nome = f"t{int(nome[1:]) + base_temp}"
+            elif classe == ROTULO:
+                nome = f"L{int(nome[1:]) + base_label}"
+            traducao.append(self.operando(classe, nome))
+
+        deslocamento = len(self)
+        for q in outro:
+            self.append(Quadrupla(
+                q.op,
+                traducao[q.dest] if q.dest != NENHUM else NENHUM,
+                traducao[q.arg1] if q.arg1 != NENHUM else NENHUM,
+                traducao[q.arg2] if q.arg2 != NENHUM else NENHUM,
+            ))
+
+        for nome, f in outro.funcoes.items():
+            funcao = Funcao(nome, f.inicio + deslocamento,
+                            [traducao[p] for p in f.parametros])
+            funcao.fim = f.fim + deslocamento
+            self.funcoes[nome] = funcao
+
+        self.temporario_counter += outro.temporario_counter
+        self.label_counter += outro.label_counter
+
+    # -----------------------------------------------------------------
+    # Emissão
+    # -----------------------------------------------------------------
+    def emitir(self, op, dest=NENHUM, arg1=NENHUM, arg2=NENHUM):
+        """Acrescenta a quádrupla (op, dest, arg1, arg2) ao código."""
+        self.append(Quadrupla(op, dest, arg1, arg2))
+
+    # -----------------------------------------------------------------
+    # Impressão
+    # -----------------------------------------------------------------
+    def formatar(self, q):
+        """Texto da quádrupla 'q' no formato de 3 endereços."""
+        nomes = self.nomes
+        op = q.op
+
+        if op in SIMBOLO_OP:
+            if op == OP_UNARIO_MAIS or op == OP_UNARIO_MENOS:
+                return f"{nomes[q.dest]} = {SIMBOLO_OP[op]}{nomes[q.arg1]}"
+            return f"{nomes[q.dest]} = {nomes[q.arg1]} {SIMBOLO_OP[op]} {nomes[q.arg2]}"
+        if op == OP_COPIA:
+            return f"{nomes[q.dest]} = {nomes[q.arg1]}"
+        if op == OP_ROTULO:
+            return f"{nomes[q.arg1]}:"
+        if op == OP_GOTO:
+            return f"goto {nomes[q.arg1]}"
+        if op == OP_SE_FALSO:
+            return f"if not {nomes[q.arg1]} goto {nomes[q.arg2]}"
+        if op == OP_PARAM:
+            return f"param {nomes[q.arg1]}"
+        if op == OP_CALL:
+            return f"{nomes[q.dest]} = call {nomes[q.arg1]}"
+        if op == OP_PRINT:
+            return f"print {nomes[q.arg1]}"
+        if op == OP_RETURN:
+            return "return"
+        raise ValueError(f"Código de operação desconhecido: {op}")
+
+    def linhas(self):
+        """Lista com o texto de cada quádrupla, na ordem do código."""
+        return [self.formatar(q) for q in self]
+
+    # -----------------------------------------------------------------
+    # Serialização (pickle)
+    # -----------------------------------------------------------------
+    def __reduce__(self):
+        """
+        Serializa as quádruplas como um único array de inteiros (4 por
+        quádrupla), bem mais compacto e rápido de transferir entre
+        processos do que um objeto Quadrupla por instrução.
+        """
+        campos = array("i")
+        for q in self:
+            campos.extend((q.op, q.dest, q.arg1, q.arg2))
+        return (_restaurar_codigo, (campos, self.nomes, self.classes, self.funcoes,
+                                    self.temporario_counter, self.label_counter))
+
+
+def _restaurar_codigo(campos, nomes, classes, funcoes, temporario_counter, label_counter):
+    """Reconstrói um CodigoIntermediario serializado por __reduce__."""
+    codigo = CodigoIntermediario()
+    codigo.nomes = nomes
+    codigo.classes = classes
+    codigo.ids = {(c, n): i for i, (c, n) in enumerate(zip(classes, nomes))}
+    codigo.funcoes = funcoes
+    codigo.temporario_counter = temporario_counter
+    codigo.label_counter = label_counter
+    codigo.extend(Quadrupla(*campos[k:k + 4]) for k in range(0, len(campos), 4))
+    return codigo
+
+
+def imprimir_codigo(codigo, titulo="Código Intermediário (3-endereços)", relatorio=SAIDA_PADRAO):
+    """Registra (nível COMPLETO) o código intermediário em 3 endereços."""
+    if codigo and relatorio.ativo(COMPLETO):
+        linhas = codigo.linhas()
+        relatorio.registrar(COMPLETO, "codigo", "\n".join([f"\n=== {titulo} ===", *linhas]),
+                            titulo=titulo, linhas=linhas)
@@ -16,193 +16,218 @@
 #       - break
 #       - chamadas de função
 #   * Impressão final do código de 3 endereços
+#
+# As instruções são quádruplas (instrucoes.py); o texto de 3 endereços
+# é apenas a impressão delas.
 
 
-from semantico import parse_expression, ExprNode, SemanticError
-from lexico import Token  # importado caso seja útil em extensões futuras
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
-# Contadores globais para temporários e rótulos
-temporario_counter = 0
-label_counter = 0
+from semantico import (SemanticError, CacheExpressoes, fechamento,
+                       achatar_estado, restaurar_estado)
+from lexico import casar_delimitadores, TokenStream
+from lexico import Token  # importado caso seja útil em extensões futuras
+from instrucoes import *
+from relatorio import SAIDA_PADRAO
 
 
-def novo_temp():
+def gerar_expr(node, codigo):
     """
-    Gera o nome de um novo registrador temporário (t0, t1, t2, ...).
+    Gera código de 3 endereços para a árvore de expressão 'node'.
 
-    O contador é global ao módulo. Cada chamada retorna um identificador único
-    durante a execução do analisador intermediário.
-    """
-    global temporario_counter
-    t = f"t{temporario_counter}"
-    temporario_counter += 1
-    return t
+    Parâmetros:
+        node  : raiz da árvore de expressão (já tipada pelo semântico)
+        codigo: CodigoIntermediario onde as instruções geradas serão acrescentadas
 
+    Retorna:
+        O operando (variável ou temporário) que contém o resultado da expressão.
 
-def novo_label():
+    A árvore é percorrida em pós-ordem com uma pilha explícita (sem limite
+    de profundidade): cada entrada é (nó, etapa), e os operandos já
+    gerados ficam em 'resultados'. As instruções, temporários e operandos
+    são os mesmos, e na mesma ordem, de gerar_expr_recursiva.
     """
-    Gera o nome de um novo rótulo (L0, L1, L2, ...).
+    if node is None:
+        return NENHUM
+
+    resultados = []
+    pilha = [(node, 0)]
+    while pilha:
+        node, etapa = pilha.pop()
+        if node is None:
+            resultados.append(NENHUM)
+            continue
+        op = node.op
+
+        # --------- chamada de função: node.op == "call" ---------
+        # etapa k > 0: o argumento k-1 acabou de ser gerado
+        if op == "call":
+            args = getattr(node, "args", None) or ()
+            if etapa > 0:
+                codigo.emitir(OP_PARAM, arg1=resultados.pop())
+            if etapa < len(args):
+                pilha.append((node, etapa + 1))
+                pilha.append((args[etapa], 0))
+                continue
+            # Call propriamente dito: tmp = call func
+            tmp = codigo.novo_temp()
+            codigo.emitir(OP_CALL, tmp, codigo.operando(FUNCAO, node.valor))
+            resultados.append(tmp)
+            continue
 
-    Usado na geração de código para desvios condicionais e laços.
-    """
-    global label_counter
-    l = f"L{label_counter}"
-    label_counter += 1
-    return l
+        # --------- folhas: literais e identificadores ---------
+        if op in ("int", "float", "string", "id", "null"):
+            # identificador: o valor já está na variável
+            if op == "id":
+                resultados.append(codigo.variavel(node.operando))
+            # literais: coloca em um temporário
+            else:
+                t = codigo.novo_temp()
+                codigo.emitir(OP_COPIA, t, codigo.operando(CLASSE_LITERAL[op], node.valor))
+                resultados.append(t)
+            continue
 
+        # --------- operador unário (+x, -x) ---------
+        if op.startswith("unary"):
+            if etapa == 0:
+                pilha.append((node, 1))
+                pilha.append((node.left, 0))
+                continue
+            t = resultados.pop()
+            tmp = codigo.novo_temp()
+            codigo.emitir(OP_UNARIO[op], tmp, t)
+            resultados.append(tmp)
+            continue
 
-def gerar_expr(node, codigo):
-    """
-    Gera código de 3 endereços para a árvore de expressão 'node'.
+        # --------- operadores binários (+, -, *, /, %, comparações etc.) ---------
+        if etapa == 0:
+            # o esquerdo é gerado antes do direito (topo da pilha)
+            pilha.append((node, 1))
+            pilha.append((node.right, 0))
+            pilha.append((node.left, 0))
+            continue
+        right = resultados.pop()
+        left = resultados.pop()
+        tmp = codigo.novo_temp()
+        codigo.emitir(OP_BINARIO[op], tmp, left, right)
+        resultados.append(tmp)
 
-    Parâmetros:
-        node  : nó ExprNode representando a expressão
-        codigo: lista de strings onde as instruções geradas serão acrescentadas
+    return resultados[0]
 
-    Retorna:
-        O nome da variável (ou temporário) que contém o resultado da expressão.
+
+def gerar_expr_recursiva(node, codigo):
+    """
+    Mesmo código de gerar_expr, com uma chamada recursiva por subárvore
+    (referência e comparação em bench_expressoes.py).
     """
     if node is None:
-        return None
+        return NENHUM
 
     # --------- chamada de função: node.op == "call" ---------
     if node.op == "call":
         # Gera código para os argumentos (param arg)
         if getattr(node, "args", None):
             for arg in node.args:
-                t_arg = gerar_expr(arg, codigo)
-                codigo.append(f"param {t_arg}")
+                t_arg = gerar_expr_recursiva(arg, codigo)
+                codigo.emitir(OP_PARAM, arg1=t_arg)
 
         # Call propriamente dito: tmp = call func
-        tmp = novo_temp()
-        codigo.append(f"{tmp} = call {node.valor}")
+        tmp = codigo.novo_temp()
+        codigo.emitir(OP_CALL, tmp, codigo.operando(FUNCAO, node.valor))
         return tmp
 
     # --------- folhas: literais e identificadores ---------
     if node.op in ("int", "float", "string", "id", "null"):
         # identificador: o valor já está na variável
         if node.op == "id":
-            return node.valor
+            return codigo.variavel(node.operando)
         # literais: coloca em um temporário
         else:
-            t = novo_temp()
-            codigo.append(f"{t} = {node.valor}")
+            t = codigo.novo_temp()
+            codigo.emitir(OP_COPIA, t, codigo.operando(CLASSE_LITERAL[node.op], node.valor))
             return t
 
     # --------- operador unário (+x, -x) ---------
     if node.op.startswith("unary"):
-        t = gerar_expr(node.left, codigo)
-        tmp = novo_temp()
-        # A forma "unary+" / "unary-" é mantida na string, apenas
-        # como representação do operador unário.
-        codigo.append(f"{tmp} = {node.op}{t}")
+        t = gerar_expr_recursiva(node.left, codigo)
+        tmp = codigo.novo_temp()
+        codigo.emitir(OP_UNARIO[node.op], tmp, t)
         return tmp
 
     # --------- operadores binários (+, -, *, /, %, comparações etc.) ---------
-    left = gerar_expr(node.left, codigo)
-    right = gerar_expr(node.right, codigo)
-    tmp = novo_temp()
-    codigo.append(f"{tmp} = {left} {node.op} {right}")
+    left = gerar_expr_recursiva(node.left, codigo)
+    right = gerar_expr_recursiva(node.right, codigo)
+    tmp = codigo.novo_temp()
+    codigo.emitir(OP_BINARIO[node.op], tmp, left, right)
     return tmp
 
 
-def encontrar_fim_statement(tokens, inicio, fim):
+def encontrar_fim_statement(tokens, inicio, fim, pares):
     """
     Dado o índice 'inicio' do primeiro token de um STATEMENT,
     devolve o índice logo após o fim desse STATEMENT
-    (parâmetro 'fim' é exclusivo).
+    (parâmetro 'fim' é exclusivo). Blocos e parênteses são saltados
+    em O(1) pelo índice de delimitadores casados 'pares'.
 
     É análogo à função com o mesmo nome no módulo semântico, mas
     usada aqui especificamente para delimitar regiões de código
-    durante a geração intermediária.
+    durante a geração intermediária. Como lá, as cadeias de if/for sem
+    chaves são seguidas com uma pilha explícita ('pendentes').
     """
+    pendentes = []
     k = inicio
-    if k >= fim:
-        return fim
-
-    tok0 = tokens[k]
-
-    # Bloco: { STATELIST }
-    if tok0.tipo == "{":
-        nivel = 1
-        k += 1
-        while k < fim and nivel > 0:
-            if tokens[k].tipo == "{":
-                nivel += 1
-            elif tokens[k].tipo == "}":
-                nivel -= 1
-            k += 1
-        return k  # logo após '}'
-
-    # if ( EXPRESSION ) STATEMENT [else STATEMENT]
-    if tok0.tipo == "if":
-        j = k + 1
-        # acha '('
-        while j < fim and tokens[j].tipo != "(":
-            j += 1
-        if j >= fim:
-            return fim
-        j += 1  # pula '('
-
-        # pula a EXPRESSAO até o ')'
-        nivel_paren = 1
-        while j < fim and nivel_paren > 0:
-            if tokens[j].tipo == "(":
-                nivel_paren += 1
-            elif tokens[j].tipo == ")":
-                nivel_paren -= 1
-            j += 1
-
-        # STATEMENT do if
-        body_start = j
-        body_end = encontrar_fim_statement(tokens, body_start, fim)
-        k = body_end
-
-        # verifica se tem else
-        if k < fim and tokens[k].tipo == "else":
-            k2 = encontrar_fim_statement(tokens, k + 1, fim)
-            k = k2
-
-        return k
-
-    # for( ATRIBSTAT ; EXPRESSION ; ATRIBSTAT ) STATEMENT
-    if tok0.tipo == "for":
-        j = k + 1
-        while j < fim and tokens[j].tipo != "(":
-            j += 1
-        if j >= fim:
-            return fim
-        j += 1
-
-        # pula cabeçalho do for até ')'
-        nivel_paren = 1
-        while j < fim and nivel_paren > 0:
-            if tokens[j].tipo == "(":
-                nivel_paren += 1
-            elif tokens[j].tipo == ")":
-                nivel_paren -= 1
-            j += 1
-
-        body_start = j
-        body_end = encontrar_fim_statement(tokens, body_start, fim)
-        return body_end
-
-    # Comandos simples -> vão até o próximo ';'
-    while k < fim and tokens[k].tipo != ";":
-        k += 1
-    if k < fim:
-        return k + 1
-    return k
-
-
-def gerar_atribuicao_fragmento(tokens, inicio, fim, tabela_simbolos, escopo, codigo):
+    while True:
+        # k é o início de um STATEMENT
+        if k >= fim:
+            k = fim
+        elif tokens[k].tipo == "{":
+            # Bloco: { STATELIST }
+            k = fechamento(pares, k, fim) + 1  # logo após '}'
+        elif tokens[k].tipo in ("if", "for"):
+            # if ( EXPRESSION ) STATEMENT [else STATEMENT]
+            # for( ATRIBSTAT ; EXPRESSION ; ATRIBSTAT ) STATEMENT
+            j = k + 1
+            # acha '('
+            while j < fim and tokens[j].tipo != "(":
+                j += 1
+            if j >= fim:
+                k = fim
+            else:
+                # STATEMENT do if/for, logo após o ')' do cabeçalho
+                pendentes.append(tokens[k].tipo)
+                k = fechamento(pares, j, fim) + 1
+                continue
+        else:
+            # Comandos simples -> vão até o próximo ';'
+            while k < fim and tokens[k].tipo != ";":
+                k += 1
+            if k < fim:
+                k += 1
+
+        # k é o fim de um STATEMENT: termina os if/for pendentes
+        while pendentes:
+            # verifica se o if tem else
+            if pendentes.pop() == "if" and k < fim and tokens[k].tipo == "else":
+                pendentes.append("else")
+                k += 1
+                break
+        else:
+            return k
+
+
+def gerar_atribuicao_fragmento(tokens, inicio, fim, tabela_simbolos, escopo, codigo, cache):
     """
     Gera código para um fragmento que *deveria* ser um ATRIBSTAT (sem ';'),
     típico de cabeçalho de for:  i = 0   ou   i = i + 1.
 
     Se o fragmento não for exatamente uma atribuição (por exemplo, for apenas
-    uma expressão), a função gera o código intermediário correspondente
-    chamando parse_expression e gerar_expr.
+    uma expressão), a árvore da expressão é obtida do cache de expressões
+    (CacheExpressoes.analisar) e o código é gerado com gerar_expr.
+
+    Uma atribuição a um elemento de vetor (v[i] = ...) não gera código,
+    como o comando de atribuição: as quádruplas não têm operações sobre
+    vetores.
     """
     if inicio >= fim:
         return
@@ -210,17 +235,16 @@ def gerar_atribuicao_fragmento(tokens, inicio, fim, tabela_simbolos, escopo, cod
     # Esperando algo do tipo: ident ... = EXPRESSAO
     if tokens[inicio].tipo != "ident":
         # Não é atribuição: trata como expressão "solta"
-        node, _ = parse_expression(tokens[inicio:fim], 0, tabela_simbolos, escopo)
+        node, _ = cache.analisar(tokens, inicio, tabela_simbolos, escopo, fim)
         gerar_expr(node, codigo)
         return
 
     i = inicio
-    ident_tok = tokens[i]
-    idx_ts = ident_tok.valor
-    nome = tabela_simbolos[idx_ts][0]
+    simbolo = escopo.resolver(tokens, i)
     i += 1
 
     # Pula possíveis índices [ NUMEXPRESSION ] (acesso a vetores)
+    indexado = i < fim and tokens[i].tipo == "["
     while i < fim and tokens[i].tipo == "[":
         # Para simplificar, só pulamos até o ']'
         i += 1
@@ -231,312 +255,631 @@ def gerar_atribuicao_fragmento(tokens, inicio, fim, tabela_simbolos, escopo, cod
 
     if i >= fim or tokens[i].tipo != "=":
         # Não achou '=', trata como expressão simples
-        node, _ = parse_expression(tokens[inicio:fim], 0, tabela_simbolos, escopo)
+        node, _ = cache.analisar(tokens, inicio, tabela_simbolos, escopo, fim)
         gerar_expr(node, codigo)
         return
 
-    # RHS (lado direito) da atribuição
-    rhs_tokens = tokens[i+1:fim]
-    if not rhs_tokens:
+    # RHS (lado direito) da atribuição: tokens[i+1:fim]
+    if indexado or i + 1 >= fim:
         return
 
-    node, _ = parse_expression(rhs_tokens, 0, tabela_simbolos, escopo)
+    node, _ = cache.analisar(tokens, i + 1, tabela_simbolos, escopo, fim)
     t = gerar_expr(node, codigo)
-    codigo.append(f"{nome} = {t}")
+    codigo.emitir(OP_COPIA, codigo.variavel(simbolo.operando), t)
+
+
+# Tarefas pendentes de gerar_comandos (primeiro campo de cada tarefa)
+TAREFA_LISTA = 0        # (TAREFA_LISTA, fim): comandos do cursor até fim
+TAREFA_COMANDO = 1      # (TAREFA_COMANDO, fim): um único comando a partir do cursor
+TAREFA_FIM_FUNCAO = 2   # (TAREFA_FIM_FUNCAO, funcao): fim do corpo de uma def
+TAREFA_SENAO = 3        # (TAREFA_SENAO, label_false, fim): else do if, se houver
+TAREFA_ROTULO = 4       # (TAREFA_ROTULO, label): rótulo de saída do else
+TAREFA_FIM_FOR = 5      # (TAREFA_FIM_FOR, step_start, step_end, escopo,
+                        #  label_ini, label_fim): passo e saída do laço
 
 
 def gerar_comandos(tokens, tabela_simbolos, escopo_por_token,
-                   inicio, fim, codigo, pilha_loops):
+                   inicio, fim, codigo, pilha_loops, cache, pares):
     """
     Gera o código intermediário para o intervalo [inicio, fim) de tokens.
 
     Parâmetros:
         tokens          : lista de tokens do programa
         tabela_simbolos : tabela léxica (para obter o nome de ident pelo índice)
-        escopo_por_token: lista de escopos calculada no semântico
+        escopo_por_token: IndiceEscopos (posição -> Escopo) calculado no
+                          semântico
         inicio, fim     : intervalo de tokens a processar
-        codigo          : lista de strings onde as instruções serão acumuladas
+        codigo          : CodigoIntermediario onde as instruções são acumuladas
         pilha_loops     : pilha de labels de saída de laços (para break)
+        cache           : CacheExpressoes com as árvores já analisadas
+        pares           : índice de delimitadores casados (casar_delimitadores)
+
+    Os tokens são percorridos uma única vez, da esquerda para a direita,
+    por um cursor (i). Ao encontrar uma def, um if ou um for, o que falta
+    fazer depois do corpo (continuar a lista de comandos, o else, o passo
+    do laço, os rótulos) vai para a pilha 'pendentes', e o corpo é gerado
+    em seguida; o fim do corpo é onde o cursor para. Assim não há
+    recursão nem é preciso calcular antes onde cada comando termina: o
+    tempo é linear no número de tokens, qualquer que seja o aninhamento.
     """
 
-    # Escopo "global"/padrão de fallback:
-    # primeiro escopo não-None encontrado em escopo_por_token
-    escopo_padrao = None
-    for e in escopo_por_token:
-        if e is not None:
-            escopo_padrao = e
-            break
+    # Escopo "global"/padrão de fallback, informado pelo semântico
+    escopo_padrao = escopo_por_token.padrao
 
     i = inicio
-    while i < fim:
-        tok = tokens[i]
-
-        # Se escopo_por_token[i] for None (ex.: cabeçalho de função),
-        # usa escopo_padrao (global ou mais externo).
-        escopo_corrente = escopo_por_token[i] or escopo_padrao
+    escopo_trecho, fim_trecho = None, 0
+    pendentes = [(TAREFA_LISTA, fim)]
+    while pendentes:
+        tarefa = pendentes.pop()
+        acao = tarefa[0]
 
         # -------------------------------------------------
-        # 0) Chamada de função como comando:
-        #    func( ... );
-        #    (sem precisar de dummy = ...)
+        # Tarefas pendentes após o corpo de uma def, if ou for
         # -------------------------------------------------
-        if tok.tipo == "ident" and i + 1 < fim and tokens[i + 1].tipo == "(":
-            # Evita confundir 'def nome(...)' com chamada de função
-            if i > inicio and tokens[i - 1].tipo == "def":
-                i += 1
-                continue
+        if acao == TAREFA_FIM_FUNCAO:
+            tarefa[1].fim = len(codigo)
+            continue
 
-            # Junta todos os tokens até o ';' para montar a expressão
-            j = i
-            expr_tokens = []
-            while j < fim and tokens[j].tipo != ";":
-                expr_tokens.append(tokens[j])
-                j += 1
+        if acao == TAREFA_SENAO:
+            _, label_false, fim = tarefa
+            # O cursor está logo após o corpo do if
+            if i < fim and tokens[i].tipo == "else":
+                label_end = codigo.novo_label()
+                # Se entrou no if, pula o else
+                codigo.emitir(OP_GOTO, arg1=label_end)
+                # Label para o caso de condição falsa
+                codigo.emitir(OP_ROTULO, arg1=label_false)
+                i += 1
+                pendentes.append((TAREFA_ROTULO, label_end))
+                pendentes.append((TAREFA_COMANDO, fim))
+            else:
+                # if sem else
+                codigo.emitir(OP_ROTULO, arg1=label_false)
+            continue
 
-            if j >= fim:
-                raise Exception("';' esperado ao final da chamada de função")
+        if acao == TAREFA_ROTULO:
+            codigo.emitir(OP_ROTULO, arg1=tarefa[1])
+            continue
 
-            if expr_tokens:
-                node, _ = parse_expression(expr_tokens, 0,
-                                           tabela_simbolos, escopo_corrente)
-                # gerar_expr já sabe lidar com node.op == "call"
-                gerar_expr(node, codigo)
+        if acao == TAREFA_FIM_FOR:
+            _, step_start, step_end, escopo_for, label_ini, label_fim = tarefa
+            # Após o corpo: passo (step)
+            if step_start < step_end:
+                gerar_atribuicao_fragmento(tokens, step_start, step_end,
+                                           tabela_simbolos, escopo_for, codigo, cache)
 
-            i = j + 1   # avança para depois do ';'
+            # Volta ao início e depois label de saída
+            codigo.emitir(OP_GOTO, arg1=label_ini)
+            codigo.emitir(OP_ROTULO, arg1=label_fim)
+            pilha_loops.pop()
             continue
 
         # -------------------------------------------------
-        # 1) ATRIBUIÇÃO simples: ident ... = EXPRESSAO ;
+        # Comandos: uma lista até 'fim' ou um único comando (corpo de
+        # if, else ou for). Um corpo que não é if nem for é tratado como
+        # a lista de tokens até o seu fim (bloco { } ou até o ';').
         # -------------------------------------------------
-        if tok.tipo == "ident" and i + 1 < fim and tokens[i+1].tipo == "=":
-            nome = tabela_simbolos[tok.valor][0]
+        fim = tarefa[1]
+        unico = acao == TAREFA_COMANDO
+        if unico:
+            if i >= fim:
+                continue
+            if tokens[i].tipo not in ("if", "for"):
+                pendentes.append((TAREFA_LISTA, encontrar_fim_statement(tokens, i, fim, pares)))
+                continue
 
-            j = i + 2
-            expr_tokens = []
-            while j < fim and tokens[j].tipo != ";":
-                expr_tokens.append(tokens[j])
-                j += 1
+        while i < fim:
+            tok = tokens[i]
+
+            # Se o escopo de i for None (ex.: cabeçalho de função), usa
+            # escopo_padrao (global). O índice só é consultado quando i sai do
+            # trecho do escopo anterior.
+            if i >= fim_trecho:
+                escopo_trecho, fim_trecho = escopo_por_token.trecho(i)
+            escopo_corrente = escopo_trecho or escopo_padrao
+
+            # -------------------------------------------------
+            # 0) Definição de função:
+            #    def ident ( PARAMLIST ) { STATELIST }
+            #    O corpo é gerado normalmente; o trecho do código que ele
+            #    ocupa é registrado em codigo.funcoes.
+            # -------------------------------------------------
+            if tok.tipo == "def":
+                nome = tabela_simbolos[tokens[i + 1].valor][0]
+                fecha_parametros = fechamento(pares, i + 2, fim)  # posição do ')'
+                parametros = [tabela_simbolos[tokens[k].valor][0]
+                              for k in range(i + 3, fecha_parametros)
+                              if tokens[k].tipo == "ident"]
+                fecha_corpo = fechamento(pares, fecha_parametros + 1, fim)  # '}'
+
+                funcao = codigo.iniciar_funcao(nome, parametros)
+                pendentes.append((TAREFA_LISTA, fim))
+                pendentes.append((TAREFA_FIM_FUNCAO, funcao))
+                pendentes.append((TAREFA_LISTA, fecha_corpo + 1))
+                i = fecha_parametros + 1
+                break
+
+            # -------------------------------------------------
+            # 0.1) Chamada de função como comando:
+            #      func( ... );
+            #      (sem precisar de dummy = ...)
+            # -------------------------------------------------
+            if tok.tipo == "ident" and i + 1 < fim and tokens[i + 1].tipo == "(":
+                # A expressão vai até o ';'
+                j = i
+                while j < fim and tokens[j].tipo != ";":
+                    j += 1
+
+                if j >= fim:
+                    raise Exception("';' esperado ao final da chamada de função")
+
+                if i < j:
+                    node, _ = cache.analisar(tokens, i,
+                                               tabela_simbolos, escopo_corrente, j)
+                    # gerar_expr já sabe lidar com node.op == "call"
+                    gerar_expr(node, codigo)
+
+                i = j + 1   # avança para depois do ';'
+                continue
 
-            if expr_tokens:
-                node, _ = parse_expression(expr_tokens, 0, tabela_simbolos, escopo_corrente)
-                t = gerar_expr(node, codigo)
-                codigo.append(f"{nome} = {t}")
+            # -------------------------------------------------
+            # 1) ATRIBUIÇÃO simples: ident ... = EXPRESSAO ;
+            # -------------------------------------------------
+            if tok.tipo == "ident" and i + 1 < fim and tokens[i+1].tipo == "=":
+                simbolo = escopo_corrente.resolver(tokens, i)
 
-            i = j + 1  # após ';'
-            continue
+                j = i + 2
+                while j < fim and tokens[j].tipo != ";":
+                    j += 1
 
-        # -------------------------------------------------
-        # 2) print EXPRESSAO;
-        # -------------------------------------------------
-        if tok.tipo == "print":
-            j = i + 1
-            expr_tokens = []
-            while j < fim and tokens[j].tipo != ";":
-                expr_tokens.append(tokens[j])
-                j += 1
+                if i + 2 < j:
+                    node, _ = cache.analisar(tokens, i + 2, tabela_simbolos,
+                                               escopo_corrente, j)
+                    t = gerar_expr(node, codigo)
+                    codigo.emitir(OP_COPIA, codigo.variavel(simbolo.operando), t)
 
-            if expr_tokens:
-                node, _ = parse_expression(expr_tokens, 0, tabela_simbolos, escopo_corrente)
-                t = gerar_expr(node, codigo)
-                codigo.append(f"print {t}")
+                i = j + 1  # após ';'
+                continue
 
-            i = j + 1
-            continue
+            # -------------------------------------------------
+            # 2) print EXPRESSAO;
+            # -------------------------------------------------
+            if tok.tipo == "print":
+                j = i + 1
+                while j < fim and tokens[j].tipo != ";":
+                    j += 1
+
+                if i + 1 < j:
+                    node, _ = cache.analisar(tokens, i + 1, tabela_simbolos,
+                                               escopo_corrente, j)
+                    t = gerar_expr(node, codigo)
+                    codigo.emitir(OP_PRINT, arg1=t)
+
+                i = j + 1
+                continue
 
-        # -------------------------------------------------
-        # 3) if ( EXPRESSAO ) STATEMENT [else STATEMENT]
-        # -------------------------------------------------
-        if tok.tipo == "if":
-            j = i + 1
-            # acha '('
-            while j < fim and tokens[j].tipo != "(":
-                j += 1
-            if j >= fim:
-                raise SemanticError(f"'(' esperado após 'if' (linha {tok.l}, coluna {tok.c})")
-            j += 1  # pula '('
-
-            # EXPRESSAO até ')'
-            start_expr = j
-            nivel_paren = 1
-            while j < fim and nivel_paren > 0:
-                if tokens[j].tipo == "(":
-                    nivel_paren += 1
-                elif tokens[j].tipo == ")":
-                    nivel_paren -= 1
-                j += 1
-            end_expr = j - 1  # posição do ')'
+            # -------------------------------------------------
+            # 3) if ( EXPRESSAO ) STATEMENT [else STATEMENT]
+            # -------------------------------------------------
+            if tok.tipo == "if":
+                j = i + 1
+                # acha '('
+                while j < fim and tokens[j].tipo != "(":
+                    j += 1
+                if j >= fim:
+                    raise SemanticError(f"'(' esperado após 'if' (linha {tok.l}, coluna {tok.c})")
+
+                # EXPRESSAO até ')'
+                start_expr = j + 1
+                end_expr = fechamento(pares, j, fim)  # posição do ')'
+
+                node, _ = cache.analisar(tokens, start_expr, tabela_simbolos,
+                                         escopo_corrente, end_expr)
+                t_cond = gerar_expr(node, codigo)
 
-            expr_tokens = tokens[start_expr:end_expr]
-            node, _ = parse_expression(expr_tokens, 0, tabela_simbolos, escopo_corrente)
-            t_cond = gerar_expr(node, codigo)
+                # Desvio se a condição for falsa
+                label_false = codigo.novo_label()
+                codigo.emitir(OP_SE_FALSO, arg1=t_cond, arg2=label_false)
+
+                # STATEMENT do if começa logo após o ')'; depois dele, o
+                # else (TAREFA_SENAO) e o restante da lista
+                if not unico:
+                    pendentes.append((TAREFA_LISTA, fim))
+                pendentes.append((TAREFA_SENAO, label_false, fim))
+                pendentes.append((TAREFA_COMANDO, fim))
+                i = end_expr + 1
+                break
+
+            # -------------------------------------------------
+            # 4) for( ATRIBSTAT ; EXPRESSAO ; ATRIBSTAT ) STATEMENT
+            # -------------------------------------------------
+            if tok.tipo == "for":
+                j = i + 1
+                while j < fim and tokens[j].tipo != "(":
+                    j += 1
+                if j >= fim:
+                    raise SemanticError(f"'(' esperado após 'for' (linha {tok.l}, coluna {tok.c})")
+                fecha_cabecalho = fechamento(pares, j, fim)  # posição do ')'
+                j += 1  # após '('
+
+                # init: ATRIBSTAT até o primeiro ';'
+                init_start = j
+                while j < fim and tokens[j].tipo != ";":
+                    j += 1
+                init_end = j  # posição do ';'
+                gerar_atribuicao_fragmento(tokens, init_start, init_end,
+                                           tabela_simbolos, escopo_corrente, codigo, cache)
+                j += 1  # após ';'
+
+                # cond: EXPRESSAO até o segundo ';'
+                cond_start = j
+                while j < fim and tokens[j].tipo != ";":
+                    j += 1
+                cond_end = j
+
+                # step: ATRIBSTAT até ')'
+                j += 1  # após ';'
+                step_start = j
+                step_end = fecha_cabecalho  # posição do ')'
+
+                # Labels do laço
+                label_ini = codigo.novo_label()
+                label_fim = codigo.novo_label()
+
+                # Início do laço
+                codigo.emitir(OP_ROTULO, arg1=label_ini)
+                if cond_start < cond_end:
+                    node, _ = cache.analisar(tokens, cond_start, tabela_simbolos,
+                                             escopo_corrente, cond_end)
+                    t_cond = gerar_expr(node, codigo)
+                    codigo.emitir(OP_SE_FALSO, arg1=t_cond, arg2=label_fim)
+
+                # Empilha label de saída para 'break;'
+                pilha_loops.append(label_fim)
+
+                # STATEMENT (corpo, bloco ou comando simples) começa logo
+                # após o ')'; depois dele, o passo e a saída do laço
+                if not unico:
+                    pendentes.append((TAREFA_LISTA, fim))
+                pendentes.append((TAREFA_FIM_FOR, step_start, step_end, escopo_corrente,
+                                  label_ini, label_fim))
+                pendentes.append((TAREFA_COMANDO, fim))
+                i = step_end + 1
+                break
+
+            # -------------------------------------------------
+            # 5) break;
+            # -------------------------------------------------
+            if tok.tipo == "break":
+                if pilha_loops:
+                    label_saida = pilha_loops[-1]
+                    codigo.emitir(OP_GOTO, arg1=label_saida)
+                # pula até o próximo ';'
+                j = i + 1
+                while j < fim and tokens[j].tipo != ";":
+                    j += 1
+                i = j + 1
+                continue
 
-            # Desvio se a condição for falsa
-            label_false = novo_label()
-            codigo.append(f"if not {t_cond} goto {label_false}")
+            # -------------------------------------------------
+            # Outros comandos (declarações, read, return etc.)
+            # por enquanto são ignorados na geração de código.
+            # -------------------------------------------------
+            i += 1
 
-            # STATEMENT do if começa em j
-            body_start = j
-            body_end = encontrar_fim_statement(tokens, body_start, fim)
 
-            # Gera código do corpo do if
-            gerar_comandos(tokens, tabela_simbolos, escopo_por_token,
-                           body_start, body_end, codigo, pilha_loops)
+def analisador_intermediario(tokens, tabela_simbolos, escopo_por_token, cache=None, pares=None,
+                             processos=None, partes=None, relatorio=None):
+    """
+    Função de alto nível para geração do código intermediário.
 
-            # Verifica se há 'else'
-            if body_end < fim and tokens[body_end].tipo == "else":
-                label_end = novo_label()
-                # Se entrou no if, pula o else
-                codigo.append(f"goto {label_end}")
-                # Label para o caso de condição falsa
-                codigo.append(f"{label_false}:")
-                else_start = body_end + 1
-                else_end = encontrar_fim_statement(tokens, else_start, fim)
-                gerar_comandos(tokens, tabela_simbolos, escopo_por_token,
-                               else_start, else_end, codigo, pilha_loops)
-                codigo.append(f"{label_end}:")
-                i = else_end
+    Parâmetros:
+        tokens          : lista de tokens do programa
+        tabela_simbolos : tabela léxica gerada no léxico
+        escopo_por_token: IndiceEscopos (posição -> Escopo) do semântico
+        cache           : CacheExpressoes preenchido pelo semântico (opcional)
+        pares           : índice de delimitadores casados (calculado se omitido)
+        processos       : se informado, gera o código por unidade (cada
+                          'def'), distribuindo as unidades entre esse número
+                          de processos (ver gerar_por_unidades)
+        partes          : código já gerado de algumas unidades (cache
+                          incremental); também ativa a geração por unidade
+        relatorio       : Relatorio que recebe o código gerado (padrão:
+                          saída padrão)
+
+    A função:
+        - inicializa a estrutura de código e pilha de laços
+        - invoca gerar_comandos sobre todo o programa
+        - insere um 'return' geral ao final
+        - registra o código gerado em 'relatorio'
+
+    Retorna:
+        o CodigoIntermediario (quádruplas) gerado.
+    """
+    if cache is None:
+        cache = CacheExpressoes()
+    if pares is None:
+        pares = casar_delimitadores(tokens)
+    if relatorio is None:
+        relatorio = SAIDA_PADRAO
+
+    if processos is not None or partes is not None:
+        codigo = gerar_por_unidades(tokens, tabela_simbolos, escopo_por_token,
+                                    cache, pares, processos, partes)
+    else:
+        codigo = CodigoIntermediario()
+        pilha_loops = []
+
+        gerar_comandos(tokens, tabela_simbolos, escopo_por_token,
+                       0, len(tokens), codigo, pilha_loops, cache, pares)
+
+    # Um "return" geral no fim do programa (encerramento)
+    codigo.emitir(OP_RETURN)
+
+    imprimir_codigo(codigo, relatorio=relatorio)
+    return codigo
+
+
+# ----------------------------------------------------------------------
+# Geração por unidades (uma por função), opcionalmente em paralelo
+# ----------------------------------------------------------------------
+#
+# Cada 'def ... { ... }' é uma unidade de geração independente: o seu
+# código é gerado num CodigoIntermediario próprio, com temporários e
+# rótulos locais (a partir de t0 e L0). As unidades podem então ser
+# distribuídas entre processos; a junção (CodigoIntermediario.anexar),
+# sempre na ordem do programa, renumera temporários e rótulos, de modo
+# que o resultado não depende do número de processos e é idêntico ao da
+# geração sequencial.
+
+def unidades_de_geracao(tokens, pares):
+    """
+    Divide o programa em unidades de geração.
+
+    Retorna:
+        lista de intervalos (inicio, fim) de tokens: um para cada 'def'
+        (do 'def' ao '}' do corpo, inclusive) e um para cada trecho de
+        tokens fora de funções
+    """
+    n = len(tokens)
+    unidades = []
+    comeco = 0
+    i = 0
+    while i < n:
+        if tokens[i].tipo == "def":
+            if comeco < i:
+                unidades.append((comeco, i))
+            fecha_parametros = fechamento(pares, i + 2, n)
+            fecha_corpo = fechamento(pares, fecha_parametros + 1, n)
+            unidades.append((i, fecha_corpo + 1))
+            i = comeco = fecha_corpo + 1
+        else:
+            i += 1
+    if comeco < n:
+        unidades.append((comeco, n))
+    return unidades
+
+
+def gerar_unidades(tokens, tabela_simbolos, escopo_por_token, cache, pares, intervalos):
+    """
+    Gera o código de cada intervalo de 'intervalos' num CodigoIntermediario
+    próprio.
+
+    Retorna:
+        (lista de CodigoIntermediario, acertos, falhas), com os acertos e
+        falhas do cache de expressões durante esta geração
+    """
+    acertos, falhas = cache.acertos, cache.falhas
+    partes = []
+    for inicio, fim in intervalos:
+        parte = CodigoIntermediario()
+        gerar_comandos(tokens, tabela_simbolos, escopo_por_token,
+                       inicio, fim, parte, [], cache, pares)
+        partes.append(parte)
+    return partes, cache.acertos - acertos, cache.falhas - falhas
+
+
+def gerar_lote(tabela_simbolos, lote):
+    """
+    Gera o código de um lote de unidades num processo de --paralelo.
+
+    'lote' é (tokens, estado, intervalos), preparado por gerar_por_unidades:
+    os tokens do lote (TokenStream), o seu estado semântico plano
+    (semantico.achatar_estado) e as unidades, com posições relativas ao
+    primeiro token do lote. Os delimitadores são casados de novo aqui.
+
+    Retorna o mesmo que gerar_unidades.
+    """
+    tokens, estado, intervalos = lote
+    escopo_por_token, cache = restaurar_estado(estado)
+    return gerar_unidades(tokens, tabela_simbolos, escopo_por_token, cache,
+                          casar_delimitadores(tokens), intervalos)
+
+
+def gerar_por_unidades(tokens, tabela_simbolos, escopo_por_token, cache, pares, processos,
+                       partes=None):
+    """
+    Gera o código unidade por unidade (unidades_de_geracao) e junta as
+    partes na ordem do programa.
+
+    Com processos > 1, as unidades são divididas em lotes contíguos, um
+    por processo, executados num ProcessPoolExecutor (gerar_lote). Cada
+    tarefa recebe só os tokens do próprio lote (como TokenStream, bem mais
+    barato de serializar que uma lista de Token) e o estado semântico
+    dessas posições em forma plana (semantico.achatar_estado), e não os
+    escopos e o cache do programa inteiro. Os acertos e falhas do cache
+    nos processos são somados aos de 'cache'.
+
+    'partes' (opcional) é um dicionário intervalo (inicio, fim) ->
+    CodigoIntermediario de unidades já geradas (cache incremental): essas
+    não são geradas de novo, e as que forem geradas são acrescentadas a
+    ele.
+    """
+    intervalos = unidades_de_geracao(tokens, pares)
+    if partes is None:
+        partes = {}
+    faltando = [intervalo for intervalo in intervalos if intervalo not in partes]
+
+    if processos is None or processos <= 1 or len(faltando) <= 1:
+        geradas, _, _ = gerar_unidades(tokens, tabela_simbolos, escopo_por_token,
+                                       cache, pares, faltando)
+    else:
+        tamanho = -(-len(faltando) // processos)
+        lotes = []
+        for k in range(0, len(faltando), tamanho):
+            unidades = faltando[k:k + tamanho]
+            inicio, fim = unidades[0][0], unidades[-1][1]
+            tokens_lote = tokens[inicio:fim]
+            if not isinstance(tokens_lote, TokenStream):
+                tokens_lote = TokenStream(tokens_lote)
+            lotes.append((
+                tokens_lote,
+                achatar_estado(escopo_por_token, cache, inicio, fim),
+                [(a - inicio, b - inicio) for a, b in unidades],
+            ))
+        geradas = []
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            resultados = executor.map(gerar_lote, repeat(tabela_simbolos), lotes)
+            for partes_lote, acertos, falhas in resultados:
+                geradas.extend(partes_lote)
+                cache.acertos += acertos
+                cache.falhas += falhas
+
+    partes.update(zip(faltando, geradas))
+
+    codigo = CodigoIntermediario()
+    for intervalo in intervalos:
+        codigo.anexar(partes[intervalo])
+    return codigo
+
+
+# ----------------------------------------------------------------------
+# Geração de código a partir da AST (arvore.py)
+# ----------------------------------------------------------------------
+#
+# Percorre a árvore já verificada por semantico.analisador_semantico_ast.
+# As árvores de expressão da AST já estão anotadas com tipos, de modo que
+# nenhuma expressão é reanalisada; o código produzido é o mesmo de
+# gerar_comandos (mesma ordem de temporários e rótulos).
+
+def gerar_comandos_ast(no, tokens, tabela_simbolos, codigo, pilha_loops):
+    """
+    Gera o código intermediário de um comando da AST (e dos seus subcomandos).
+
+    Parâmetros:
+        no              : nó de comando (arvore.py)
+        tokens          : lista de tokens (para obter o ident de cada nó)
+        tabela_simbolos : tabela léxica (nome de cada ident)
+        codigo          : CodigoIntermediario onde as instruções são acumuladas
+        pilha_loops     : pilha de labels de saída de laços (para break)
+
+    Como em gerar_comandos, sem recursão: 'pendentes' guarda os nós ainda
+    não gerados e, como tuplas (TAREFA_SENAO, TAREFA_ROTULO,
+    TAREFA_FIM_FOR), o que falta emitir depois do corpo de um if ou for.
+    """
+    pendentes = [no]
+    while pendentes:
+        no = pendentes.pop()
+
+        if type(no) is tuple:
+            acao = no[0]
+            if acao == TAREFA_SENAO:
+                _, label_false, senao = no
+                if senao is not None:
+                    label_end = codigo.novo_label()
+                    codigo.emitir(OP_GOTO, arg1=label_end)
+                    codigo.emitir(OP_ROTULO, arg1=label_false)
+                    pendentes.append((TAREFA_ROTULO, label_end))
+                    pendentes.append(senao)
+                else:
+                    codigo.emitir(OP_ROTULO, arg1=label_false)
+            elif acao == TAREFA_ROTULO:
+                codigo.emitir(OP_ROTULO, arg1=no[1])
             else:
-                # if sem else
-                codigo.append(f"{label_false}:")
-                i = body_end
+                _, passo, label_ini, label_fim = no
+                gerar_atribuicao_ast(passo, tokens, tabela_simbolos, codigo)
+                codigo.emitir(OP_GOTO, arg1=label_ini)
+                codigo.emitir(OP_ROTULO, arg1=label_fim)
+                pilha_loops.pop()
             continue
 
-        # -------------------------------------------------
-        # 4) for( ATRIBSTAT ; EXPRESSAO ; ATRIBSTAT ) STATEMENT
-        # -------------------------------------------------
-        if tok.tipo == "for":
-            j = i + 1
-            while j < fim and tokens[j].tipo != "(":
-                j += 1
-            if j >= fim:
-                raise SemanticError(f"'(' esperado após 'for' (linha {tok.l}, coluna {tok.c})")
-            j += 1  # após '('
+        tipo_no = type(no).__name__
 
-            # init: ATRIBSTAT até o primeiro ';'
-            init_start = j
-            while j < fim and tokens[j].tipo != ";":
-                j += 1
-            init_end = j  # posição do ';'
-            gerar_atribuicao_fragmento(tokens, init_start, init_end,
-                                       tabela_simbolos, escopo_corrente, codigo)
-            j += 1  # após ';'
-
-            # cond: EXPRESSAO até o segundo ';'
-            cond_start = j
-            while j < fim and tokens[j].tipo != ";":
-                j += 1
-            cond_end = j
-            cond_tokens = tokens[cond_start:cond_end]
-
-            # step: ATRIBSTAT até ')'
-            j += 1  # após ';'
-            step_start = j
-            nivel_paren = 1
-            while j < fim and nivel_paren > 0:
-                if tokens[j].tipo == "(":
-                    nivel_paren += 1
-                elif tokens[j].tipo == ")":
-                    nivel_paren -= 1
-                j += 1
-            step_end = j - 1  # posição antes de ')'
-            step_tokens = tokens[step_start:step_end]
+        if tipo_no == "Bloco":
+            pendentes.extend(reversed(no.comandos))
 
-            # Labels do laço
-            label_ini = novo_label()
-            label_fim = novo_label()
+        elif tipo_no == "Atrib":
+            gerar_atribuicao_ast(no, tokens, tabela_simbolos, codigo)
 
-            # Início do laço
-            codigo.append(f"{label_ini}:")
-            if cond_tokens:
-                node, _ = parse_expression(cond_tokens, 0, tabela_simbolos, escopo_corrente)
-                t_cond = gerar_expr(node, codigo)
-                codigo.append(f"if not {t_cond} goto {label_fim}")
+        elif tipo_no == "Print":
+            t = gerar_expr(no.expr, codigo)
+            codigo.emitir(OP_PRINT, arg1=t)
 
-            # STATEMENT (corpo) começa em j (logo após ')')
-            body_start = j
+        elif tipo_no == "If":
+            t_cond = gerar_expr(no.cond, codigo)
 
-            # Empilha label de saída para 'break;'
-            pilha_loops.append(label_fim)
+            # Desvio se a condição for falsa
+            label_false = codigo.novo_label()
+            codigo.emitir(OP_SE_FALSO, arg1=t_cond, arg2=label_false)
 
-            # Corpo pode ser bloco ou comando simples
-            if body_start < fim and tokens[body_start].tipo == "{":
-                # Corpo é um bloco {...}
-                k = body_start + 1
-                nivel_chaves = 1
-                while k < fim and nivel_chaves > 0:
-                    if tokens[k].tipo == "{":
-                        nivel_chaves += 1
-                    elif tokens[k].tipo == "}":
-                        nivel_chaves -= 1
-                    k += 1
-                body_end = k - 1  # índice do '}'
-                gerar_comandos(tokens, tabela_simbolos, escopo_por_token,
-                               body_start + 1, body_end, codigo, pilha_loops)
-                i = k  # após '}'
-            else:
-                # STATEMENT simples
-                body_end = encontrar_fim_statement(tokens, body_start, fim)
-                gerar_comandos(tokens, tabela_simbolos, escopo_por_token,
-                               body_start, body_end, codigo, pilha_loops)
-                i = body_end
+            pendentes.append((TAREFA_SENAO, label_false, no.senao))
+            pendentes.append(no.entao)
 
-            # Após o corpo: passo (step)
-            if step_tokens:
-                gerar_atribuicao_fragmento(step_tokens, 0, len(step_tokens),
-                                           tabela_simbolos, escopo_corrente, codigo)
+        elif tipo_no == "For":
+            gerar_atribuicao_ast(no.init, tokens, tabela_simbolos, codigo)
 
-            # Volta ao início e depois label de saída
-            codigo.append(f"goto {label_ini}")
-            codigo.append(f"{label_fim}:")
-            pilha_loops.pop()
-            continue
+            label_ini = codigo.novo_label()
+            label_fim = codigo.novo_label()
 
-        # -------------------------------------------------
-        # 5) break;
-        # -------------------------------------------------
-        if tok.tipo == "break":
+            codigo.emitir(OP_ROTULO, arg1=label_ini)
+            t_cond = gerar_expr(no.cond, codigo)
+            codigo.emitir(OP_SE_FALSO, arg1=t_cond, arg2=label_fim)
+
+            pilha_loops.append(label_fim)
+            pendentes.append((TAREFA_FIM_FOR, no.passo, label_ini, label_fim))
+            pendentes.append(no.corpo)
+
+        elif tipo_no == "Break":
             if pilha_loops:
-                label_saida = pilha_loops[-1]
-                codigo.append(f"goto {label_saida}")
-            # pula até o próximo ';'
-            j = i + 1
-            while j < fim and tokens[j].tipo != ";":
-                j += 1
-            i = j + 1
-            continue
+                codigo.emitir(OP_GOTO, arg1=pilha_loops[-1])
 
-        # -------------------------------------------------
-        # Outros comandos (declarações, read, return etc.)
-        # por enquanto são ignorados na geração de código.
-        # -------------------------------------------------
-        i += 1
+        # Declarações, read, return e comando vazio não geram código
 
 
-def analisador_intermediario(tokens, tabela_simbolos, escopo_por_token):
+def gerar_atribuicao_ast(no, tokens, tabela_simbolos, codigo):
     """
-    Função de alto nível para geração do código intermediário.
+    Gera 'nome = t' para uma atribuição da AST. Como em gerar_comandos e
+    gerar_atribuicao_fragmento, a atribuição a um elemento de vetor
+    (no.indices não vazio) não gera código.
+    """
+    if no.indices:
+        return
+    t = gerar_expr(no.expr, codigo)
+    codigo.emitir(OP_COPIA, codigo.variavel(no.simbolo.operando), t)
 
-    Parâmetros:
-        tokens          : lista de tokens do programa
-        tabela_simbolos : tabela léxica gerada no léxico
-        escopo_por_token: mapeamento posição -> Escopo (do semântico)
 
-    A função:
-        - inicializa a estrutura de código e pilha de laços
-        - invoca gerar_comandos sobre todo o programa
-        - insere um 'return' geral ao final
-        - imprime o código gerado
+def analisador_intermediario_ast(programa, tokens, tabela_simbolos, relatorio=None):
     """
-    codigo = []
+    Equivalente a analisador_intermediario, mas percorrendo a AST
+    verificada por semantico.analisador_semantico_ast.
+    """
+    if relatorio is None:
+        relatorio = SAIDA_PADRAO
+
+    codigo = CodigoIntermediario()
     pilha_loops = []
 
-    gerar_comandos(tokens, tabela_simbolos, escopo_por_token,
-                   0, len(tokens), codigo, pilha_loops)
+    for func in programa.funcoes:
+        nome = tabela_simbolos[tokens[func.tok].valor][0]
+        parametros = [tabela_simbolos[tokens[k].valor][0] for _, k in func.params]
+        funcao = codigo.iniciar_funcao(nome, parametros)
+        gerar_comandos_ast(func.corpo, tokens, tabela_simbolos, codigo, pilha_loops)
+        funcao.fim = len(codigo)
+    for cmd in programa.comandos:
+        gerar_comandos_ast(cmd, tokens, tabela_simbolos, codigo, pilha_loops)
 
     # Um "return" geral no fim do programa (encerramento)
-    codigo.append("return")
+    codigo.emitir(OP_RETURN)
 
-    if codigo:
-        print("\n=== Código Intermediário (3-endereços) ===")
-        for c in codigo:
-            print(c)
+    imprimir_codigo(codigo, relatorio=relatorio)
+    return codigo
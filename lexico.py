@@ -6,13 +6,119 @@
 # além de construir a tabela de símbolos com identificadores.
 # -----------------------------------------------------------------------------
 
-# Tabela de símbolos global:
-# cada entrada é uma lista [lexema, (linha,coluna), (linha,coluna), ...]
-tabela_simbolos = []  # Inicializa a tabela de símbolos
+import re
+from array import array
+from bisect import bisect_left
 
-# Controle global de posição no código (apenas para o analisador léxico)
-linha = 1  # Linha atual
-coluna = 1  # Coluna atual
+
+# Posição dos tokens que não vêm do código-fonte (o '$' do sintático):
+# linha e coluna 0
+SEM_POSICAO = -1
+
+
+class IndiceLinhas:
+    """
+    Índice das quebras de linha do código-fonte.
+
+    Tokens e ocorrências de identificadores guardam apenas a posição do
+    lexema (deslocamento, em caracteres, desde o início do código). A
+    linha e a coluna são calculadas a partir deste índice, por busca
+    binária, só quando uma mensagem de erro ou uma impressão precisa delas.
+
+    Campos:
+        quebras : array('I') com a posição de cada '\n' visto pela
+                  varredura, em ordem crescente. As quebras dentro de
+                  strings não entram: como no motor original, elas não
+                  avançam a contagem de linhas.
+    """
+
+    __slots__ = ("quebras",)
+
+    def __init__(self):
+        self.quebras = array("I")
+
+    def linha_coluna(self, pos):
+        """(linha, coluna), a partir de 1, da posição 'pos' ((0, 0) se negativa)."""
+        if pos < 0:
+            return 0, 0
+        k = bisect_left(self.quebras, pos)
+        return k + 1, pos - (self.quebras[k - 1] if k else -1)
+
+
+
+class TabelaSimbolos(list):
+    """
+    Tabela de símbolos léxica.
+
+    É uma lista em que cada entrada é [lexema, posicoes], com posicoes um
+    array('I') da posição no código-fonte de cada ocorrência, e mantém
+    também um dicionário lexema -> índice, o que torna a inserção/consulta
+    de um identificador O(1).
+
+    'linhas' é o IndiceLinhas da análise (compartilhado pelos tokens);
+    a tabela é impressa como antes, com (linha, coluna) por ocorrência.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.indices = {}  # lexema -> índice da entrada na lista
+        self.linhas = IndiceLinhas()
+
+    def adicionar(self, lexema, pos):
+        """
+        Registra uma ocorrência de 'lexema' na posição 'pos'.
+        Cria a entrada se o lexema ainda não existir.
+
+        Retorna:
+            índice da entrada na tabela (int)
+        """
+        indice = self.indices.get(lexema)
+        if indice is None:
+            indice = len(self)
+            self.indices[lexema] = indice
+            self.append([lexema, array("I", (pos,))])
+        else:
+            self[indice][1].append(pos)
+        return indice
+
+    def indice(self, lexema):
+        """Retorna o índice do lexema na tabela, ou None se não existir."""
+        return self.indices.get(lexema)
+
+    def ocorrencias(self, indice):
+        """Número de ocorrências registradas para a entrada 'indice' (sem copiar a lista)."""
+        return len(self[indice][1])
+
+    def __repr__(self):
+        # Mesmo texto da lista [[lexema, (linha, coluna), ...], ...]; as
+        # posições de cada entrada são crescentes, então a busca de cada
+        # uma começa na quebra da anterior
+        quebras = self.linhas.quebras
+        entradas = []
+        for lexema, posicoes in self:
+            partes = [repr(lexema)]
+            k = 0
+            for pos in posicoes:
+                k = bisect_left(quebras, pos, k)
+                partes.append(f"({k + 1}, {pos - (quebras[k - 1] if k else -1)})")
+            entradas.append(f"[{', '.join(partes)}]")
+        return f"[{', '.join(entradas)}]"
+
+
+# Palavras reservadas da linguagem (consulta O(1))
+PALAVRAS_RESERVADAS = frozenset({
+    "def", "int", "float", "string", "break", "print", "read",
+    "return", "if", "else", "for", "new", "null"
+})
+
+# Conjunto de símbolos que delimitam lexemas
+SIMBOLOS = "+-*/%=(){},!<>[];"
+
+# Motores de varredura disponíveis em analisar():
+#   "regex" : varredura em passada única com expressão regular mestra (padrão)
+#   "afd"   : motor original, caractere a caractere, usando determinar_token
+MOTORES = ("regex", "afd")
+MOTOR_PADRAO = "regex"
 
 
 class Token:
@@ -23,15 +129,36 @@ class Token:
         tipo  : string que identifica o tipo do token (e.g. "ident", "const_inteiro", "if", "+", ";")
         valor : para constantes, é o lexema; para identificadores, é o índice na tabela de símbolos;
                 para palavras reservadas ou símbolos simples, costuma ser None.
-        l     : número da linha em que o token aparece (1-based)
-        c     : número da coluna (aproximada) em que o lexema do token começa (1-based)
+        pos   : posição do lexema no código-fonte (deslocamento em caracteres)
+        linhas: IndiceLinhas da análise (None para tokens criados fora do léxico)
+
+    A linha (l) e a coluna (c), ambas a partir de 1, são calculadas a
+    partir de pos só quando consultadas (mensagens de erro, impressões).
     """
 
-    def __init__(self, tipo, valor, l, c):
+    __slots__ = ("tipo", "valor", "pos", "linhas")
+
+    def __init__(self, tipo, valor, pos, linhas=None):
         self.tipo = tipo
         self.valor = valor
-        self.l = l
-        self.c = c
+        self.pos = pos
+        self.linhas = linhas
+
+    def linha_coluna(self):
+        """(linha, coluna) do token; (0, 0) se ele não veio do léxico."""
+        if self.linhas is None:
+            return 0, 0
+        return self.linhas.linha_coluna(self.pos)
+
+    @property
+    def l(self):
+        """Número da linha em que o token aparece."""
+        return self.linha_coluna()[0]
+
+    @property
+    def c(self):
+        """Número da coluna (aproximada) em que o lexema do token começa."""
+        return self.linha_coluna()[1]
 
     def __repr__(self):
         """
@@ -44,36 +171,109 @@ class Token:
             return f"{self.tipo}"
 
 
-def adicionarsimbolo(valor, linha, coluna):
+# Todos os tipos de token que o léxico pode produzir (mais o "$" de fim de
+# entrada, acrescentado pelo sintático). A posição na tupla é o código
+# numérico do tipo usado em TokenStream.
+TIPOS_TOKEN = (
+    "$", "ident", "const_inteiro", "const_float", "const_string",
+    "def", "int", "float", "string", "break", "print", "read",
+    "return", "if", "else", "for", "new", "null",
+    "=", "==", "!=", "<", "<=", ">", ">=", "+", "-", "*", "/", "%",
+    "(", ")", "[", "]", "{", "}", ";", ",",
+)
+CODIGO_TIPO = {tipo: codigo for codigo, tipo in enumerate(TIPOS_TOKEN)}
+
+
+class TokenStream:
+    """
+    Sequência compacta de tokens (estrutura de vetores).
+
+    Em vez de um objeto Token por posição, guarda:
+        tipos    : array('H') com o código de cada tipo (índice em TIPOS_TOKEN)
+        posicoes : array('i') com a posição de cada token no código-fonte
+        refs     : array('i') com o índice do valor em 'valores' (-1 = sem valor)
+        valores  : tabela lateral apenas com os valores existentes
+                   (índice na tabela de símbolos, lexema de constante, ...)
+        linhas   : IndiceLinhas dos tokens (o do primeiro token vindo do léxico)
+
+    Oferece a mesma interface de lista usada pelas fases do compilador:
+    len(tokens), tokens[i].tipo/.valor/.l/.c, fatias, iteração e append.
+    tokens[i] materializa um Token sob demanda.
+    """
+
+    __slots__ = ("tipos", "posicoes", "refs", "valores", "linhas")
+
+    def __init__(self, tokens=()):
+        self.tipos = array("H")
+        self.posicoes = array("i")
+        self.refs = array("i")
+        self.valores = []
+        self.linhas = None
+        for tok in tokens:
+            self.append(tok)
+
+    def append(self, tok):
+        """Acrescenta um Token ao final da sequência."""
+        self.tipos.append(CODIGO_TIPO[tok.tipo])
+        self.posicoes.append(tok.pos)
+        if self.linhas is None:
+            self.linhas = tok.linhas
+        if tok.valor is None:
+            self.refs.append(-1)
+        else:
+            self.refs.append(len(self.valores))
+            self.valores.append(tok.valor)
+
+    def tipo(self, i):
+        """Tipo (string) do token i, sem materializar o Token."""
+        return TIPOS_TOKEN[self.tipos[i]]
+
+    def __len__(self):
+        return len(self.tipos)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return TokenStream(self[k] for k in range(*i.indices(len(self))))
+        if i < 0:
+            i += len(self.tipos)
+        ref = self.refs[i]
+        return Token(
+            TIPOS_TOKEN[self.tipos[i]],
+            None if ref < 0 else self.valores[ref],
+            self.posicoes[i],
+            self.linhas,
+        )
+
+    def __iter__(self):
+        for i in range(len(self.tipos)):
+            yield self[i]
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+def adicionarsimbolo(valor, pos, tabela_simbolos):
     """
     Insere um identificador na tabela de símbolos, ou reutiliza a entrada existente.
 
     Parâmetros:
-        valor  : lexema do identificador (string)
-        linha  : linha em que o identificador aparece
-        coluna : coluna em que o identificador começa
+        valor           : lexema do identificador (string)
+        pos             : posição do identificador no código-fonte
+        tabela_simbolos : TabelaSimbolos da análise em andamento
 
     Retorna:
         índice do identificador na tabela de símbolos (int)
     """
-    global tabela_simbolos
-
-    # Procura se o lexema já está na tabela de símbolos
-    for simbolos in tabela_simbolos:
-        if simbolos[0] == valor:
-            simbolos.append((linha, coluna))
-            return tabela_simbolos.index(simbolos)
+    # Consulta O(1) no índice lexema -> posição da tabela
+    return tabela_simbolos.adicionar(valor, pos)
 
-    # Se ainda não existe, adiciona nova entrada
-    tabela_simbolos.append([valor, (linha, coluna)])
-    return tabela_simbolos.index([valor, (linha, coluna)])
 
-
-def determinar_token(lexema, posicao, c):
+def determinar_token(lexema, pos, tabela_simbolos):
     """
-    Dado um lexema (string) e a posição de início (linha = posicao, coluna = c),
+    Dado um lexema (string) e a sua posição no código-fonte (pos),
     classifica o lexema em um token da linguagem utilizando um AFD (autômato finito
-    determinístico implementado com o comando match/case).
+    determinístico implementado com o comando match/case). Identificadores são
+    registrados em 'tabela_simbolos'.
 
     Pode retornar tokens de:
       - Operadores: =, ==, !=, <, <=, >, >=, +, -, *, /, %
@@ -84,12 +284,7 @@ def determinar_token(lexema, posicao, c):
     Em caso de erro, levanta uma Exception com mensagem indicando linha, coluna e lexema.
     """
 
-    # Palavras reservadas da linguagem
-    palavras_reservadas = [
-        "def", "int", "float", "string", "break", "print", "read",
-        "return", "if", "else", "for", "new", "null"
-    ]
-
+    linhas = tabela_simbolos.linhas
     afd = 0        # estado atual do autômato
     atual = 0      # índice do caractere atual dentro de 'lexema'
 
@@ -203,7 +398,7 @@ def determinar_token(lexema, posicao, c):
             # -----------------------------------------------------------------
             case 1:
                 if len(lexema) == atual:
-                    return Token("=", None, posicao, c)
+                    return Token("=", None, pos, linhas)
                 elif lexema[atual] == '=':
                     afd = 19
                     atual += 1
@@ -227,7 +422,7 @@ def determinar_token(lexema, posicao, c):
             # -----------------------------------------------------------------
             case 3:
                 if len(lexema) == atual:
-                    return Token("<", None, posicao, c)
+                    return Token("<", None, pos, linhas)
                 elif lexema[atual] == '=':
                     afd = 21
                     atual += 1
@@ -240,7 +435,7 @@ def determinar_token(lexema, posicao, c):
             # -----------------------------------------------------------------
             case 4:
                 if len(lexema) == atual:
-                    return Token(">", None, posicao, c)
+                    return Token(">", None, pos, linhas)
                 elif lexema[atual] == '=':
                     afd = 22
                     atual += 1
@@ -252,68 +447,68 @@ def determinar_token(lexema, posicao, c):
             # Operadores aritméticos e delimitadores simples
             # -----------------------------------------------------------------
             case 6:
-                return Token("+", None, posicao, c)
+                return Token("+", None, pos, linhas)
 
             case 7:
-                return Token("-", None, posicao, c)
+                return Token("-", None, pos, linhas)
 
             case 8:
-                return Token("*", None, posicao, c)
+                return Token("*", None, pos, linhas)
 
             case 9:
-                return Token("/", None, posicao, c)
+                return Token("/", None, pos, linhas)
 
             case 10:
-                return Token("%", None, posicao, c)
+                return Token("%", None, pos, linhas)
 
             case 11:
-                return Token("(", None, posicao, c)
+                return Token("(", None, pos, linhas)
 
             case 12:
-                return Token(")", None, posicao, c)
+                return Token(")", None, pos, linhas)
 
             case 13:
-                return Token("[", None, posicao, c)
+                return Token("[", None, pos, linhas)
 
             case 14:
-                return Token("]", None, posicao, c)
+                return Token("]", None, pos, linhas)
 
             case 15:
-                return Token("{", None, posicao, c)
+                return Token("{", None, pos, linhas)
 
             case 16:
-                return Token("}", None, posicao, c)
+                return Token("}", None, pos, linhas)
 
             case 17:
-                return Token(";", None, posicao, c)
+                return Token(";", None, pos, linhas)
 
             case 18:
-                return Token(",", None, posicao, c)
+                return Token(",", None, pos, linhas)
 
             # -----------------------------------------------------------------
             # ==, !=, <=, >=
             # -----------------------------------------------------------------
             case 19:
                 if len(lexema) == atual:
-                    return Token("==", None, posicao, c)
+                    return Token("==", None, pos, linhas)
                 else:
                     afd = 29
 
             case 20:
                 if len(lexema) == atual:
-                    return Token("!=", None, posicao, c)
+                    return Token("!=", None, pos, linhas)
                 else:
                     afd = 29
 
             case 21:
                 if len(lexema) == atual:
-                    return Token("<=", None, posicao, c)
+                    return Token("<=", None, pos, linhas)
                 else:
                     afd = 29
 
             case 22:
                 if len(lexema) == atual:
-                    return Token(">=", None, posicao, c)
+                    return Token(">=", None, pos, linhas)
                 else:
                     afd = 29
 
@@ -324,7 +519,7 @@ def determinar_token(lexema, posicao, c):
             case 23:
                 if lexema[atual] == '"':
                     # strip('"') remove as duas aspas da ponta
-                    return Token("const_string", lexema.strip('"'), posicao, c)
+                    return Token("const_string", lexema.strip('"'), pos, linhas)
                 else:
                     atual += 1
 
@@ -333,7 +528,7 @@ def determinar_token(lexema, posicao, c):
             # -----------------------------------------------------------------
             case 24:
                 if len(lexema) == atual:
-                    return Token("const_inteiro", lexema, posicao, c)
+                    return Token("const_inteiro", lexema, pos, linhas)
                 elif lexema[atual] == '.':
                     atual += 1
                     afd = 25
@@ -360,7 +555,7 @@ def determinar_token(lexema, posicao, c):
             case 26:
                 if len(lexema) == atual:
                     # um único caractere já fecha o lexema
-                    return Token("ident", adicionarsimbolo(lexema, posicao, c), posicao, c)
+                    return Token("ident", adicionarsimbolo(lexema, pos, tabela_simbolos), pos, linhas)
                 elif lexema[atual].isalpha() or lexema[atual] == '_' or lexema[atual].isdigit():
                     afd = 27
                     atual += 1
@@ -372,9 +567,9 @@ def determinar_token(lexema, posicao, c):
             # -----------------------------------------------------------------
             case 27:
                 if len(lexema) == atual:
-                    if lexema in palavras_reservadas:
-                        return Token(lexema, None, posicao, c)
-                    return Token("ident", adicionarsimbolo(lexema, posicao, c), posicao, c)
+                    if lexema in PALAVRAS_RESERVADAS:
+                        return Token(lexema, None, pos, linhas)
+                    return Token("ident", adicionarsimbolo(lexema, pos, tabela_simbolos), pos, linhas)
                 elif lexema[atual].isalpha() or lexema[atual] == '_' or lexema[atual].isdigit():
                     atual += 1
                 else:
@@ -385,7 +580,7 @@ def determinar_token(lexema, posicao, c):
             # -----------------------------------------------------------------
             case 28:
                 if len(lexema) == atual:
-                    return Token("const_float", lexema, posicao, c)
+                    return Token("const_float", lexema, pos, linhas)
                 elif lexema[atual].isdigit():
                     atual += 1
                 else:
@@ -395,59 +590,56 @@ def determinar_token(lexema, posicao, c):
             # Estado de erro genérico
             # -----------------------------------------------------------------
             case 29:
+                linha, coluna = linhas.linha_coluna(pos)
                 raise Exception(
                     "Token não reconhecido pela gramática na linha "
-                    + str(posicao)
+                    + str(linha)
                     + " coluna "
-                    + str(c)
+                    + str(coluna)
                     + ": "
                     + lexema
                     + ". Tente novamente!"
                 )
 
 
-def analisar(codigo):
+def analisar_afd(codigo, compacto=False):
     """
-    Função principal do analisador léxico.
+    Motor original do analisador léxico (AFD caractere a caractere).
 
     Parâmetros:
-        codigo : string com o código-fonte completo em ConvCC-2025-2.
+        codigo   : string com o código-fonte completo em ConvCC-2025-2.
+        compacto : se True, acumula os tokens em um TokenStream.
 
     Retorna:
         (tokens, tabela_simbolos_atualizada)
 
-        tokens           : lista de objetos Token, na ordem em que aparecem
-        tabela_simbolos  : lista global contendo os identificadores encontrados
-                           e as posições (linha, coluna) de cada ocorrência.
-    """
-    tokens = []  # Lista de tokens produzidos
-    global linha, coluna, tabela_simbolos
+        tokens           : lista de objetos Token (ou TokenStream), na ordem em que aparecem
+        tabela_simbolos  : TabelaSimbolos com os identificadores encontrados,
+                           a posição de cada ocorrência e o índice de linhas.
 
-    # Reinicia estado global a cada análise
-    linha = 1
-    coluna = 1
-    tabela_simbolos = []
+    Todo o estado da análise (posição e tabela de símbolos) é local a cada
+    chamada, de modo que análises independentes não interferem entre si.
+    """
+    tokens = TokenStream() if compacto else []  # Tokens produzidos
+    tabela_simbolos = TabelaSimbolos()
+    quebras = tabela_simbolos.linhas.quebras
 
     posicao = 0  # Índice atual no string 'codigo'
 
-    # Conjunto de símbolos que delimitam lexemas
-    simbolo = "+-*/%=(){},!<>[];"
-
-    lexema = ""                 # Buffer para o lexema em construção
-    coluna_inicio_lexema = None  # Coluna onde o lexema atual começou
+    lexema = ""            # Buffer para o lexema em construção
+    inicio_lexema = None   # Posição onde o lexema atual começou
 
     while posicao < len(codigo):
         char = codigo[posicao]
 
         # -------------------------------------------------------------
-        # Quebra de linha: atualiza linha/coluna e reseta o lexema
+        # Quebra de linha: registra no índice de linhas e reseta o lexema
         # -------------------------------------------------------------
         if char == '\n':
-            linha += 1
-            coluna = 1
+            quebras.append(posicao)
             posicao += 1
             lexema = ""
-            coluna_inicio_lexema = None
+            inicio_lexema = None
             continue
 
         # -------------------------------------------------------------
@@ -455,61 +647,56 @@ def analisar(codigo):
         # -------------------------------------------------------------
         elif char.isspace():
             if lexema:
-                tokens.append(determinar_token(lexema, linha, coluna_inicio_lexema))
+                tokens.append(determinar_token(lexema, inicio_lexema, tabela_simbolos))
                 lexema = ""
-                coluna_inicio_lexema = None
+                inicio_lexema = None
             posicao += 1
-            coluna += 1
 
         # -------------------------------------------------------------
         # Símbolos que, por si só, formam tokens (operadores/delimitadores)
         # Também encerram qualquer lexema em andamento.
         # -------------------------------------------------------------
-        elif char in simbolo:
+        elif char in SIMBOLOS:
             if lexema:
-                tokens.append(determinar_token(lexema, linha, coluna_inicio_lexema))
+                tokens.append(determinar_token(lexema, inicio_lexema, tabela_simbolos))
                 lexema = ""
-                coluna_inicio_lexema = None
+                inicio_lexema = None
 
             # Trata pares como "==", "<=", ">=", "!="
             if char in "<>!=":
                 if posicao + 1 < len(codigo) and codigo[posicao + 1] in "<>!=":
                     token_1 = codigo[posicao] + codigo[posicao + 1]
-                    tokens.append(determinar_token(token_1, linha, coluna))
+                    tokens.append(determinar_token(token_1, posicao, tabela_simbolos))
                     posicao += 2
-                    coluna += 2
                 else:
-                    tokens.append(determinar_token(char, linha, coluna))
+                    tokens.append(determinar_token(char, posicao, tabela_simbolos))
                     posicao += 1
-                    coluna += 1
             else:
-                tokens.append(determinar_token(char, linha, coluna))
+                tokens.append(determinar_token(char, posicao, tabela_simbolos))
                 posicao += 1
-                coluna += 1
 
         # -------------------------------------------------------------
         # Início de string: lê até a próxima aspa dupla
         # -------------------------------------------------------------
         elif char == '"':
             if lexema:
-                tokens.append(determinar_token(lexema, linha, coluna_inicio_lexema))
+                tokens.append(determinar_token(lexema, inicio_lexema, tabela_simbolos))
             lexema = ""
-            coluna_inicio_lexema = None
+            inicio_lexema = None
 
             # Inclui as aspas no lexema para que determinar_token reconheça
             while True:
                 lexema += codigo[posicao]
                 posicao += 1
-                coluna += 1
                 if codigo[posicao] == '"':
                     lexema += codigo[posicao]
                     posicao += 1
-                    coluna += 1
                     break
 
-            tokens.append(determinar_token(lexema, linha, coluna))
+            # A posição registrada é a de logo após a aspa de fechamento
+            tokens.append(determinar_token(lexema, posicao, tabela_simbolos))
             lexema = ""
-            coluna_inicio_lexema = None
+            inicio_lexema = None
 
         # -------------------------------------------------------------
         # Qualquer outro caractere: faz parte de um lexema em construção
@@ -517,13 +704,315 @@ def analisar(codigo):
         # -------------------------------------------------------------
         else:
             if lexema == "":
-                coluna_inicio_lexema = coluna
+                inicio_lexema = posicao
             lexema += codigo[posicao]
             posicao += 1
-            coluna += 1
 
     # Fim do código: se restou um lexema pendente, processa-o
     if lexema:
-        tokens.append(determinar_token(lexema, linha, coluna_inicio_lexema))
+        tokens.append(determinar_token(lexema, inicio_lexema, tabela_simbolos))
 
     return tokens, tabela_simbolos
+
+
+# -----------------------------------------------------------------------------
+# Motor de varredura em passada única (expressão regular mestra)
+# -----------------------------------------------------------------------------
+
+# Sequência de caracteres que formam um lexema "livre" (identificador, número
+# ou lixo): tudo o que não é espaço, aspas nem símbolo delimitador.
+_DELIMITADORES = r'\s"+\-*/%=(){},!<>\[\];'
+_LEXEMA = rf'[^{_DELIMITADORES}]'
+
+# Cada alternativa corresponde a um dos ramos de analisar_afd. A ordem importa:
+# os casos rápidos (ident, float, inteiro) só casam se cobrirem o lexema inteiro;
+# qualquer outro lexema cai em "lexema" e é classificado pelo AFD original,
+# o que garante exatamente as mesmas mensagens de erro.
+_RE_TOKEN = re.compile(
+    r'(?P<nl>\n)'
+    r'|(?P<espaco>[^\S\n]+)'
+    rf'|(?P<ident>[A-Za-z_][A-Za-z0-9_]*)(?!{_LEXEMA})'
+    rf'|(?P<float>[0-9]+\.[0-9]+)(?!{_LEXEMA})'
+    rf'|(?P<inteiro>[0-9]+)(?!{_LEXEMA})'
+    r'|(?P<op>[<>!=][<>!=]?|[+\-*/%(){},\[\];])'
+    r'|(?P<string>"[^"]*")'
+    r'|(?P<aspas>")'
+    rf'|(?P<lexema>{_LEXEMA}+)'
+)
+
+# Grupos que correspondem a um lexema "livre" do motor original
+_GRUPOS_LEXEMA = frozenset({"ident", "float", "inteiro", "lexema"})
+
+# Operadores e delimitadores válidos (lexema -> tipo do token)
+_OPERADORES = {
+    op: op for op in (
+        "=", "==", "!=", "<", "<=", ">", ">=", "+", "-", "*", "/", "%",
+        "(", ")", "[", "]", "{", "}", ";", ",",
+    )
+}
+
+
+def _varrer(texto, base, final, tokens, tabela_simbolos):
+    """
+    Núcleo do motor "regex": varre 'texto' com _RE_TOKEN e acrescenta em
+    'tokens' os tokens reconhecidos.
+
+    Parâmetros:
+        texto        : trecho do código-fonte a varrer
+        base         : posição de texto[0] no código-fonte; as posições dos
+                       tokens e das quebras de linha são base + posição
+                       em 'texto'
+        final        : False quando 'texto' é apenas um bloco da entrada.
+                       Nesse caso a varredura para antes de um token que
+                       ainda pode continuar no próximo bloco: um lexema ou
+                       um operador de um caractere que encostam no fim do
+                       bloco, ou uma string ainda não fechada.
+        tokens       : lista/TokenStream onde os tokens são acrescentados
+        tabela_simbolos : TabelaSimbolos onde os identificadores e as quebras
+                          de linha (tabela_simbolos.linhas) são registrados
+
+    Retorna:
+        posição (em 'texto') em que a varredura parou
+    """
+    fim = len(texto)
+    linhas = tabela_simbolos.linhas
+    quebras = linhas.quebras
+
+    for m in _RE_TOKEN.finditer(texto):
+        grupo = m.lastgroup
+
+        if not final and (grupo == "aspas" or m.end() == fim and (
+                grupo in _GRUPOS_LEXEMA or grupo == "op" and len(m.group()) == 1)):
+            return m.start()
+
+        if grupo == "espaco":
+            continue
+
+        if grupo == "nl":
+            quebras.append(base + m.start())
+            continue
+
+        # O motor original descarta o lexema que termina colado em '\n'
+        if grupo in _GRUPOS_LEXEMA and texto.startswith("\n", m.end()):
+            continue
+
+        pos = base + m.start()
+
+        if grupo == "ident":
+            lexema = m.group()
+            if lexema in PALAVRAS_RESERVADAS:
+                tokens.append(Token(lexema, None, pos, linhas))
+            else:
+                tokens.append(Token("ident", adicionarsimbolo(lexema, pos, tabela_simbolos), pos, linhas))
+
+        elif grupo == "op":
+            lexema = m.group()
+            tipo = _OPERADORES.get(lexema)
+            if tipo is None:
+                linha, c = linhas.linha_coluna(pos)
+                raise Exception(
+                    "Token não reconhecido pela gramática na linha "
+                    + str(linha) + " coluna " + str(c) + ": " + lexema
+                    + ". Tente novamente!"
+                )
+            tokens.append(Token(tipo, None, pos, linhas))
+
+        elif grupo == "inteiro":
+            tokens.append(Token("const_inteiro", m.group(), pos, linhas))
+
+        elif grupo == "float":
+            tokens.append(Token("const_float", m.group(), pos, linhas))
+
+        elif grupo == "string":
+            tokens.append(Token("const_string", m.group()[1:-1], base + m.end(), linhas))
+
+        elif grupo == "aspas":
+            linha, c = linhas.linha_coluna(pos)
+            raise Exception(
+                f"String não terminada na linha {linha} coluna {c}. Tente novamente!"
+            )
+
+        else:
+            # Lexema fora dos casos rápidos: o AFD classifica ou reporta o erro
+            tokens.append(determinar_token(m.group(), pos, tabela_simbolos))
+
+    return fim
+
+
+def analisar_regex(codigo, compacto=False):
+    """
+    Motor de varredura em passada única do analisador léxico.
+
+    Percorre o código com uma única expressão regular mestra (_RE_TOKEN),
+    sem montar lexemas caractere a caractere. Palavras reservadas são
+    reconhecidas por consulta a PALAVRAS_RESERVADAS; cada token guarda a
+    posição do lexema, e só as quebras de linha são registradas (no
+    IndiceLinhas da tabela de símbolos).
+
+    Produz a mesma sequência de tokens, a mesma tabela de símbolos e as
+    mesmas posições de erro que analisar_afd, inclusive as particularidades
+    do motor original:
+      - um lexema imediatamente seguido de '\\n' é descartado;
+      - quebras de linha dentro de strings não avançam a contagem de linhas;
+      - o token const_string guarda a posição logo após a aspa de fechamento.
+
+    Retorna:
+        (tokens, tabela_simbolos), como analisar_afd.
+    """
+    tabela_simbolos = TabelaSimbolos()
+    tokens = TokenStream() if compacto else []
+    _varrer(codigo, 0, True, tokens, tabela_simbolos)
+    return tokens, tabela_simbolos
+
+
+# -----------------------------------------------------------------------------
+# Varredura incremental sobre arquivos (em blocos)
+# -----------------------------------------------------------------------------
+
+# Quantidade de caracteres lidos por vez em iter_tokens
+TAMANHO_BLOCO = 1 << 16
+
+
+# Fim de um lexema "livre" (primeiro caractere que não faz parte dele)
+_RE_FIM_LEXEMA = re.compile(rf'[{_DELIMITADORES}]')
+
+
+def _completa(pendente, bloco):
+    """
+    Diz se 'bloco' contém o fim do token incompleto 'pendente' (o trecho
+    em que _varrer parou): a aspa de fechamento de uma string ou o fim de
+    um lexema. Um operador pendente (um caractere) se completa com
+    qualquer bloco.
+    """
+    if pendente[0] == '"':
+        return '"' in bloco
+    if _RE_FIM_LEXEMA.match(pendente):
+        return True
+    return _RE_FIM_LEXEMA.search(bloco) is not None
+
+
+def iter_tokens(arquivo, tabela_simbolos, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Gerador de tokens sobre um arquivo aberto em modo texto.
+
+    Lê o arquivo em blocos de 'tamanho_bloco' caracteres e produz os tokens
+    sob demanda, sem carregar o código-fonte inteiro na memória. Lexemas,
+    operadores de dois caracteres (==, <=, ...) e strings que atravessam a
+    fronteira entre blocos são tratados guardando o trecho incompleto e
+    concatenando-o ao bloco seguinte.
+
+    O trecho guardado é sempre um único token incompleto (nunca espaços
+    nem tokens já completos). Enquanto os blocos seguintes não o
+    completam, eles apenas se acumulam, sem nova varredura; o token é
+    varrido uma vez, quando se completa. Uma string não terminada é
+    reportada ao fim do arquivo, como em analisar(codigo).
+
+    Os identificadores são registrados em 'tabela_simbolos' (em geral uma
+    TabelaSimbolos nova). Os tokens são os mesmos de analisar(codigo).
+    """
+    pendentes = []      # pedaços do token incompleto (o primeiro o inicia)
+    base = 0            # posição de pendentes[0] no arquivo
+    tokens = []
+
+    while True:
+        bloco = arquivo.read(tamanho_bloco)
+        final = not bloco
+        if pendentes and not final and not _completa(pendentes[0], bloco):
+            pendentes.append(bloco)
+            continue
+        pendentes.append(bloco)
+        texto = "".join(pendentes)
+
+        parou = _varrer(texto, base, final, tokens, tabela_simbolos)
+        yield from tokens
+        tokens.clear()
+
+        if final:
+            return
+
+        pendentes = [texto[parou:]] if parou < len(texto) else []
+        base += parou
+
+
+def analisar_arquivo(arquivo, compacto=False, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Equivalente a analisar(arquivo.read()), mas lendo o arquivo em blocos
+    por meio de iter_tokens.
+
+    Retorna:
+        (tokens, tabela_simbolos)
+    """
+    tabela_simbolos = TabelaSimbolos()
+    tokens = TokenStream() if compacto else []
+    for tok in iter_tokens(arquivo, tabela_simbolos, tamanho_bloco):
+        tokens.append(tok)
+    return tokens, tabela_simbolos
+
+
+def analisar(codigo, motor=MOTOR_PADRAO, compacto=False):
+    """
+    Função principal do analisador léxico.
+
+    Parâmetros:
+        codigo : string com o código-fonte completo em ConvCC-2025-2.
+        motor  : "regex" (padrão, passada única) ou "afd" (motor original).
+                 Os dois produzem a mesma saída, o que permite compará-los.
+        compacto : se True, os tokens são devolvidos em um TokenStream
+                   (estrutura de vetores) em vez de uma lista de Token.
+
+    Retorna:
+        (tokens, tabela_simbolos_atualizada)
+    """
+    if motor == "regex":
+        return analisar_regex(codigo, compacto)
+    if motor == "afd":
+        return analisar_afd(codigo, compacto)
+    raise ValueError(f"Motor léxico desconhecido: {motor!r} (opções: {', '.join(MOTORES)})")
+
+
+# -----------------------------------------------------------------------------
+# Índice de delimitadores casados
+# -----------------------------------------------------------------------------
+
+# Delimitador de abertura -> delimitador de fechamento correspondente
+_FECHAMENTO = {"(": ")", "[": "]", "{": "}"}
+
+
+def casar_delimitadores(tokens):
+    """
+    Casa os delimitadores '(' ')', '[' ']' e '{' '}' da sequência de tokens
+    em uma única passada com pilha.
+
+    Retorna:
+        array('i') com uma posição por token: para cada delimitador, o índice
+        do delimitador correspondente (nos dois sentidos); -1 para os demais
+        tokens e para delimitadores sem par.
+
+    Com esse índice, as fases seguintes saltam de um '(' ou '{' para o seu
+    fechamento em O(1), em vez de recontar níveis de aninhamento.
+
+    Um fechamento só casa com a abertura do topo da pilha, se for do mesmo
+    tipo; senão fica com -1 e a pilha não muda. Em 'def main(){ ( }', o '}'
+    encontra o '(' no topo, e '{', '(' e '}' ficam todos com -1:
+    [-1, -1, 3, 2, -1, -1, -1]. As fases tratam -1 como "sem fechamento"
+    (ver semantico.fechamento, que para no fim do intervalo).
+    """
+    if isinstance(tokens, TokenStream):
+        tipos = [TIPOS_TOKEN[codigo] for codigo in tokens.tipos]
+    else:
+        tipos = [tok.tipo for tok in tokens]
+
+    pares = array("i", [-1]) * len(tipos)
+    abertos = []   # pilha de índices de delimitadores de abertura
+
+    for i, tipo in enumerate(tipos):
+        if tipo in _FECHAMENTO:
+            abertos.append(i)
+        elif tipo in (")", "]", "}"):
+            # Só casa com a abertura do mesmo tipo no topo da pilha
+            if abertos and _FECHAMENTO[tipos[abertos[-1]]] == tipo:
+                j = abertos.pop()
+                pares[i] = j
+                pares[j] = i
+
+    return pares
@@ -5,8 +5,24 @@ from lexico import *
 from sintatico import *
 from semantico import *
 from intermediario import *
-
+from otimizador import *
+from maquina import *
+from alocacao import *
+from incremental import CacheIncremental
+from perfil import Perfil, SEM_PERFIL, contar_escopos
+from relatorio import *
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
 
 # ---------------------------------------------------------------------
 # Programas de teste internos
@@ -128,27 +144,145 @@ def f(float a){
 }
 
 
-def ler_codigo():
+def ler_argumentos(argv=None):
     """
-    Lê o código-fonte que será analisado.
+    Interpreta a linha de comando.
 
     Modos de uso:
       python main.py programa.conv
       python main.py --test NOME_TESTE
+      python main.py --batch DIRETORIO [-j N] [--relatorio ARQ.json]
+
+    Opções:
+      --lexico {regex,afd} : motor do analisador léxico (padrão: regex)
+      --compacto           : guarda os tokens em um TokenStream (vetores)
+      --ast                : o sintático monta a AST, percorrida pelo
+                             semântico e pelo gerador de código (não pode
+                             ser usada com --fundido, --estatisticas,
+                             --paralelo nem --cache)
+      --fundido            : semântico em uma única passada sobre os tokens
+      --estatisticas       : ao final, imprime acertos/falhas do cache de
+                             expressões compartilhado entre as fases
+      --verbosidade NIVEL  : silencioso, resumo ou completo (padrão); ver
+                             relatorio.py
+      -q                   : o mesmo que --verbosidade silencioso
+      --saida FORMATO      : texto (padrão), jsonl (um objeto JSON por
+                             mensagem) ou nenhuma
+      --arquivo-saida ARQ  : escreve a saída em ARQ em vez da saída padrão
+      -O                   : otimiza o código intermediário (otimizador.py)
+      --desligar PASSO     : com -O, não aplica o passe PASSO (repetível)
+      --paralelo N         : gera o código intermediário função por função,
+                             distribuindo as funções entre N processos
+      --cache DIRETORIO    : cache incremental em disco (incremental.py): reaproveita
+                             a análise das expressões e o código das funções
+                             que não mudaram
+      --cache-max-mb N     : tamanho máximo do cache incremental (padrão: 64)
+      --cache-max-dias N   : idade máxima de uma entrada não usada (padrão: 30)
+      --alocar             : reaproveita temporários mortos (alocacao.py),
+                             depois de -O, se houver
+      --executar           : executa o código intermediário (maquina.py)
+      --desempenho N       : executa o código N vezes e imprime quantas
+                             instruções por segundo a máquina virtual executou
+      --batch DIRETORIO    : compila todos os .conv do diretório (recursivo)
+      -j N                 : número de processos do modo --batch
+                             (padrão: número de CPUs)
+      --relatorio ARQ      : no modo --batch, grava o relatório em JSON
+      --perfil ARQ         : mede tempo, CPU e pico de memória de cada fase e
+                             registra contadores da compilação (perfil.py);
+                             grava o JSON em ARQ ('-': imprime ao final)
+                             (também --profile); no modo --batch, ARQ é
+                             ignorado e o perfil de cada arquivo vai no relatório
+    """
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Compilador ConvCC-2025-2",
+    )
+    parser.add_argument("arquivo", nargs="?",
+                        help="arquivo-fonte .conv a ser compilado")
+    parser.add_argument("--test", metavar="NOME_TESTE", nargs="?", const="",
+                        help="executa um programa de teste interno (TEST_PROGRAMAS)")
+    parser.add_argument("--lexico", choices=MOTORES, default=MOTOR_PADRAO,
+                        help="motor do analisador léxico (padrão: %(default)s)")
+    parser.add_argument("--compacto", action="store_true",
+                        help="guarda os tokens em um TokenStream compacto")
+    parser.add_argument("--ast", action="store_true",
+                        help="semântico e código intermediário percorrem a AST "
+                             "montada pelo sintático")
+    parser.add_argument("--fundido", action="store_true",
+                        help="análise semântica em uma única passada sobre "
+                             "os tokens")
+    parser.add_argument("--estatisticas", action="store_true",
+                        help="imprime as estatísticas do cache de expressões")
+    parser.add_argument("--verbosidade", choices=NIVEIS, default="completo",
+                        help="quanto é exibido durante a compilação (padrão: %(default)s)")
+    parser.add_argument("-q", "--silencioso", dest="verbosidade", action="store_const",
+                        const="silencioso", help="não exibe nada (--verbosidade silencioso)")
+    parser.add_argument("--saida", choices=FORMATOS, default="texto",
+                        help="formato da saída (padrão: %(default)s)")
+    parser.add_argument("--arquivo-saida", metavar="ARQ",
+                        help="escreve a saída em ARQ em vez da saída padrão")
+    parser.add_argument("-O", dest="otimizar", action="store_true",
+                        help="otimiza o código intermediário")
+    parser.add_argument("--desligar", metavar="PASSO", action="append",
+                        choices=NOMES_PASSES, default=[],
+                        help="com -O, desliga o passe PASSO (pode ser repetido)")
+    parser.add_argument("--paralelo", type=int, metavar="N",
+                        help="gera o código de cada função separadamente, em N processos")
+    parser.add_argument("--cache", metavar="DIRETORIO",
+                        help="cache incremental em disco (por função)")
+    parser.add_argument("--cache-max-mb", type=float, default=64, metavar="N",
+                        help="tamanho máximo do cache incremental em MB (padrão: %(default)s)")
+    parser.add_argument("--cache-max-dias", type=float, default=30, metavar="N",
+                        help="idade máxima das entradas do cache incremental "
+                             "(padrão: %(default)s)")
+    parser.add_argument("--alocar", action="store_true",
+                        help="reaproveita temporários mortos (análise de vivacidade)")
+    parser.add_argument("--executar", action="store_true",
+                        help="executa o código intermediário na máquina virtual")
+    parser.add_argument("--desempenho", type=int, metavar="N",
+                        help="mede instruções/s da máquina virtual em N execuções")
+    parser.add_argument("--batch", metavar="DIRETORIO",
+                        help="compila todos os arquivos .conv do diretório")
+    parser.add_argument("-j", "--jobs", type=int, default=None, metavar="N",
+                        help="processos usados no modo --batch (padrão: CPUs)")
+    parser.add_argument("--relatorio", metavar="ARQ",
+                        help="grava o relatório do modo --batch em JSON")
+    parser.add_argument("--perfil", "--profile", metavar="ARQ",
+                        help="mede as fases e grava o perfil em JSON em ARQ "
+                             "('-': imprime ao final)")
+    args = parser.parse_args(argv)
+
+    # O caminho da AST tem semântico e geração de código próprios, sem o
+    # cache de expressões nem as unidades por função dessas opções
+    if args.ast:
+        incompativeis = [opcao for opcao, usada in (
+            ("--fundido", args.fundido),
+            ("--estatisticas", args.estatisticas),
+            ("--paralelo", args.paralelo is not None),
+            ("--cache", args.cache is not None),
+        ) if usada]
+        if incompativeis:
+            parser.error(f"--ast não pode ser usada com {', '.join(incompativeis)}")
+    return args
+
+
+def ler_codigo(args):
+    """
+    Lê o código-fonte que será analisado.
 
     - Se for passado '--test NOME_TESTE', o código é obtido a partir
       do dicionário TEST_PROGRAMAS.
-    - Caso contrário, o primeiro argumento é interpretado como o caminho
+    - Caso contrário, o argumento posicional é interpretado como o caminho
       de um arquivo .conv a ser aberto.
     """
     # Modo de execução com testes internos
-    if len(sys.argv) >= 2 and sys.argv[1] == "--test":
-        if len(sys.argv) < 3:
+    if args.test is not None:
+        if not args.test:
             print("Uso: python main.py --test NOME_TESTE")
             print("Testes disponíveis:", ", ".join(sorted(TEST_PROGRAMAS.keys())))
             sys.exit(1)
 
-        nome_teste = sys.argv[2]
+        nome_teste = args.test
         prog = TEST_PROGRAMAS.get(nome_teste)
         if prog is None:
             print(f"Teste '{nome_teste}' não encontrado.")
@@ -159,13 +293,13 @@ def ler_codigo():
         return prog
 
     # Modo normal: leitura de um arquivo .conv
-    if len(sys.argv) < 2:
+    if args.arquivo is None:
         print("Uso:")
         print("  python main.py <arquivo-fonte.conv>")
         print("  python main.py --test NOME_TESTE")
         sys.exit(1)
 
-    caminho = sys.argv[1]
+    caminho = args.arquivo
     try:
         with open(caminho, "r", encoding="utf-8") as f:
             codigo = f.read()
@@ -176,6 +310,36 @@ def ler_codigo():
     return codigo
 
 
+def analisar_entrada(args):
+    """
+    Executa a análise léxica sobre a entrada escolhida na linha de comando.
+
+    Arquivos .conv com o motor "regex" são lidos em blocos por
+    analisar_arquivo (via iter_tokens), sem carregar o código-fonte inteiro
+    em uma string. Testes internos e o motor "afd" usam analisar(codigo).
+    """
+    if args.test is None and args.arquivo is not None and args.lexico == "regex":
+        caminho = args.arquivo
+        try:
+            return analisar_caminho(caminho, args)
+        except OSError as e:
+            print(f"Erro ao abrir arquivo '{caminho}': {e}")
+            sys.exit(1)
+
+    return analisar(ler_codigo(args), args.lexico, args.compacto)
+
+
+def analisar_caminho(caminho, args):
+    """
+    Análise léxica do arquivo 'caminho' com as opções da linha de comando.
+    Erros de leitura (OSError) são repassados a quem chamou.
+    """
+    with open(caminho, "r", encoding="utf-8") as f:
+        if args.lexico == "regex":
+            return analisar_arquivo(f, args.compacto)
+        return analisar(f.read(), args.lexico, args.compacto)
+
+
 def token_para_string(lista):
     """
     Converte a lista de tokens em uma string organizada por linhas.
@@ -184,19 +348,330 @@ def token_para_string(lista):
     com os tokens correspondentes na ordem em que foram reconhecidos.
     Essa função é usada apenas para depuração e visualização.
     """
-    resultado = ""
-    linha_atual = 1
+    partes = []
+    if isinstance(lista, TokenStream):
+        linhas = lista.linhas
+    else:
+        linhas = lista[0].linhas if lista else None
+
+    # Próxima quebra de linha do código-fonte ainda não ultrapassada: há
+    # mudança de linha quando um token vem depois dela (os tokens estão em
+    # ordem de posição), sem calcular a linha de cada token
+    quebras = iter(linhas.quebras if linhas is not None else ())
+    proxima = next(quebras, math.inf)
 
     for token in lista:
         # Quebra de linha sempre que o número da linha mudar
-        if token.l != linha_atual:
-            resultado += "\n"
-            linha_atual = token.l
-        resultado += token.__repr__() + " "
+        if proxima < token.pos:
+            partes.append("\n")
+            while proxima < token.pos:
+                proxima = next(quebras, math.inf)
+        partes.append(token.__repr__())
+        partes.append(" ")
+
+    return "".join(partes)
+
+
+def compilar(tokens, tabela_simbolos, args, perfil=SEM_PERFIL, relatorio=None):
+    """
+    Executa as fases seguintes à análise léxica sobre 'tokens', exibindo
+    tabela de símbolos, tokens, árvores e código intermediário.
+
+    Todo o estado da compilação (tabela de símbolos, escopos, cache de
+    expressões, contadores de temporários e rótulos) é criado aqui ou nas
+    fases, e nada fica guardado em variáveis de módulo: várias compilações
+    podem ser feitas, uma após a outra, no mesmo processo.
+
+    Com um Perfil (--perfil), cada fase é medida e os contadores da
+    compilação são registrados nele. Tudo o que é exibido vai para
+    'relatorio' (padrão: saída padrão, sem acúmulo).
+    """
+    if relatorio is None:
+        relatorio = SAIDA_PADRAO
+    perfil.contar("tokens", len(tokens))
+
+    with perfil.fase("impressao"):
+        if relatorio.ativo(COMPLETO):
+            relatorio.registrar(COMPLETO, "tabela_simbolos",
+                                f"Tabela de Símbolos:\n{tabela_simbolos}")
+            relatorio.registrar(COMPLETO, "tokens", token_para_string(tokens))
+
+    if args.ast:
+        # Análise sintática, montando a AST na mesma passada
+        with perfil.fase("sintatico"):
+            programa = analisador_sintatico(tokens, tabela_simbolos, construir_ast=True,
+                                            contadores=perfil.contadores, relatorio=relatorio)
+
+        # Análise semântica e geração de código sobre a AST
+        with perfil.fase("semantico"):
+            analisador_semantico_ast(programa, tokens, tabela_simbolos, relatorio)
+        with perfil.fase("intermediario"):
+            codigo = analisador_intermediario_ast(programa, tokens, tabela_simbolos, relatorio)
+        processar_codigo(codigo, args, perfil, relatorio)
+        return
+
+    # Análise sintática
+    with perfil.fase("sintatico"):
+        analisador_sintatico(tokens, contadores=perfil.contadores, relatorio=relatorio)
+
+    # Árvores de expressão analisadas no semântico e reaproveitadas
+    # na geração de código
+    cache = CacheExpressoes()
+
+    # Índice de delimitadores casados, compartilhado pelas fases seguintes
+    pares = casar_delimitadores(tokens)
+
+    # Cache incremental: árvores e código das unidades que não mudaram
+    incremental = partes = None
+    if args.cache:
+        with perfil.fase("cache_incremental"):
+            incremental = CacheIncremental(args.cache, int(args.cache_max_mb * 1024 * 1024),
+                                           args.cache_max_dias * 24 * 3600)
+            partes = incremental.carregar(tokens, tabela_simbolos, pares, cache)
+
+    # Análise semântica
+    with perfil.fase("semantico"):
+        if args.fundido:
+            escopo_por_token = analisador_semantico_fundido(tokens, tabela_simbolos, cache,
+                                                            pares, relatorio)
+        else:
+            escopo_por_token = analisador_semantico(tokens, tabela_simbolos, cache, pares,
+                                                    relatorio)
+
+    # Geração de código intermediário
+    with perfil.fase("intermediario"):
+        codigo = analisador_intermediario(tokens, tabela_simbolos, escopo_por_token, cache,
+                                          pares, args.paralelo, partes, relatorio)
+    if incremental is not None:
+        with perfil.fase("cache_incremental_gravacao"):
+            incremental.gravar(cache, partes)
+            incremental.limpar()
+    processar_codigo(codigo, args, perfil, relatorio)
+
+    perfil.contar("expressoes_cache_acertos", cache.acertos)
+    perfil.contar("expressoes_cache_falhas", cache.falhas)
+    if args.estatisticas:
+        relatorio.registrar(RESUMO, "cache_expressoes",
+                            f"\nCache de expressões: {cache.acertos} acertos, "
+                            f"{cache.falhas} falhas",
+                            acertos=cache.acertos, falhas=cache.falhas)
+    if incremental is not None:
+        incremental.imprimir_estatisticas(relatorio)
+
+
+def processar_codigo(codigo, args, perfil=SEM_PERFIL, relatorio=SAIDA_PADRAO):
+    """
+    Fases sobre o código intermediário gerado: -O, --alocar, --executar e
+    --desempenho, conforme a linha de comando.
+    """
+    perfil.contar("temporarios", codigo.temporario_counter)
+    perfil.contar("rotulos", codigo.label_counter)
+    perfil.contar("instrucoes", len(codigo))
+
+    if args.otimizar:
+        with perfil.fase("otimizador"):
+            otimizar_codigo(codigo, args, relatorio)
+        perfil.contar("instrucoes_otimizadas", len(codigo))
+    if args.alocar:
+        with perfil.fase("alocacao"):
+            alocar_codigo(codigo, relatorio)
+    if args.executar or args.desempenho:
+        with perfil.fase("execucao"):
+            executar_codigo_gerado(codigo, args, relatorio)
+
+
+def otimizar_codigo(codigo, args, relatorio=SAIDA_PADRAO):
+    """
+    Aplica os passes do otimizador (-O) ao código intermediário e imprime
+    o código resultante e as instruções removidas por cada passe.
+    """
+    antes = len(codigo)
+    removidas = otimizar(codigo, args.desligar)
+    imprimir_codigo(codigo, "Código Intermediário otimizado (-O)", relatorio)
+    imprimir_otimizacoes(removidas, antes, len(codigo), relatorio)
+
+
+def alocar_codigo(codigo, relatorio=SAIDA_PADRAO):
+    """
+    Reaproveita os temporários mortos (--alocar) e imprime o código
+    resultante e quantos temporários cada função passou a usar.
+    """
+    antes, depois, por_unidade = alocar_temporarios(codigo)
+    imprimir_codigo(codigo, "Código Intermediário com temporários realocados (--alocar)",
+                    relatorio)
+    imprimir_alocacao(antes, depois, por_unidade, relatorio)
+
+
+def executar_codigo_gerado(codigo, args, relatorio=SAIDA_PADRAO):
+    """Executa (--executar) e/ou mede (--desempenho) o código gerado."""
+    if args.executar:
+        imprimir_execucao(codigo, relatorio)
+    if args.desempenho:
+        imprimir_desempenho(codigo, args.desempenho, relatorio)
 
+
+# ---------------------------------------------------------------------
+# Saída da compilação (--verbosidade, --saida, --arquivo-saida)
+# ---------------------------------------------------------------------
+
+@contextlib.contextmanager
+def abrir_relatorio(args, destino=None):
+    """
+    Relatorio configurado pela linha de comando. As mensagens acumuladas
+    são escritas ao sair do bloco 'with', mesmo em caso de erro. Sem
+    'destino', usa o arquivo de --arquivo-saida ou a saída padrão.
+    """
+    with contextlib.ExitStack() as pilha:
+        if destino is None and args.arquivo_saida:
+            destino = pilha.enter_context(open(args.arquivo_saida, "w", encoding="utf-8"))
+        relatorio = Relatorio(NIVEIS[args.verbosidade], args.saida, destino)
+        try:
+            yield relatorio
+        finally:
+            relatorio.descarregar()
+
+
+# ---------------------------------------------------------------------
+# Perfil das fases (--perfil)
+# ---------------------------------------------------------------------
+
+@contextlib.contextmanager
+def medir_compilacao(perfil):
+    """
+    Liga as medições do 'perfil' (tracemalloc e contagem de escopos e
+    procuras) durante o bloco 'with'. Sem perfil, não faz nada.
+    """
+    if perfil is SEM_PERFIL:
+        yield
+        return
+    perfil.iniciar()
+    try:
+        with contar_escopos(perfil):
+            yield
+    finally:
+        perfil.encerrar()
+
+
+def gravar_perfil(perfil, args):
+    """Grava o perfil em JSON no arquivo de --perfil ou o imprime ("-")."""
+    dados = {"arquivo": args.arquivo if args.test is None else f"--test {args.test}"}
+    dados.update(perfil.como_dict())
+    if args.perfil == "-":
+        print("\n=== Perfil (--perfil) ===")
+        print(json.dumps(dados, ensure_ascii=False, indent=2))
+    else:
+        with open(args.perfil, "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False, indent=2)
+
+
+# ---------------------------------------------------------------------
+# Compilação em lote (--batch)
+# ---------------------------------------------------------------------
+
+def compilar_arquivo(caminho, args):
+    """
+    Compila um arquivo no modo --batch (executada nos processos do pool).
+
+    A saída das fases é capturada em vez de impressa. Os erros são
+    classificados como em __main__ ("semântico", "execução" ou "compilação").
+
+    Retorna um dicionário com o resultado, usado no relatório:
+        arquivo, sucesso, erro (None ou {"tipo", "mensagem"}), tempo, saida
+        e, com --perfil, perfil (Perfil.como_dict)
+    """
+    saida = io.StringIO()
+    erro = None
+    inicio = time.perf_counter()
+
+    perfil = Perfil() if args.perfil else SEM_PERFIL
+
+    with contextlib.redirect_stdout(saida):
+        try:
+            with abrir_relatorio(args, saida) as relatorio, medir_compilacao(perfil):
+                with perfil.fase("lexico"):
+                    tokens, tabela_simbolos = analisar_caminho(caminho, args)
+                compilar(tokens, tabela_simbolos, args, perfil, relatorio)
+        except SemanticError as e:
+            erro = {"tipo": "semântico", "mensagem": str(e)}
+        except ErroExecucao as e:
+            erro = {"tipo": "execução", "mensagem": str(e)}
+        except Exception as e:
+            erro = {"tipo": "compilação", "mensagem": str(e)}
+
+    resultado = {
+        "arquivo": caminho,
+        "sucesso": erro is None,
+        "erro": erro,
+        "tempo": time.perf_counter() - inicio,
+        "saida": saida.getvalue(),
+    }
+    if perfil is not SEM_PERFIL:
+        resultado["perfil"] = perfil.como_dict()
     return resultado
 
 
+def compilar_lote(args):
+    """
+    Compila todos os arquivos .conv de args.batch (inclusive subdiretórios).
+
+    Com -j N > 1, os arquivos são distribuídos entre N processos de um
+    ProcessPoolExecutor. Cada processo importa o compilador (e monta a
+    tabela LL(1)) uma única vez e é reaproveitado para muitos arquivos.
+    Com -j 1, compila tudo no próprio processo.
+
+    Imprime uma linha por arquivo e um resumo; com --relatorio, grava o
+    relatório completo (incluindo a saída de cada compilação) em JSON.
+
+    Retorna:
+        número de arquivos com erro
+    """
+    diretorio = Path(args.batch)
+    if not diretorio.is_dir():
+        print(f"Diretório '{args.batch}' não encontrado.")
+        sys.exit(1)
+
+    arquivos = sorted(str(p) for p in diretorio.rglob("*.conv"))
+    processos = args.jobs or os.cpu_count() or 1
+
+    inicio = time.perf_counter()
+    if processos == 1 or len(arquivos) <= 1:
+        resultados = [compilar_arquivo(caminho, args) for caminho in arquivos]
+    else:
+        # Lotes de arquivos por tarefa, para amortizar a comunicação entre processos
+        tamanho_lote = max(1, len(arquivos) // (processos * 4))
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            resultados = list(executor.map(compilar_arquivo, arquivos, repeat(args),
+                                            chunksize=tamanho_lote))
+    tempo_total = time.perf_counter() - inicio
+
+    falhas = 0
+    for r in resultados:
+        if r["sucesso"]:
+            print(f"OK    {r['arquivo']} ({r['tempo']:.3f}s)")
+        else:
+            falhas += 1
+            mensagem = r["erro"]["mensagem"].splitlines()[0] if r["erro"]["mensagem"] else ""
+            print(f"ERRO  {r['arquivo']}: erro {r['erro']['tipo']}: {mensagem}")
+
+    print(f"\n{len(resultados)} arquivo(s), {len(resultados) - falhas} com sucesso, "
+          f"{falhas} com erro ({processos} processo(s), {tempo_total:.3f}s)")
+
+    if args.relatorio:
+        relatorio = {
+            "diretorio": str(diretorio),
+            "processos": processos,
+            "arquivos": len(resultados),
+            "sucessos": len(resultados) - falhas,
+            "falhas": falhas,
+            "tempo_total": tempo_total,
+            "resultados": resultados,
+        }
+        with open(args.relatorio, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    return falhas
+
+
 def main():
     """
     Função principal: coordena todas as fases do compilador.
@@ -206,23 +681,28 @@ def main():
     3. Executa o analisador sintático.
     4. Executa o analisador semântico.
     5. Gera o código intermediário em três endereços.
+
+    Com --batch, compila todos os arquivos de um diretório (compilar_lote).
     """
-    codigo = ler_codigo()
+    args = ler_argumentos()
 
-    # Análise léxica
-    tokens, tabela_simbolos = analisar(codigo)
-    print("Tabela de Símbolos:")
-    print(tabela_simbolos)
-    print(token_para_string(tokens))
+    if args.batch is not None:
+        if compilar_lote(args):
+            sys.exit(1)
+        return
 
-    # Análise sintática
-    analisador_sintatico(tokens)
+    perfil = Perfil() if args.perfil else SEM_PERFIL
 
-    # Análise semântica
-    escopo_por_token = analisador_semantico(tokens, tabela_simbolos)
+    # As mensagens das fases são escritas de uma só vez ao fim do bloco
+    # (também se a compilação parar com erro, antes da mensagem de erro)
+    with abrir_relatorio(args) as relatorio, medir_compilacao(perfil):
+        # Análise léxica
+        with perfil.fase("lexico"):
+            tokens, tabela_simbolos = analisar_entrada(args)
+        compilar(tokens, tabela_simbolos, args, perfil, relatorio)
 
-    # Geração de código intermediário
-    analisador_intermediario(tokens, tabela_simbolos, escopo_por_token)
+    if perfil is not SEM_PERFIL:
+        gravar_perfil(perfil, args)
 
 
 if __name__ == "__main__":
@@ -238,6 +718,11 @@ if __name__ == "__main__":
         print("Erro semântico na compilação:")
         print(e)
         sys.exit(1)
+    except ErroExecucao as e:
+        # Erros na execução do código intermediário (--executar, --desempenho)
+        print("Erro na execução:")
+        print(e)
+        sys.exit(1)
     except Exception as e:
         # Demais erros de compilação (léxicos, sintáticos, I/O, etc.)
         # As mensagens geradas nesses pontos já incluem linha e coluna.
@@ -0,0 +1,349 @@
+# maquina.py
+#
+# Máquina virtual que executa o código intermediário (instrucoes.py).
+#
+# Antes da execução, o código é "carregado" (carregar):
+#   - os rótulos são resolvidos para índices de instrução e deixam de
+#     existir como instruções;
+#   - cada operando (temporário, variável ou constante) usado recebe uma
+#     posição (slot) no vetor do quadro de ativação; as constantes já vêm
+#     preenchidas no quadro inicial;
+#   - cada instrução vira uma tupla (tratador, dest, arg1, arg2), em que o
+#     tratador é obtido uma única vez da tabela TRATADORES pelo código de
+#     operação.
+#
+# O laço de execução apenas chama o tratador de cada instrução, que
+# devolve o índice da próxima.
+#
+# Convenções de execução:
+#   - um programa com funções começa pela função 'main' (sem argumentos);
+#     um programa sem funções é executado do início ao fim;
+#   - cada chamada recebe um quadro novo (variáveis locais), com os
+#     parâmetros preenchidos pelos valores dos 'param' mais recentes;
+#   - o comando 'return' da linguagem não gera código: a função termina ao
+#     fim do seu corpo e as chamadas resultam em null;
+#   - variáveis não atribuídas valem null.
+
+
+import io
+import time
+
+from instrucoes import *
+from relatorio import RESUMO, SAIDA_PADRAO
+
+
+class ErroExecucao(Exception):
+    """Erro durante a execução do código intermediário."""
+    pass
+
+
+# Índice devolvido por um tratador para encerrar a execução (return)
+_ENCERRAR = 1 << 62
+
+
+# ---------------------------------------------------------------------
+# Tratadores das instruções
+# ---------------------------------------------------------------------
+# Assinatura: tratador(maquina, quadro, dest, arg1, arg2, pc) -> próximo pc
+
+def _copia(maquina, quadro, d, a, b, pc):
+    quadro[d] = quadro[a]
+    return pc + 1
+
+
+def _goto(maquina, quadro, d, a, b, pc):
+    return a
+
+
+def _se_falso(maquina, quadro, d, a, b, pc):
+    if quadro[a]:
+        return pc + 1
+    return b
+
+
+def _param(maquina, quadro, d, a, b, pc):
+    maquina.parametros.append(quadro[a])
+    return pc + 1
+
+
+def _call(maquina, quadro, d, a, b, pc):
+    quadro[d] = maquina.chamar(a)
+    return pc + 1
+
+
+def _print(maquina, quadro, d, a, b, pc):
+    maquina.saida(formatar_valor(quadro[a]))
+    return pc + 1
+
+
+def _return(maquina, quadro, d, a, b, pc):
+    return _ENCERRAR
+
+
+def _operacao(funcao):
+    """Tratador de uma operação binária 'dest = arg1 op arg2'."""
+    def tratador(maquina, quadro, d, a, b, pc):
+        quadro[d] = funcao(quadro[a], quadro[b])
+        return pc + 1
+    return tratador
+
+
+def _operacao_unaria(funcao):
+    """Tratador de uma operação unária 'dest = op arg1'."""
+    def tratador(maquina, quadro, d, a, b, pc):
+        quadro[d] = funcao(quadro[a])
+        return pc + 1
+    return tratador
+
+
+# Código de operação -> tratador (OP_ROTULO não é executado)
+TRATADORES = [None] * (max(SIMBOLO_OP) + 1)
+TRATADORES[OP_GOTO] = _goto
+TRATADORES[OP_SE_FALSO] = _se_falso
+TRATADORES[OP_COPIA] = _copia
+TRATADORES[OP_PARAM] = _param
+TRATADORES[OP_CALL] = _call
+TRATADORES[OP_PRINT] = _print
+TRATADORES[OP_RETURN] = _return
+for _op, _funcao in OPERACOES.items():
+    if _op in (OP_UNARIO_MAIS, OP_UNARIO_MENOS):
+        TRATADORES[_op] = _operacao_unaria(_funcao)
+    else:
+        TRATADORES[_op] = _operacao(_funcao)
+
+
+def formatar_valor(valor):
+    """Texto impresso por 'print' para um valor."""
+    if valor is None:
+        return "null"
+    return str(valor)
+
+
+# ---------------------------------------------------------------------
+# Carga do código
+# ---------------------------------------------------------------------
+
+class ProgramaCarregado:
+    """
+    Código intermediário pronto para execução.
+
+    Campos:
+        instrucoes : lista de tuplas (tratador, dest, arg1, arg2), sem rótulos
+        textos     : texto de 3 endereços de cada instrução (mensagens de erro)
+        quadro     : quadro inicial (constantes preenchidas, o resto None)
+        funcoes    : nome -> (início, fim, slots dos parâmetros)
+    """
+
+    __slots__ = ("instrucoes", "textos", "quadro", "funcoes")
+
+    def __init__(self, instrucoes, textos, quadro, funcoes):
+        self.instrucoes = instrucoes
+        self.textos = textos
+        self.quadro = quadro
+        self.funcoes = funcoes
+
+
+def carregar(codigo):
+    """Prepara o CodigoIntermediario 'codigo' para execução."""
+    # Posição de cada instrução (e de cada rótulo) sem os rótulos
+    posicao = []
+    destino = {}
+    n = 0
+    for q in codigo:
+        posicao.append(n)
+        if q.op == OP_ROTULO:
+            destino[q.arg1] = n
+        else:
+            n += 1
+    posicao.append(n)
+
+    # Posição (slot) no quadro de cada operando usado, numeradas em ordem
+    # de aparição: temporários reaproveitados (alocacao.py) e operandos
+    # que o otimizador eliminou não ocupam espaço no quadro
+    slots = {}
+
+    def slot(operando):
+        s = slots.get(operando)
+        if s is None:
+            s = slots[operando] = len(slots)
+        return s
+
+    funcoes = {
+        nome: (posicao[f.inicio], posicao[f.fim], tuple(slot(p) for p in f.parametros))
+        for nome, f in codigo.funcoes.items()
+    }
+
+    instrucoes = []
+    textos = []
+    for q in codigo:
+        op = q.op
+        if op == OP_ROTULO:
+            continue
+        d = slot(q.dest) if q.dest != NENHUM else NENHUM
+        a, b = q.arg1, q.arg2
+        if op == OP_GOTO:
+            a = destino[a]
+        elif op == OP_SE_FALSO:
+            a, b = slot(a), destino[b]
+        elif op == OP_CALL:
+            # A função chamada vai em arg1: (nome, trecho) ou (nome, None)
+            nome = codigo.nomes[a]
+            a = (nome, funcoes.get(nome))
+        elif op != OP_RETURN:
+            a = slot(a)
+            if b != NENHUM:
+                b = slot(b)
+        instrucoes.append((TRATADORES[op], d, a, b))
+        textos.append(codigo.formatar(q))
+
+    quadro = [None] * len(slots)
+    for operando, s in slots.items():
+        classe = codigo.classes[operando]
+        if CONST_INT <= classe <= CONST_NULL:
+            quadro[s] = valor_constante(classe, codigo.nomes[operando])
+
+    return ProgramaCarregado(instrucoes, textos, quadro, funcoes)
+
+
+# ---------------------------------------------------------------------
+# Execução
+# ---------------------------------------------------------------------
+
+class MaquinaVirtual:
+    """
+    Executa um ProgramaCarregado.
+
+    Campos:
+        programa   : ProgramaCarregado
+        saida      : função chamada com o texto de cada 'print'
+        parametros : pilha dos valores passados por 'param'
+        executadas : total de instruções executadas
+    """
+
+    def __init__(self, programa, saida=print):
+        self.programa = programa
+        self.saida = saida
+        self.parametros = []
+        self.executadas = 0
+
+    def executar(self):
+        """Executa o programa a partir do seu ponto de entrada."""
+        funcoes = self.programa.funcoes
+        if not funcoes:
+            self._rodar(0, len(self.programa.instrucoes), list(self.programa.quadro))
+        elif "main" in funcoes:
+            self.chamar(("main", funcoes["main"]), argumentos=())
+        else:
+            raise ErroExecucao("Função 'main' não encontrada")
+
+    def chamar(self, funcao, argumentos=None):
+        """
+        Chama 'funcao' ((nome, (início, fim, slots dos parâmetros))) em um
+        quadro novo. Sem 'argumentos', usa os valores do topo da pilha de
+        parâmetros. Retorna o valor da chamada (sempre null).
+        """
+        nome, trecho = funcao
+        if trecho is None:
+            raise ErroExecucao(f"Função '{nome}' não definida")
+        inicio, fim, slots = trecho
+
+        if argumentos is None:
+            k = len(slots)
+            if k > len(self.parametros):
+                raise ErroExecucao(f"Parâmetros insuficientes na chamada de '{nome}'")
+            argumentos = self.parametros[len(self.parametros) - k:]
+            del self.parametros[len(self.parametros) - k:]
+
+        quadro = list(self.programa.quadro)
+        for slot, valor in zip(slots, argumentos):
+            quadro[slot] = valor
+
+        self._rodar(inicio, fim, quadro)
+        return None
+
+    def _rodar(self, inicio, fim, quadro):
+        """Laço de execução das instruções [inicio, fim) sobre 'quadro'."""
+        instrucoes = self.programa.instrucoes
+        pc = inicio
+        executadas = 0
+        try:
+            while pc < fim:
+                tratador, d, a, b = instrucoes[pc]
+                pc = tratador(self, quadro, d, a, b, pc)
+                executadas += 1
+        except ZeroDivisionError:
+            raise ErroExecucao(
+                f"Divisão por zero em '{self.programa.textos[pc]}'"
+            ) from None
+        except TypeError:
+            raise ErroExecucao(
+                f"Operação inválida em '{self.programa.textos[pc]}' "
+                f"(operando null ou de tipo incompatível)"
+            ) from None
+        except RecursionError:
+            raise ErroExecucao("Limite de chamadas aninhadas excedido") from None
+        finally:
+            self.executadas += executadas
+
+
+def executar_codigo(codigo, saida=print):
+    """
+    Carrega e executa o CodigoIntermediario 'codigo'.
+
+    Retorna:
+        a MaquinaVirtual usada (com o total de instruções executadas).
+    """
+    maquina = MaquinaVirtual(carregar(codigo), saida)
+    maquina.executar()
+    return maquina
+
+
+def imprimir_execucao(codigo, relatorio=SAIDA_PADRAO):
+    """Executa o código e registra a saída do programa."""
+    if not relatorio.ativo(RESUMO):
+        executar_codigo(codigo, io.StringIO().write)
+        return
+    relatorio.registrar(RESUMO, "secao", "\n=== Execução ===", titulo="Execução")
+    maquina = executar_codigo(
+        codigo, lambda texto: relatorio.registrar(RESUMO, "saida", texto)
+    )
+    relatorio.registrar(RESUMO, "execucao", f"({maquina.executadas} instruções executadas)",
+                        instrucoes=maquina.executadas)
+
+
+# ---------------------------------------------------------------------
+# Medição de desempenho
+# ---------------------------------------------------------------------
+
+def medir_desempenho(codigo, repeticoes=10):
+    """
+    Executa o código 'repeticoes' vezes (descartando a saída) e retorna
+    (instruções executadas, segundos, instruções por segundo).
+    A carga é feita uma única vez, fora da medição.
+    """
+    programa = carregar(codigo)
+    descarte = io.StringIO().write
+
+    executadas = 0
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        maquina = MaquinaVirtual(programa, descarte)
+        maquina.executar()
+        executadas += maquina.executadas
+    segundos = time.perf_counter() - inicio
+
+    por_segundo = executadas / segundos if segundos > 0 else 0.0
+    return executadas, segundos, por_segundo
+
+
+def imprimir_desempenho(codigo, repeticoes=10, relatorio=SAIDA_PADRAO):
+    """Registra o resultado de medir_desempenho."""
+    executadas, segundos, por_segundo = medir_desempenho(codigo, repeticoes)
+    if not relatorio.ativo(RESUMO):
+        return
+    relatorio.registrar(RESUMO, "desempenho",
+                        f"\n=== Desempenho da máquina virtual ({repeticoes} execuções) ===\n"
+                        f"{executadas} instruções em {segundos:.3f}s "
+                        f"({por_segundo:,.0f} instruções/s)",
+                        repeticoes=repeticoes, instrucoes=executadas, segundos=segundos,
+                        instrucoes_por_segundo=por_segundo)
@@ -0,0 +1,630 @@
+# otimizador.py
+#
+# Otimizações sobre o código intermediário estruturado (instrucoes.py).
+#
+# O gerador de código produz um código simples e redundante: cada literal
+# ganha um temporário próprio, cada atribuição passa por um temporário,
+# subexpressões repetidas são recalculadas, etc. Este módulo implementa um
+# gerenciador de passes (opção -O do main.py) com:
+#
+#   - divisão em blocos básicos (fluxo.blocos_basicos)
+#   - "constantes"  : dobramento e propagação de constantes (local ao bloco)
+#   - "copias"      : propagação de cópias (local ao bloco) e fusão de
+#                     "t = expr; x = t" em "x = expr"
+#   - "cse"         : eliminação de subexpressões comuns por numeração de
+#                     valores (local ao bloco)
+#   - "temporarios" : remoção de temporários mortos
+#   - "saltos"      : encadeamento de desvios (goto L1; L1: goto L2),
+#                     remoção de "goto L; L:", de código inalcançável e de
+#                     rótulos não usados
+#   - "invariantes" : movimentação, para antes do laço, das operações
+#                     invariantes do cabeçalho de cada laço (a condição
+#                     do for); as do corpo ficam onde estão, pois só são
+#                     executadas se a condição for verdadeira
+#
+# Cada passe pode ser desligado individualmente e o gerenciador informa
+# quantas instruções cada um removeu.
+#
+# Os passes não compactam o código: cada um marca, num conjunto de posições
+# compartilhado pela rodada, as instruções que elimina (e ignora as já
+# marcadas pelos anteriores), e o gerenciador remove todas de uma vez no
+# fim da rodada. Cada passe informa também se alterou alguma instrução no
+# lugar; a rodada que não remove nem altera nada encerra a otimização.
+#
+# Hipóteses (válidas para o código produzido por intermediario.py):
+#   - cada temporário é definido uma única vez;
+#   - uma chamada de função pode alterar qualquer variável do programa;
+#   - o corpo de cada função (CodigoIntermediario.funcoes) é um ponto de
+#     entrada: nenhum bloco básico atravessa o início de uma função.
+
+
+from bisect import bisect_left
+
+from instrucoes import *
+from fluxo import blocos_basicos, entradas_funcoes, usos
+from relatorio import RESUMO, SAIDA_PADRAO
+
+
+# Operações sem efeito colateral que definem 'dest' a partir de arg1/arg2
+_OPS_PURAS = frozenset(SIMBOLO_OP) | {OP_COPIA}
+
+# Operações comutativas (para a numeração de valores)
+_OPS_COMUTATIVAS = frozenset({OP_SOMA, OP_MUL, OP_IGUAL, OP_DIFERENTE})
+
+_CONSTANTES_NUMERICAS = frozenset({CONST_INT, CONST_FLOAT})
+_CONSTANTES = frozenset({CONST_INT, CONST_FLOAT, CONST_STRING, CONST_NULL})
+
+
+def _substituir_usos(q, mapa):
+    """Troca os operandos lidos por 'q' segundo 'mapa'. Retorna True se mudou."""
+    mudou = False
+    if q.op in (OP_ROTULO, OP_GOTO, OP_RETURN, OP_CALL):
+        return False
+    novo = mapa.get(q.arg1)
+    if novo is not None:
+        q.arg1 = novo
+        mudou = True
+    if q.op != OP_SE_FALSO and q.arg2 != NENHUM:
+        novo = mapa.get(q.arg2)
+        if novo is not None:
+            q.arg2 = novo
+            mudou = True
+    return mudou
+
+
+def _esquecer_variaveis(mapa, codigo):
+    """Remove de 'mapa' tudo o que envolve variáveis (após uma chamada)."""
+    classes = codigo.classes
+    for chave in [k for k, v in mapa.items()
+                  if classes[k] == VARIAVEL or classes[v] == VARIAVEL]:
+        del mapa[chave]
+
+
+# ---------------------------------------------------------------------
+# Dobramento e propagação de constantes
+# ---------------------------------------------------------------------
+
+def _valor(codigo, operando):
+    """Valor Python de uma constante numérica."""
+    return valor_constante(codigo.classes[operando], codigo.nomes[operando])
+
+
+def _dobrar(codigo, q):
+    """
+    Tenta calcular a instrução 'q' com operandos constantes (com a mesma
+    semântica da execução, instrucoes.OPERACOES).
+    Retorna o operando constante do resultado, ou None.
+    """
+    classes = codigo.classes
+    classe = classes[q.arg1]
+    if classe not in _CONSTANTES_NUMERICAS:
+        return None
+    argumentos = [_valor(codigo, q.arg1)]
+    if q.arg2 != NENHUM:
+        if classes[q.arg2] != classe:
+            return None
+        argumentos.append(_valor(codigo, q.arg2))
+
+    try:
+        r = OPERACOES[q.op](*argumentos)
+    except ZeroDivisionError:
+        return None
+
+    if type(r) is int:
+        return codigo.operando(CONST_INT, str(r))
+    return codigo.operando(CONST_FLOAT, repr(r))
+
+
+def propagar_constantes(codigo, removidas):
+    """
+    Dobramento e propagação de constantes dentro de cada bloco básico.
+
+      - "x = c" registra que x vale a constante c até x ser redefinido
+        (ou, se x é variável, até uma chamada de função);
+      - usos de x no bloco passam a usar c diretamente;
+      - operações com todos os operandos constantes viram "dest = c";
+      - "if not c goto L" com c constante vira "goto L" ou é removido.
+
+    Um temporário definido como constante ("t = c") é substituído em todo
+    o código (temporários são definidos uma única vez) e a sua definição
+    é removida.
+
+    Marca em 'removidas' as instruções eliminadas. Retorna True se alterou
+    alguma das demais.
+    """
+    classes = codigo.classes
+    mudou = False
+    temporarios = {}    # temporário -> operando constante
+
+    for inicio, fim in blocos_basicos(codigo, removidas=removidas):
+        constantes = {}     # operando -> operando constante
+        for i in range(inicio, fim):
+            if i in removidas:
+                continue
+            q = codigo[i]
+            mudou |= _substituir_usos(q, temporarios)
+            mudou |= _substituir_usos(q, constantes)
+
+            if q.op == OP_SE_FALSO:
+                if classes[q.arg1] in _CONSTANTES_NUMERICAS:
+                    if _valor(codigo, q.arg1) != 0:
+                        removidas.add(i)
+                    else:
+                        q.op, q.arg1, q.arg2 = OP_GOTO, q.arg2, NENHUM
+                        mudou = True
+                continue
+
+            if q.op == OP_CALL:
+                _esquecer_variaveis(constantes, codigo)
+                constantes.pop(q.dest, None)
+                continue
+
+            if q.op not in _OPS_PURAS:
+                continue
+
+            if q.op != OP_COPIA:
+                c = _dobrar(codigo, q)
+                if c is not None:
+                    q.op, q.arg1, q.arg2 = OP_COPIA, c, NENHUM
+                    mudou = True
+
+            # Redefinição de dest: esquece o valor antigo
+            constantes.pop(q.dest, None)
+            if q.op == OP_COPIA and classes[q.arg1] in _CONSTANTES:
+                if classes[q.dest] == TEMP:
+                    temporarios[q.dest] = q.arg1
+                    removidas.add(i)
+                else:
+                    constantes[q.dest] = q.arg1
+
+    # Usos de temporários fora do bloco em que foram definidos
+    if temporarios:
+        for i, q in enumerate(codigo):
+            if i not in removidas:
+                mudou |= _substituir_usos(q, temporarios)
+
+    return mudou
+
+
+# ---------------------------------------------------------------------
+# Propagação de cópias
+# ---------------------------------------------------------------------
+
+def _contar_usos(codigo, removidas):
+    """Número de leituras de cada operando no código (fora de 'removidas')."""
+    leituras = {}
+    for i, q in enumerate(codigo):
+        if i not in removidas:
+            for u in usos(q):
+                leituras[u] = leituras.get(u, 0) + 1
+    return leituras
+
+
+def propagar_copias(codigo, removidas):
+    """
+    Propagação de cópias dentro de cada bloco básico.
+
+      - "t = expr; x = t", com t temporário lido apenas ali, vira "x = expr";
+      - depois de "x = y", os usos de x no bloco passam a ler y, enquanto
+        nem x nem y forem redefinidos.
+
+    Marca em 'removidas' as instruções eliminadas. Retorna True se alterou
+    alguma das demais.
+    """
+    classes = codigo.classes
+    leituras = _contar_usos(codigo, removidas)
+    mudou = False
+
+    for inicio, fim in blocos_basicos(codigo, removidas=removidas):
+        # Fusão de "t = expr; x = t" (pares de instruções consecutivas)
+        restantes = [i for i in range(inicio, fim) if i not in removidas]
+        for i, j in zip(restantes, restantes[1:]):
+            q = codigo[i]
+            prox = codigo[j]
+            if (prox.op == OP_COPIA and prox.arg1 == q.dest and q.dest != NENHUM
+                    and (q.op in _OPS_PURAS or q.op == OP_CALL)
+                    and classes[q.dest] == TEMP and leituras.get(q.dest) == 1
+                    and i not in removidas):
+                codigo[i] = Quadrupla(q.op, prox.dest, q.arg1, q.arg2)
+                removidas.add(j)
+                mudou = True
+
+        copias = {}     # destino -> origem
+        for i in range(inicio, fim):
+            if i in removidas:
+                continue
+            q = codigo[i]
+            mudou |= _substituir_usos(q, copias)
+
+            if q.op == OP_CALL:
+                _esquecer_variaveis(copias, codigo)
+            if q.op in _OPS_PURAS or q.op == OP_CALL:
+                d = q.dest
+                for k in [k for k, v in copias.items() if k == d or v == d]:
+                    del copias[k]
+                if q.op == OP_COPIA and classes[q.arg1] in (TEMP, VARIAVEL) and q.arg1 != d:
+                    copias[d] = q.arg1
+
+    return mudou
+
+
+# ---------------------------------------------------------------------
+# Eliminação de subexpressões comuns (numeração de valores)
+# ---------------------------------------------------------------------
+
+def eliminar_subexpressoes(codigo, removidas):
+    """
+    Eliminação local de subexpressões comuns por numeração de valores.
+
+    Cada operando recebe um número de valor; uma operação (op, vn1, vn2)
+    já calculada no bloco, cujo resultado ainda está guardado em algum
+    operando, não é recalculada:
+
+      - se o resultado anterior está num temporário, a instrução é removida
+        e os usos do seu destino passam a ler esse temporário (temporários
+        são definidos uma única vez, então a troca vale em todo o código);
+      - se está numa variável, a instrução vira uma cópia da variável.
+
+    Marca em 'removidas' as instruções eliminadas. Retorna True se alterou
+    alguma das demais.
+    """
+    classes = codigo.classes
+    mudou = False
+    apelidos = {}       # temporário removido -> temporário equivalente
+
+    for inicio, fim in blocos_basicos(codigo, removidas=removidas):
+        numero = {}         # operando -> número de valor
+        expressoes = {}     # (op, vn1, vn2) -> (vn, operando que o guarda)
+        proximo = [0]
+
+        def vn(operando):
+            v = numero.get(operando)
+            if v is None:
+                v = proximo[0]
+                proximo[0] += 1
+                numero[operando] = v
+            return v
+
+        for i in range(inicio, fim):
+            if i in removidas:
+                continue
+            q = codigo[i]
+            mudou |= _substituir_usos(q, apelidos)
+
+            if q.op == OP_CALL:
+                for k in [k for k in numero if classes[k] == VARIAVEL]:
+                    del numero[k]
+                numero.pop(q.dest, None)
+                continue
+
+            if q.op not in _OPS_PURAS:
+                continue
+
+            if q.op == OP_COPIA:
+                v = vn(q.arg1)
+            else:
+                v1 = vn(q.arg1)
+                v2 = vn(q.arg2) if q.arg2 != NENHUM else NENHUM
+                if q.op in _OPS_COMUTATIVAS and v2 < v1:
+                    v1, v2 = v2, v1
+                chave = (q.op, v1, v2)
+                anterior = expressoes.get(chave)
+                if anterior is not None and numero.get(anterior[1]) == anterior[0] \
+                        and anterior[1] != q.dest:
+                    v, guarda = anterior
+                    if classes[q.dest] == TEMP and classes[guarda] == TEMP:
+                        apelidos[q.dest] = guarda
+                        removidas.add(i)
+                        continue
+                    q.op, q.arg1, q.arg2 = OP_COPIA, guarda, NENHUM
+                    mudou = True
+                else:
+                    v = proximo[0]
+                    proximo[0] += 1
+                    expressoes[chave] = (v, q.dest)
+
+            numero[q.dest] = v
+
+    # Usos fora do bloco em que o temporário foi definido
+    if apelidos:
+        for i, q in enumerate(codigo):
+            if i not in removidas:
+                mudou |= _substituir_usos(q, apelidos)
+
+    return mudou
+
+
+# ---------------------------------------------------------------------
+# Temporários mortos
+# ---------------------------------------------------------------------
+
+def eliminar_temporarios_mortos(codigo, removidas):
+    """
+    Remove as instruções sem efeito colateral que definem temporários
+    nunca lidos (repetindo até não haver mais nenhum).
+
+    Marca em 'removidas' as instruções eliminadas; não altera as demais
+    (retorna sempre False).
+    """
+    classes = codigo.classes
+
+    while True:
+        leituras = {}
+        for i, q in enumerate(codigo):
+            if i not in removidas:
+                for u in usos(q):
+                    leituras[u] = leituras.get(u, 0) + 1
+        novas = [i for i, q in enumerate(codigo)
+                 if i not in removidas and q.op in _OPS_PURAS
+                 and classes[q.dest] == TEMP and q.dest not in leituras]
+        if not novas:
+            break
+        removidas.update(novas)
+
+    return False
+
+
+# ---------------------------------------------------------------------
+# Encadeamento de desvios
+# ---------------------------------------------------------------------
+
+def _proximas(codigo, removidas):
+    """
+    proximas[i]: índice da primeira instrução em [i, n) que não é rótulo
+    nem está em 'removidas' (n se não há nenhuma). Uma posição extra,
+    proximas[n] = n, dispensa testes de limite.
+    """
+    n = len(codigo)
+    proximas = [n] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        if i in removidas or codigo[i].op == OP_ROTULO:
+            proximas[i] = proximas[i + 1]
+        else:
+            proximas[i] = i
+    return proximas
+
+
+def encadear_saltos(codigo, removidas):
+    """
+    Simplifica o fluxo de controle:
+
+      - um desvio para L, em que L: é seguido (após outros rótulos) de
+        "goto L2", passa a desviar direto para L2;
+      - "goto L" imediatamente seguido (após outros rótulos) de "L:" é
+        removido;
+      - instruções após um goto/return, até o próximo rótulo, são
+        inalcançáveis e removidas;
+      - rótulos que nenhum desvio usa são removidos.
+
+    Marca em 'removidas' as instruções eliminadas. Retorna True se alterou
+    alguma das demais.
+    """
+    n = len(codigo)
+    mudou = False
+
+    # Posição de cada rótulo e, para cada posição, a próxima instrução
+    # "real" (que não é rótulo); calculadas uma vez para todo o passe
+    posicao = {q.arg1: i for i, q in enumerate(codigo)
+               if q.op == OP_ROTULO and i not in removidas}
+    proximas = _proximas(codigo, removidas)
+    finais = {}     # rótulo -> destino final (só para cadeias sem ciclo)
+
+    def destino_final(rotulo):
+        final = finais.get(rotulo)
+        if final is not None:
+            return final
+        caminho = []
+        vistos = set()
+        while rotulo not in vistos:
+            vistos.add(rotulo)
+            j = posicao.get(rotulo)
+            if j is None:
+                break
+            j = proximas[j]
+            if j < n and codigo[j].op == OP_GOTO:
+                caminho.append(rotulo)
+                rotulo = codigo[j].arg1
+                final = finais.get(rotulo)
+                if final is not None:
+                    rotulo = final
+                    break
+            else:
+                break
+        else:
+            # ciclo de desvios: o resultado depende do ponto de partida
+            return rotulo
+        for anterior in caminho:
+            finais[anterior] = rotulo
+        finais[rotulo] = rotulo
+        return rotulo
+
+    for i, q in enumerate(codigo):
+        if i in removidas:
+            continue
+        if q.op == OP_GOTO:
+            destino = destino_final(q.arg1)
+            if destino != q.arg1:
+                q.arg1 = destino
+                mudou = True
+        elif q.op == OP_SE_FALSO:
+            destino = destino_final(q.arg2)
+            if destino != q.arg2:
+                q.arg2 = destino
+                mudou = True
+
+    # Código inalcançável
+    entradas = entradas_funcoes(codigo, removidas)
+    inalcancavel = False
+    for i, q in enumerate(codigo):
+        if i in removidas:
+            continue
+        if q.op == OP_ROTULO or i in entradas:
+            inalcancavel = False
+        elif inalcancavel:
+            removidas.add(i)
+        elif q.op in (OP_GOTO, OP_RETURN):
+            inalcancavel = True
+
+    # "goto L" seguido de "L:" (só rótulos entre eles); as remoções deste
+    # laço ficam sempre atrás da posição examinada, então as próximas
+    # instruções podem ser calculadas antes dele
+    proximas = _proximas(codigo, removidas)
+    for i, q in enumerate(codigo):
+        if q.op == OP_GOTO and i not in removidas:
+            j = posicao.get(q.arg1)
+            if j is not None and i < j < proximas[i + 1]:
+                removidas.add(i)
+
+    # Rótulos não usados
+    usados = set()
+    for i, q in enumerate(codigo):
+        if i in removidas:
+            continue
+        if q.op == OP_GOTO:
+            usados.add(q.arg1)
+        elif q.op == OP_SE_FALSO:
+            usados.add(q.arg2)
+    for i, q in enumerate(codigo):
+        if q.op == OP_ROTULO and q.arg1 not in usados and i not in removidas:
+            removidas.add(i)
+
+    return mudou
+
+
+# ---------------------------------------------------------------------
+# Invariantes de laço
+# ---------------------------------------------------------------------
+
+def mover_invariantes(codigo, removidas):
+    """
+    Move para antes de cada laço as operações invariantes do seu cabeçalho.
+
+    Um laço é um trecho [p, g] em que p é um rótulo e g um "goto" para ele
+    (desvio para trás). O cabeçalho são as instruções logo após o rótulo,
+    até a primeira que não é uma operação pura (no for, o cálculo da
+    condição antes do "if not"): ele é executado sempre que o laço começa,
+    de modo que calcular uma operação dele uma única vez, antes do rótulo,
+    não executa nada que o programa original não executaria. Uma operação
+    do cabeçalho é movida se define um temporário e os seus operandos são
+    constantes, temporários definidos fora do laço (ou já movidos) ou
+    variáveis que o laço não redefine, num laço sem chamadas de função.
+
+    A instrução movida vai para a posição do rótulo, e o rótulo e as
+    instruções entre eles avançam uma posição; por isso nenhuma dessas
+    posições pode estar em 'removidas' (o laço fica para a próxima
+    rodada). Não remove instruções; retorna True se moveu alguma.
+    """
+    classes = codigo.classes
+    n = len(codigo)
+
+    posicao = {}        # rótulo -> posição
+    definicoes = {}     # operando -> posições (crescentes) que o definem
+    chamadas = [0]      # chamadas[i]: chamadas de função em [0, i)
+    for i, q in enumerate(codigo):
+        ativa = i not in removidas
+        chamadas.append(chamadas[-1] + (ativa and q.op == OP_CALL))
+        if not ativa:
+            continue
+        if q.op == OP_ROTULO:
+            posicao[q.arg1] = i
+        elif q.dest != NENHUM:
+            definicoes.setdefault(q.dest, []).append(i)
+
+    # Último desvio para trás de cada rótulo: laço [p, g]
+    lacos = {}
+    for g, q in enumerate(codigo):
+        if q.op == OP_GOTO and g not in removidas:
+            p = posicao.get(q.arg1)
+            if p is not None and p < g:
+                lacos[p] = g
+
+    def definido_em(operando, p, g):
+        posicoes = definicoes.get(operando, ())
+        k = bisect_left(posicoes, p)
+        return k < len(posicoes) and posicoes[k] <= g
+
+    mudou = False
+    for p, g in lacos.items():
+        sem_chamadas = chamadas[g + 1] == chamadas[p]
+        movidos = set()
+
+        def invariante(operando):
+            classe = classes[operando]
+            if classe == TEMP:
+                return operando in movidos or not definido_em(operando, p, g)
+            if classe == VARIAVEL:
+                return sem_chamadas and not definido_em(operando, p, g)
+            return True
+
+        h = p + 1
+        while h < g and h not in removidas and codigo[h].op in _OPS_PURAS:
+            q = codigo[h]
+            if (classes[q.dest] == TEMP and len(definicoes[q.dest]) == 1
+                    and invariante(q.arg1)
+                    and (q.arg2 == NENHUM or invariante(q.arg2))):
+                # q passa para a posição p; o rótulo e o trecho [p, h) avançam
+                codigo[p:h + 1] = [q, *codigo[p:h]]
+                movidos.add(q.dest)
+                p += 1
+                mudou = True
+            h += 1
+
+    return mudou
+
+
+# ---------------------------------------------------------------------
+# Gerenciador de passes
+# ---------------------------------------------------------------------
+
+# Passes disponíveis, na ordem em que são aplicados
+PASSES = (
+    ("constantes", propagar_constantes),
+    ("copias", propagar_copias),
+    ("cse", eliminar_subexpressoes),
+    ("temporarios", eliminar_temporarios_mortos),
+    ("saltos", encadear_saltos),
+    ("invariantes", mover_invariantes),
+)
+NOMES_PASSES = tuple(nome for nome, _ in PASSES)
+
+# Limite de rodadas do gerenciador (cada rodada aplica todos os passes)
+MAX_RODADAS = 10
+
+
+def otimizar(codigo, desativados=()):
+    """
+    Aplica os passes de PASSES (exceto os de 'desativados') sobre 'codigo',
+    em rodadas, até que uma rodada inteira não altere mais o código (ou
+    até MAX_RODADAS). As instruções eliminadas pelos passes de uma rodada
+    são removidas de uma só vez, no fim dela.
+
+    Retorna:
+        dicionário nome do passe -> total de instruções removidas
+    """
+    ativos = [(nome, passe) for nome, passe in PASSES if nome not in desativados]
+    removidas = {nome: 0 for nome, _ in ativos}
+
+    for _ in range(MAX_RODADAS):
+        rodada = set()      # posições eliminadas nesta rodada
+        mudou = False
+        for nome, passe in ativos:
+            antes = len(rodada)
+            mudou |= passe(codigo, rodada)
+            removidas[nome] += len(rodada) - antes
+        codigo.remover(rodada)
+        if not mudou and not rodada:
+            break
+
+    return removidas
+
+
+def imprimir_otimizacoes(removidas, total_antes, total_depois, relatorio=SAIDA_PADRAO):
+    """Registra o resumo do otimizador (instruções removidas por passe)."""
+    if not relatorio.ativo(RESUMO):
+        return
+    linhas = ["\n=== Otimizações (-O) ==="]
+    for nome, quantidade in removidas.items():
+        linhas.append(f"{nome}: {quantidade} instrução(ões) removida(s)")
+    linhas.append(f"Total: {total_antes} -> {total_depois} instruções")
+    relatorio.registrar(RESUMO, "otimizacoes", "\n".join(linhas),
+                        removidas=removidas, antes=total_antes, depois=total_depois)
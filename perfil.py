@@ -0,0 +1,157 @@
+# perfil.py
+#
+# Medição das fases do compilador (opção --perfil / --profile do main.py).
+#
+# Para cada fase (léxico, sintático, semântico, geração de código, ...)
+# são medidos:
+#   - o tempo de relógio (time.perf_counter);
+#   - o tempo de CPU do processo (time.process_time);
+#   - o pico de memória alocada pelo Python durante a fase (tracemalloc).
+#
+# Além das fases, são registrados contadores da compilação: tokens,
+# passos e profundidade máxima da pilha do sintático, escopos criados,
+# procuras de símbolos (e quantos escopos cada uma visitou na cadeia de
+# Escopo.percorrer; tokens já ligados a um símbolo não contam),
+# temporários, rótulos e instruções emitidos.
+#
+# O resultado é um dicionário serializável em JSON (Perfil.como_dict).
+#
+# O tracemalloc deixa a execução bem mais lenta; os tempos medidos com
+# ele ligado servem para comparar fases entre si e entre versões, não
+# como tempo absoluto de compilação.
+
+
+import contextlib
+import time
+import tracemalloc
+
+from semantico import Escopo
+
+
+class Perfil:
+    """
+    Medições de uma compilação.
+
+    Campos:
+        fases      : lista de dicionários, um por fase, na ordem de execução
+                     (nome, tempo, cpu, memoria_pico)
+        contadores : nome -> valor (None se os contadores estão desligados)
+        memoria    : se True, mede o pico de memória com tracemalloc
+    """
+
+    def __init__(self, memoria=True, contadores=True):
+        self.fases = []
+        self.contadores = {} if contadores else None
+        self.memoria = memoria
+        self._iniciou_tracemalloc = False
+
+    def iniciar(self):
+        """Liga o tracemalloc (se ainda não estiver ligado)."""
+        if self.memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._iniciou_tracemalloc = True
+
+    def encerrar(self):
+        """Desliga o tracemalloc, se foi ligado por iniciar."""
+        if self._iniciou_tracemalloc:
+            tracemalloc.stop()
+            self._iniciou_tracemalloc = False
+
+    @contextlib.contextmanager
+    def fase(self, nome):
+        """Mede o bloco 'with' como a fase 'nome'."""
+        medir_memoria = self.memoria and tracemalloc.is_tracing()
+        if medir_memoria:
+            tracemalloc.reset_peak()
+        tempo = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            registro = {
+                "nome": nome,
+                "tempo": time.perf_counter() - tempo,
+                "cpu": time.process_time() - cpu,
+            }
+            if medir_memoria:
+                registro["memoria_pico"] = tracemalloc.get_traced_memory()[1]
+            self.fases.append(registro)
+
+    def contar(self, nome, valor=1):
+        """Soma 'valor' ao contador 'nome'."""
+        if self.contadores is None:
+            return
+        self.contadores[nome] = self.contadores.get(nome, 0) + valor
+
+    def como_dict(self):
+        """Resultado em forma serializável (JSON)."""
+        total = {
+            "tempo": sum(f["tempo"] for f in self.fases),
+            "cpu": sum(f["cpu"] for f in self.fases),
+        }
+        if any("memoria_pico" in f for f in self.fases):
+            total["memoria_pico"] = max(f.get("memoria_pico", 0) for f in self.fases)
+        return {
+            "fases": self.fases,
+            "total": total,
+            "contadores": dict(sorted((self.contadores or {}).items())),
+        }
+
+
+class _SemPerfil:
+    """Perfil desligado: as fases não são medidas e nada é contado."""
+
+    contadores = None
+
+    def fase(self, nome):
+        return contextlib.nullcontext()
+
+    def contar(self, nome, valor=1):
+        pass
+
+
+SEM_PERFIL = _SemPerfil()
+
+
+# ---------------------------------------------------------------------
+# Contagem de escopos e procuras de símbolos
+# ---------------------------------------------------------------------
+
+@contextlib.contextmanager
+def contar_escopos(perfil):
+    """
+    Durante o bloco 'with', conta os escopos criados e as procuras de
+    símbolos (Escopo.percorrer), com o número de escopos visitados.
+
+    Os métodos de Escopo são trocados por versões com contagem apenas
+    dentro do bloco; fora dele (e sem --perfil) a classe não muda.
+    """
+    contadores = perfil.contadores
+    for nome in ("escopos_criados", "procuras", "procuras_nao_encontradas",
+                 "procuras_profundidade_total", "procuras_profundidade_max"):
+        contadores.setdefault(nome, 0)
+
+    init_original = Escopo.__init__
+    percorrer_original = Escopo.percorrer
+
+    def init_contado(self, *args, **kwargs):
+        init_original(self, *args, **kwargs)
+        contadores["escopos_criados"] += 1
+
+    def percorrer_contado(self, indice):
+        resultado, profundidade = percorrer_original(self, indice)
+        contadores["procuras"] += 1
+        contadores["procuras_profundidade_total"] += profundidade
+        if profundidade > contadores["procuras_profundidade_max"]:
+            contadores["procuras_profundidade_max"] = profundidade
+        if resultado is None:
+            contadores["procuras_nao_encontradas"] += 1
+        return resultado, profundidade
+
+    Escopo.__init__ = init_contado
+    Escopo.percorrer = percorrer_contado
+    try:
+        yield
+    finally:
+        Escopo.__init__ = init_original
+        Escopo.percorrer = percorrer_original
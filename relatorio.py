@@ -0,0 +1,108 @@
+# relatorio.py
+#
+# Camada de saída do compilador: tudo o que as fases exibem (tabelas,
+# tokens, árvores de expressão, código intermediário, mensagens e resumos)
+# passa por um Relatorio, em vez de ir direto para print.
+#
+# Níveis de verbosidade (opção --verbosidade do main.py):
+#   silencioso : nada é exibido
+#   resumo     : mensagens de sucesso, resumos (-O, --alocar, caches) e a
+#                saída do programa executado (--executar)
+#   completo   : também tabela de símbolos, tokens, árvores de expressão e
+#                código intermediário (padrão, a saída de sempre)
+#
+# Formatos (opção --saida):
+#   texto   : o texto de sempre
+#   jsonl   : um objeto JSON por linha: {"tipo", "nivel", ...}
+#   nenhuma : nada é exibido (equivale a silencioso)
+#
+# O destino é a saída padrão ou um arquivo (--arquivo-saida). As partes
+# registradas são acumuladas e escritas de uma só vez em descarregar (ou
+# quando o acumulado passa de LIMITE_BUFFER caracteres).
+#
+# Quem registra uma mensagem cara de formatar deve antes consultar
+# ativo(nivel): com a saída desligada, nenhuma formatação é feita.
+
+
+import json
+import sys
+
+
+SILENCIOSO = 0
+RESUMO = 1
+COMPLETO = 2
+
+NIVEIS = {"silencioso": SILENCIOSO, "resumo": RESUMO, "completo": COMPLETO}
+NOMES_NIVEIS = {nivel: nome for nome, nivel in NIVEIS.items()}
+
+FORMATOS = ("texto", "jsonl", "nenhuma")
+
+# Caracteres acumulados antes de uma escrita forçada
+LIMITE_BUFFER = 1 << 22
+
+
+class Relatorio:
+    """
+    Destino das mensagens de uma compilação.
+
+    Campos:
+        nivel    : nível máximo registrado (SILENCIOSO, RESUMO ou COMPLETO)
+        formato  : "texto" ou "jsonl"
+        destino  : arquivo (objeto com write) ou None para sys.stdout
+        imediato : se True, cada mensagem é escrita na hora (sem acúmulo)
+        partes   : mensagens acumuladas ainda não escritas
+    """
+
+    def __init__(self, nivel=COMPLETO, formato="texto", destino=None, imediato=False):
+        if formato == "nenhuma":
+            nivel = SILENCIOSO
+        self.nivel = nivel
+        self.formato = formato
+        self.destino = destino
+        self.imediato = imediato
+        self.partes = []
+        self._tamanho = 0
+
+    def ativo(self, nivel):
+        """True se as mensagens de 'nivel' são registradas."""
+        return nivel <= self.nivel
+
+    def registrar(self, nivel, tipo, texto, **dados):
+        """
+        Registra uma mensagem de 'nivel'. Em texto, escreve 'texto' seguido
+        de uma quebra de linha. Em JSON, escreve {"tipo", "nivel", **dados}
+        ou, sem dados, {"tipo", "nivel", "texto"}.
+        """
+        if nivel > self.nivel:
+            return
+        if self.formato == "jsonl":
+            registro = {"tipo": tipo, "nivel": NOMES_NIVEIS[nivel]}
+            registro.update(dados or {"texto": texto})
+            parte = json.dumps(registro, ensure_ascii=False) + "\n"
+        else:
+            parte = texto + "\n"
+
+        if self.imediato:
+            self._escrever(parte)
+            return
+        self.partes.append(parte)
+        self._tamanho += len(parte)
+        if self._tamanho >= LIMITE_BUFFER:
+            self.descarregar()
+
+    def descarregar(self):
+        """Escreve de uma só vez as mensagens acumuladas."""
+        if self.partes:
+            texto = "".join(self.partes)
+            self.partes = []
+            self._tamanho = 0
+            self._escrever(texto)
+
+    def _escrever(self, texto):
+        destino = self.destino if self.destino is not None else sys.stdout
+        destino.write(texto)
+
+
+# Saída usada quando uma fase é chamada sem Relatorio: texto completo,
+# escrito na hora na saída padrão (o comportamento de print)
+SAIDA_PADRAO = Relatorio(imediato=True)
@@ -8,10 +8,14 @@
 #     * uso de identificadores não declarados
 #     * uso de break fora de laços
 #     * tipos em expressões e atribuições
-# - Construção de árvores de expressão para debug (pré-ordem impressa)
+# - Construção de árvores de expressão para debug (pré-ordem, registrada
+#   no Relatorio da compilação; ver relatorio.py)
 
 
-from lexico import tabela_simbolos, Token
+from bisect import bisect_right
+
+from lexico import Token, casar_delimitadores
+from relatorio import COMPLETO, RESUMO, SAIDA_PADRAO
 
 
 class SemanticError(Exception):
@@ -28,15 +32,29 @@ class SimboloSemantico:
         tipo      : 'int', 'float', 'string' ou None (para funções, por exemplo)
         categoria : 'var', 'param' ou 'func'
         escopo    : referência para o objeto Escopo onde foi declarado
-        linha_decl, coluna_decl : posição da declaração no código fonte
+        token_decl: Token do identificador na declaração
+        operando  : nome da variável no código intermediário, único entre
+                    as declarações da mesma função (ver Escopo.qualificar);
+                    por padrão, o próprio nome
+
+    A posição da declaração (linha_decl, coluna_decl) é calculada a partir
+    do token só quando consultada.
     """
-    def __init__(self, nome, tipo, categoria, escopo, linha_decl, coluna_decl):
+    def __init__(self, nome, tipo, categoria, escopo, token_decl, operando=None):
         self.nome = nome
         self.tipo = tipo
         self.categoria = categoria
         self.escopo = escopo
-        self.linha_decl = linha_decl
-        self.coluna_decl = coluna_decl
+        self.token_decl = token_decl
+        self.operando = nome if operando is None else operando
+
+    @property
+    def linha_decl(self):
+        return self.token_decl.l
+
+    @property
+    def coluna_decl(self):
+        return self.token_decl.c
 
     def __repr__(self):
         return (
@@ -45,37 +63,308 @@ class SimboloSemantico:
         )
 
 
+class ResolucaoNomes:
+    """
+    Estado da resolução de nomes de uma compilação, compartilhado por
+    todos os escopos criados a partir do mesmo escopo global.
+
+    Atributos:
+        ligacoes: posição do token ident -> (escopo, SimboloSemantico) da
+                  primeira resolução do token (ver Escopo.resolver)
+        versoes : índice léxico -> quantas vezes o identificador foi
+                  declarado até agora (invalida as resoluções guardadas
+                  em Escopo.resolvidos)
+    """
+    __slots__ = ("ligacoes", "versoes")
+
+    def __init__(self):
+        self.ligacoes = {}
+        self.versoes = {}
+
+
 class Escopo:
     """
     Representa um escopo léxico (global, de função ou de bloco).
 
     Atributos:
-        nome    : nome simbólico do escopo (ex.: "global", "func_f", "bloco_10_5")
-        pai     : escopo imediatamente externo (ou None no global)
-        tipo    : 'global', 'func' ou 'bloco'
-        simbolos: dicionário nome -> SimboloSemantico
+        nome      : nome simbólico do escopo (ex.: "global", "func_f", "bloco_10_5")
+        pai       : escopo imediatamente externo (ou None no global)
+        tipo      : 'global', 'func' ou 'bloco'
+        simbolos  : dicionário índice léxico -> SimboloSemantico, criado só
+                    na primeira declaração (None enquanto o escopo não
+                    declara nada, o caso da maioria dos blocos)
+        resolvidos: índice léxico -> (versão, SimboloSemantico ou None),
+                    resultados de procuras que passaram por este escopo
+                    (None até a primeira)
+        resolucao : ResolucaoNomes da compilação (a mesma do escopo pai)
+        unidade   : escopo da função que contém este (o próprio, se for de
+                    função) ou o global, fora de funções
+        ocorrencias: só no escopo 'unidade': nome -> quantas variáveis com
+                    esse nome já foram declaradas na unidade (None até a
+                    primeira declaração)
+
+    Os símbolos são indexados pelo índice do identificador na tabela do
+    léxico (tok.valor), e não pelo nome.
     """
+    __slots__ = ("nome", "pai", "tipo", "simbolos", "resolvidos", "resolucao",
+                 "unidade", "ocorrencias")
+
     def __init__(self, nome, pai=None, tipo="bloco"):
         self.nome = nome
         self.pai = pai
         self.tipo = tipo
-        self.simbolos = {}
-
-    def contem(self, nome):
-        """Retorna True se o nome já está declarado neste escopo (sem olhar os pais)."""
-        return nome in self.simbolos
-
-    def procura(self, nome):
+        self.simbolos = None
+        self.resolvidos = None
+        self.resolucao = pai.resolucao if pai is not None else ResolucaoNomes()
+        self.unidade = self if pai is None or tipo == "func" else pai.unidade
+        self.ocorrencias = None
+
+    def contem(self, indice):
+        """Retorna True se o identificador já está declarado neste escopo (sem olhar os pais)."""
+        return self.simbolos is not None and indice in self.simbolos
+
+    def declarar(self, indice, simbolo):
+        """Declara 'simbolo' neste escopo com o índice léxico 'indice'."""
+        if self.simbolos is None:
+            self.simbolos = {}
+        self.simbolos[indice] = simbolo
+        versoes = self.resolucao.versoes
+        versoes[indice] = versoes.get(indice, 0) + 1
+
+    def qualificar(self, nome):
+        """
+        Nome no código intermediário de uma nova variável 'nome' declarada
+        neste escopo.
+
+        A primeira declaração de 'nome' na função (ou fora de funções)
+        usa o próprio nome; cada declaração seguinte, num bloco interno,
+        recebe um sufixo com o seu número: x, x#1, x#2, ... Assim duas
+        variáveis com o mesmo nome nunca dividem um operando (e um slot
+        da máquina virtual), e o nome não depende de nada fora da função
+        (posições, linhas), como exige o cache incremental.
+        """
+        unidade = self.unidade
+        if unidade.ocorrencias is None:
+            unidade.ocorrencias = {}
+        n = unidade.ocorrencias.get(nome, 0)
+        unidade.ocorrencias[nome] = n + 1
+        return nome if n == 0 else f"{nome}#{n}"
+
+    def procura(self, indice):
         """
         Procura um símbolo subindo na cadeia de escopos (aninhamento léxico).
         Retorna o SimboloSemantico ou None se não encontrar.
         """
+        return self.percorrer(indice)[0]
+
+    def percorrer(self, indice):
+        """
+        Sobe na cadeia de escopos até o escopo que declara 'indice' ou até
+        um escopo que já guarda o resultado de uma procura anterior por ele.
+        O resultado fica guardado em todos os escopos do caminho, de modo
+        que cada escopo é percorrido uma única vez por identificador (até
+        uma nova declaração desse identificador).
+
+        Retorna:
+            (SimboloSemantico ou None, número de escopos visitados)
+        """
+        versao = self.resolucao.versoes.get(indice, 0)
+        caminho = []
+        simbolo = None
         esc = self
         while esc is not None:
-            if nome in esc.simbolos:
-                return esc.simbolos[nome]
+            simbolos = esc.simbolos
+            if simbolos is not None and indice in simbolos:
+                simbolo = simbolos[indice]
+                break
+            resolvidos = esc.resolvidos
+            if resolvidos is not None:
+                guardado = resolvidos.get(indice)
+                if guardado is not None and guardado[0] == versao:
+                    simbolo = guardado[1]
+                    break
+            caminho.append(esc)
+            esc = esc.pai
+
+        guardado = (versao, simbolo)
+        for visitado in caminho:
+            if visitado.resolvidos is None:
+                visitado.resolvidos = {}
+            visitado.resolvidos[indice] = guardado
+        return simbolo, len(caminho) + (esc is not None)
+
+    def resolver(self, tokens, posicao):
+        """
+        Símbolo do ident tokens[posicao] visto deste escopo.
+
+        O token é ligado ao símbolo na primeira resolução; as análises
+        seguintes do mesmo token no mesmo escopo (geração de código, nova
+        análise da expressão) usam a ligação sem procurar de novo.
+        """
+        ligacoes = self.resolucao.ligacoes
+        ligacao = ligacoes.get(posicao)
+        if ligacao is not None and ligacao[0] is self:
+            return ligacao[1]
+        simbolo = self.procura(tokens[posicao].valor)
+        if simbolo is not None:
+            ligacoes[posicao] = (self, simbolo)
+        return simbolo
+
+
+class IndiceEscopos:
+    """
+    Mapeamento posição do token -> Escopo em que ele foi analisado, sem
+    uma entrada por token.
+
+    A análise percorre as posições em ordem crescente e registra cada
+    trecho de posições consecutivas analisadas no mesmo escopo
+    (registrar). Os inícios dos trechos ficam em 'inicios' (ordenado) e
+    os escopos em 'valores': o escopo da posição i é o do maior início
+    <= i, encontrado com bisect em O(log s), onde s é o número de trechos.
+    A árvore de escopos é a dos próprios Escopo (pai).
+
+    Posições que a análise saltou (cabeçalho de 'def', ident declarado,
+    o interior das expressões na passada fundida) valem None, como antes
+    no vetor escopo_por_token; 'padrao' é o escopo global, usado pelo
+    gerador de código como escopo de fallback.
+
+    Quem percorre as posições em ordem (2ª passada, gerador de código) usa
+    trecho, que devolve também até onde o escopo vale, e só consulta o
+    índice de novo ao sair do trecho.
+    """
+
+    def __init__(self, padrao):
+        self.padrao = padrao
+        self.inicios = []
+        self.valores = []
+        self.fim = 0        # fim do último trecho registrado
+
+    def registrar(self, inicio, fim, escopo):
+        """
+        Registra 'escopo' nas posições [inicio, fim), posteriores às já
+        registradas; as posições entre o trecho anterior e 'inicio' valem
+        None.
+        """
+        if inicio >= fim:
+            return
+        if inicio > self.fim:
+            self.inicios.append(self.fim)
+            self.valores.append(None)
+        self.inicios.append(inicio)
+        self.valores.append(escopo)
+        self.fim = fim
+
+    def __getitem__(self, i):
+        if i >= self.fim:
+            return None
+        return self.valores[bisect_right(self.inicios, i) - 1]
+
+    def trecho(self, i):
+        """
+        Retorna (escopo da posição i, fim do trecho): o mesmo escopo vale
+        de i até a posição anterior ao fim do trecho.
+        """
+        if i >= self.fim:
+            return None, i + 1
+        k = bisect_right(self.inicios, i)
+        fim = self.inicios[k] if k < len(self.inicios) else self.fim
+        return self.valores[k - 1], fim
+
+    def __len__(self):
+        return len(self.inicios)
+
+    def __repr__(self):
+        return f"IndiceEscopos({len(self.inicios)} trechos, {self.fim} posições)"
+
+
+# ----------------------------------------------------------------------
+# Estado semântico plano (geração de código em outros processos)
+# ----------------------------------------------------------------------
+#
+# Com --paralelo, cada processo gera o código de um lote de unidades e
+# precisa dos escopos e das árvores de expressão dessas posições. Os
+# Escopo não são serializados diretamente: o pickle seguiria a cadeia de
+# pais recursivamente (e levaria a tabela de resolução do programa
+# inteiro), passando do limite de recursão com algumas centenas de blocos
+# aninhados. Cada lote recebe só o próprio estado, em listas e tuplas.
+
+def achatar_estado(escopo_por_token, cache, inicio, fim):
+    """
+    Estado semântico das posições [inicio, fim), com as posições relativas
+    a 'inicio', sem referências entre objetos (ver restaurar_estado).
+
+    Retorna:
+        (escopos, trechos, arvores):
+        escopos : (nome, tipo, índice do pai ou -1, símbolos) de cada escopo
+                  usado nas posições e dos seus ancestrais, os pais antes
+                  dos filhos; o primeiro é o escopo padrão (global).
+                  Símbolos: lista de (índice léxico, nome, tipo, categoria,
+                  token da declaração, operando)
+        trechos : (inicio, fim, índice do escopo) do IndiceEscopos
+        arvores : (inicio, nó, índice do escopo ou -1, posição final) das
+                  entradas do CacheExpressoes
+    """
+    escopos = []
+    numeros = {}    # id(Escopo) -> índice em 'escopos'
+
+    def numerar(escopo):
+        if escopo is None:
+            return -1
+        caminho = []
+        esc = escopo
+        while esc is not None and id(esc) not in numeros:
+            caminho.append(esc)
             esc = esc.pai
-        return None
+        for esc in reversed(caminho):
+            simbolos = [(indice, s.nome, s.tipo, s.categoria, s.token_decl, s.operando)
+                        for indice, s in (esc.simbolos or {}).items()]
+            numeros[id(esc)] = len(escopos)
+            escopos.append((esc.nome, esc.tipo, numerar(esc.pai), simbolos))
+        return numeros[id(escopo)]
+
+    numerar(escopo_por_token.padrao)
+
+    trechos = []
+    inicios, valores = escopo_por_token.inicios, escopo_por_token.valores
+    k = max(0, bisect_right(inicios, inicio) - 1)
+    while k < len(inicios) and inicios[k] < fim:
+        a = max(inicios[k], inicio)
+        b = min(inicios[k + 1] if k + 1 < len(inicios) else escopo_por_token.fim, fim)
+        if valores[k] is not None and a < b:
+            trechos.append((a - inicio, b - inicio, numerar(valores[k])))
+        k += 1
+
+    arvores = [(k - inicio, no, numerar(escopo), j - inicio)
+               for k, (no, escopo, j) in cache.arvores.items() if inicio <= k < fim]
+    return escopos, trechos, arvores
+
+
+def restaurar_estado(estado):
+    """
+    Reconstrói, a partir do resultado de achatar_estado, o IndiceEscopos e
+    o CacheExpressoes de um lote (com novos Escopo e SimboloSemantico).
+
+    Retorna:
+        (IndiceEscopos, CacheExpressoes)
+    """
+    escopos_planos, trechos, arvores = estado
+
+    escopos = []
+    for nome, tipo, pai, simbolos in escopos_planos:
+        escopo = Escopo(nome, escopos[pai] if pai >= 0 else None, tipo)
+        for indice, nome_simbolo, tipo_simbolo, categoria, token_decl, operando in simbolos:
+            escopo.declarar(indice, SimboloSemantico(nome_simbolo, tipo_simbolo, categoria,
+                                                     escopo, token_decl, operando))
+        escopos.append(escopo)
+
+    escopo_por_token = IndiceEscopos(escopos[0])
+    for inicio, fim, k in trechos:
+        escopo_por_token.registrar(inicio, fim, escopos[k])
+
+    cache = CacheExpressoes()
+    for inicio, no, k, j in arvores:
+        cache.arvores[inicio] = (no, escopos[k] if k >= 0 else None, j)
+    return escopo_por_token, cache
 
 
 # ----------------------------------------------------------------------
@@ -94,14 +383,14 @@ def declara_variavel(nome, tipo, token_ident, pilha_escopos):
     Lança erro se o nome já estiver declarado no mesmo escopo.
     """
     escopo = escopo_atual(pilha_escopos)
-    if escopo.contem(nome):
+    if escopo.contem(token_ident.valor):
         raise SemanticError(
             f"Redeclaração de variável '{nome}' no mesmo escopo "
             f"(linha {token_ident.l}, coluna {token_ident.c})"
         )
-    escopo.simbolos[nome] = SimboloSemantico(
-        nome, tipo, "var", escopo, token_ident.l, token_ident.c
-    )
+    escopo.declarar(token_ident.valor, SimboloSemantico(
+        nome, tipo, "var", escopo, token_ident, escopo.qualificar(nome)
+    ))
 
 
 def declara_parametro(nome, tipo, token_ident, pilha_escopos):
@@ -111,14 +400,14 @@ def declara_parametro(nome, tipo, token_ident, pilha_escopos):
     Também verifica se já existe símbolo com o mesmo nome nesse escopo.
     """
     escopo = escopo_atual(pilha_escopos)
-    if escopo.contem(nome):
+    if escopo.contem(token_ident.valor):
         raise SemanticError(
             f"Redeclaração de parâmetro/variável '{nome}' no mesmo escopo "
             f"(linha {token_ident.l}, coluna {token_ident.c})"
         )
-    escopo.simbolos[nome] = SimboloSemantico(
-        nome, tipo, "param", escopo, token_ident.l, token_ident.c
-    )
+    escopo.declarar(token_ident.valor, SimboloSemantico(
+        nome, tipo, "param", escopo, token_ident, escopo.qualificar(nome)
+    ))
 
 
 def declara_funcao(nome, token_ident, pilha_escopos):
@@ -128,21 +417,21 @@ def declara_funcao(nome, token_ident, pilha_escopos):
     Impede redeclaração de função ou uso de identificador já existente no global.
     """
     global_escopo = pilha_escopos[0]
-    if global_escopo.contem(nome):
+    if global_escopo.contem(token_ident.valor):
         raise SemanticError(
             f"Redeclaração de função/identificador '{nome}' no escopo global "
             f"(linha {token_ident.l}, coluna {token_ident.c})"
         )
-    global_escopo.simbolos[nome] = SimboloSemantico(
-        nome, None, "func", global_escopo, token_ident.l, token_ident.c
-    )
+    global_escopo.declarar(token_ident.valor, SimboloSemantico(
+        nome, None, "func", global_escopo, token_ident
+    ))
 
 
 # ----------------------------------------------------------------------
 # Função principal do analisador semântico (duas passadas)
 # ----------------------------------------------------------------------
 
-def analisador_semantico(tokens, tabela_simbolos):
+def analisador_semantico(tokens, tabela_simbolos, cache=None, pares=None, relatorio=None):
     """
     Executa a análise semântica em duas passadas:
 
@@ -150,7 +439,7 @@ def analisador_semantico(tokens, tabela_simbolos):
         - constrói a hierarquia de escopos (global, funções, blocos)
         - declara variáveis, parâmetros e funções
         - verifica uso de 'break' dentro de laços
-        - preenche o vetor escopo_por_token com o escopo ativo em cada posição
+        - registra em escopo_por_token (IndiceEscopos) o escopo ativo em cada posição
 
     2ª passada (processar_expressoes):
         - analisa expressões e atribuições
@@ -158,10 +447,23 @@ def analisador_semantico(tokens, tabela_simbolos):
         - valida compatibilidade de tipos em atribuições e operações
         - imprime árvores de expressão (para debug)
 
+    As árvores analisadas na 2ª passada ficam em 'cache' (CacheExpressoes),
+    para serem reaproveitadas pelo gerador de código intermediário.
+    'pares' é o índice de delimitadores casados (lexico.casar_delimitadores);
+    se omitido, é calculado aqui. As árvores e mensagens vão para
+    'relatorio' (padrão: saída padrão).
+
     Ao final, imprime um resumo dos tipos associados a cada índice da tabela léxica.
     Retorna:
-        escopo_por_token: lista em que cada posição indica o Escopo usado naquele token.
+        escopo_por_token: IndiceEscopos que indica o Escopo usado em cada posição.
     """
+    if cache is None:
+        cache = CacheExpressoes()
+    if pares is None:
+        pares = casar_delimitadores(tokens)
+    if relatorio is None:
+        relatorio = SAIDA_PADRAO
+
     # Escopo global
     escopo_global = Escopo("global", None, "global")
     pilha_escopos = [escopo_global]
@@ -173,7 +475,7 @@ def analisador_semantico(tokens, tabela_simbolos):
     tipos_por_indice = {}
 
     # Escopo em que cada token é analisado (posição i -> Escopo)
-    escopo_por_token = [None] * len(tokens)
+    escopo_por_token = IndiceEscopos(escopo_global)
 
     # 1ª passada: declarações, escopos, 'break', etc.
     processar_declaracoes_e_escopos(
@@ -181,6 +483,7 @@ def analisador_semantico(tokens, tabela_simbolos):
         pilha_escopos, pilha_loops,
         tipos_por_indice,
         escopo_por_token,
+        pares,
     )
 
     # 2ª passada: expressões, usando o escopo correto por posição
@@ -189,145 +492,155 @@ def analisador_semantico(tokens, tabela_simbolos):
         escopo_global,
         tipos_por_indice,
         escopo_por_token,
+        cache,
+        pares,
+        relatorio,
     )
 
+    imprimir_resumo_semantico(tabela_simbolos, tipos_por_indice, relatorio)
+
+    return escopo_por_token
+
+
+def imprimir_resumo_semantico(tabela_simbolos, tipos_por_indice, relatorio=SAIDA_PADRAO):
+    """
+    Registra as mensagens de sucesso da análise semântica e a tabela de
+    símbolos com os tipos (itens 3, 4 e 5 da Seção 8).
+    """
     # Se chegamos aqui sem lançar SemanticError, então:
     #  - as expressões aritméticas passaram na verificação de tipos;
     #  - as declarações de variáveis por escopo são válidas;
     #  - todos os 'break' estão corretamente dentro de laços 'for'.
-    print("Verificação de tipos das expressões aritméticas concluída com sucesso!")
-    print("Declarações de variáveis por escopo verificadas com sucesso!")
-    print("Todos os comandos 'break' estão corretamente dentro do escopo de um 'for'.")
-    print("Análise semântica concluída com sucesso!")
-
-    print("Tabela de símbolos com tipos (por índice do léxico):")
-    for idx, tipo in tipos_por_indice.items():
-        nome = tabela_simbolos[idx][0]
-        print(f"{idx}: {nome} : {tipo}")
-
-    return escopo_por_token
+    relatorio.registrar(RESUMO, "mensagem",
+                        "Verificação de tipos das expressões aritméticas concluída com sucesso!\n"
+                        "Declarações de variáveis por escopo verificadas com sucesso!\n"
+                        "Todos os comandos 'break' estão corretamente dentro do escopo de um 'for'.\n"
+                        "Análise semântica concluída com sucesso!")
+
+    if relatorio.ativo(COMPLETO):
+        linhas = [f"{idx}: {tabela_simbolos[idx][0]} : {tipo}"
+                  for idx, tipo in tipos_por_indice.items()]
+        relatorio.registrar(COMPLETO, "tabela_tipos",
+                            "\n".join(["Tabela de símbolos com tipos (por índice do léxico):",
+                                       *linhas]),
+                            simbolos={tabela_simbolos[idx][0]: tipo
+                                      for idx, tipo in tipos_por_indice.items()})
 
 
 # ----------------------------------------------------------------------
 # 1ª passada: escopos, declarações e controle de break
 # ----------------------------------------------------------------------
 
-def processar_declaracoes_e_escopos(tokens, tabela_simbolos,
-                                    pilha_escopos, pilha_loops,
-                                    tipos_por_indice,
-                                    escopo_por_token):
-    """
-    Varre a lista de tokens uma vez, com foco em:
-
-      - def ... : declara funções e seus parâmetros, cria escopo de função
-      - { ... } : abre/fecha escopos de bloco
-      - declarações de variáveis (int/float/string ident ...)
-      - for(...): registra laços para validação de 'break'
-      - break    : verifica se está dentro de um laço
-      - preenche escopo_por_token com o escopo ativo em cada índice i
+def encontrar_fim_statement(tokens, inicio, pares):
     """
+    Dado o índice 'inicio' do primeiro token de um STATEMENT,
+    devolve o índice logo após o fim desse STATEMENT, seguindo
+    aproximadamente a gramática:
 
-    i = 0
-    n = len(tokens)
+    STATEMENT -> VARDECL; | ATRIBSTAT; | PRINTSTAT; | READSTAT; |
+                 RETURNSTAT; | IFSTAT; | FORSTAT; | {STATELIST} | break; | ;
 
-    def encontrar_fim_statement(inicio):
-        """
-        Dado o índice 'inicio' do primeiro token de um STATEMENT,
-        devolve o índice logo após o fim desse STATEMENT, seguindo
-        aproximadamente a gramática:
+    'pares' é o índice de delimitadores casados (lexico.casar_delimitadores):
+    blocos e parênteses são saltados em O(1).
 
-        STATEMENT -> VARDECL; | ATRIBSTAT; | PRINTSTAT; | READSTAT; |
-                     RETURNSTAT; | IFSTAT; | FORSTAT; | {STATELIST} | break; | ;
+    OBS: Esta função é usada principalmente para determinar o fim
+    do corpo de laços 'for' com statements simples (sem chaves).
 
-        OBS: Esta função é usada principalmente para determinar o fim
-        do corpo de laços 'for' com statements simples (sem chaves).
-        """
-        k = inicio
+    O corpo de um if/for sem chaves pode ser outro if/for: a cadeia é
+    seguida com uma pilha explícita ('pendentes', os if/for cujo corpo
+    ainda não terminou), sem limite de profundidade.
+    """
+    n = len(tokens)
+    pendentes = []
+    k = inicio
+    while True:
+        # k é o início de um STATEMENT
         if k >= n:
-            return n
-
-        tok0 = tokens[k]
-
-        # Bloco: { STATELIST }
-        if tok0.tipo == "{":
-            nivel_chaves = 1
-            k += 1
-            while k < n and nivel_chaves > 0:
-                if tokens[k].tipo == "{":
-                    nivel_chaves += 1
-                elif tokens[k].tipo == "}":
-                    nivel_chaves -= 1
-                k += 1
-            return k  # posição logo após o '}' que fecha o bloco
-
-        # if: IFSTAT -> if ( EXPRESSION ) STATEMENT IFSTAT'
-        if tok0.tipo == "if":
+            k = n
+        elif tokens[k].tipo == "{":
+            # Bloco: { STATELIST }
+            k = fechamento(pares, k, n) + 1  # posição logo após o '}'
+        elif tokens[k].tipo in ("if", "for"):
+            # IFSTAT  -> if ( EXPRESSION ) STATEMENT IFSTAT'
+            # FORSTAT -> for(ATRIBSTAT;EXPRESSION;ATRIBSTAT) STATEMENT
             j = k + 1
             # acha '('
             while j < n and tokens[j].tipo != "(":
                 j += 1
             if j >= n:
-                return n
-            j += 1  # pula '('
-            nivel_paren = 1
-            while j < n and nivel_paren > 0:
-                if tokens[j].tipo == "(":
-                    nivel_paren += 1
-                elif tokens[j].tipo == ")":
-                    nivel_paren -= 1
-                j += 1
-            # j está logo após ')'
-            body_start = j
-            body_end = encontrar_fim_statement(body_start)
-            k = body_end
-
-            # IFSTAT' -> else STATEMENT | &
-            if k < n and tokens[k].tipo == "else":
-                k2 = encontrar_fim_statement(k + 1)
-                k = k2
-
-            # STATEMENT -> IFSTAT ;
+                k = n
+            else:
+                # o corpo começa logo após o ')' correspondente
+                pendentes.append(tokens[k].tipo)
+                k = fechamento(pares, j, n) + 1
+                continue
+        else:
+            # Demais statements simples: até o próximo ';'
             while k < n and tokens[k].tipo != ";":
                 k += 1
             if k < n:
-                return k + 1
-            return k
+                k += 1
 
-        # for: FORSTAT -> for(ATRIBSTAT;EXPRESSION;ATRIBSTAT) STATEMENT ;
-        if tok0.tipo == "for":
-            j = k + 1
-            while j < n and tokens[j].tipo != "(":
-                j += 1
-            if j >= n:
-                return n
-            j += 1
-            nivel_paren = 1
-            while j < n and nivel_paren > 0:
-                if tokens[j].tipo == "(":
-                    nivel_paren += 1
-                elif tokens[j].tipo == ")":
-                    nivel_paren -= 1
-                j += 1
-            body_start = j
-            body_end = encontrar_fim_statement(body_start)
-            k = body_end
+        # k é o fim de um STATEMENT: termina os if/for pendentes
+        while pendentes:
+            if pendentes.pop() == "if" and k < n and tokens[k].tipo == "else":
+                # IFSTAT' -> else STATEMENT; o ';' do if vem depois dele
+                pendentes.append("else")
+                k += 1
+                break
+
+            # STATEMENT -> IFSTAT ; | FORSTAT ;
             while k < n and tokens[k].tipo != ";":
                 k += 1
             if k < n:
-                return k + 1
+                k += 1
+        else:
             return k
 
-        # Demais statements simples: até o próximo ';'
-        while k < n and tokens[k].tipo != ";":
-            k += 1
-        if k < n:
-            return k + 1
-        return k
+
+def fechamento(pares, i, fim):
+    """
+    Índice do delimitador que fecha o de abertura em tokens[i], segundo o
+    índice 'pares'. Se ele não existir ou estiver além de 'fim', devolve
+    fim - 1 (como os antigos laços de contagem de nível, que paravam no fim
+    do intervalo).
+    """
+    j = pares[i]
+    if j < 0 or j >= fim:
+        return fim - 1
+    return j
+
+
+def processar_declaracoes_e_escopos(tokens, tabela_simbolos,
+                                    pilha_escopos, pilha_loops,
+                                    tipos_por_indice,
+                                    escopo_por_token, pares):
+    """
+    Varre a lista de tokens uma vez, com foco em:
+
+      - def ... : declara funções e seus parâmetros, cria escopo de função
+      - { ... } : abre/fecha escopos de bloco
+      - declarações de variáveis (int/float/string ident ...)
+      - for(...): registra laços para validação de 'break'
+      - break    : verifica se está dentro de um laço
+      - registra em escopo_por_token o escopo ativo em cada índice i
+    """
+
+    i = 0
+    n = len(tokens)
+
+    # Trecho atual de posições consecutivas com o mesmo escopo
+    inicio_trecho, proximo, escopo_trecho = 0, 0, None
 
     # Percorre todos os tokens
     while i < n:
-        # Registra o escopo antes de processar o token i
-        escopo_por_token[i] = escopo_atual(pilha_escopos)
+        # Registra o escopo antes de processar o token i; o índice só
+        # recebe o trecho anterior quando o escopo muda ou há um salto
+        escopo = escopo_atual(pilha_escopos)
+        if escopo is not escopo_trecho or i != proximo:
+            escopo_por_token.registrar(inicio_trecho, proximo, escopo_trecho)
+            inicio_trecho, escopo_trecho = i, escopo
+        proximo = i + 1
 
         tok = tokens[i]
 
@@ -438,22 +751,14 @@ def processar_declaracoes_e_escopos(tokens, tabela_simbolos,
                     f"'(' esperado após 'for' (linha {tok.l}, coluna {tok.c})"
                 )
 
-            # achar o ')' que fecha o cabeçalho
-            k = j + 1
-            nivel_paren = 1
-            while k < n and nivel_paren > 0:
-                if tokens[k].tipo == "(":
-                    nivel_paren += 1
-                elif tokens[k].tipo == ")":
-                    nivel_paren -= 1
-                k += 1
-            if nivel_paren != 0:
+            # o ')' que fecha o cabeçalho
+            if pares[j] < 0:
                 raise SemanticError(
                     f"')' esperado para fechar cabeçalho do for "
                     f"(linha {tok.l}, coluna {tok.c})"
                 )
 
-            body_start = k  # primeiro token do STATEMENT (corpo do for)
+            body_start = pares[j] + 1  # primeiro token do STATEMENT (corpo do for)
 
             if body_start >= n:
                 i += 1
@@ -466,7 +771,7 @@ def processar_declaracoes_e_escopos(tokens, tabela_simbolos,
                 pilha_loops.append({"tipo": "bloco", "escopo": None})
             else:
                 # Corpo é um STATEMENT simples: calculamos onde ele termina
-                fim = encontrar_fim_statement(body_start)
+                fim = encontrar_fim_statement(tokens, body_start, pares)
                 pilha_loops.append({"tipo": "simples", "fim": fim})
 
         # ---------------------------------------------------------
@@ -480,6 +785,8 @@ def processar_declaracoes_e_escopos(tokens, tabela_simbolos,
 
         i += 1
 
+    escopo_por_token.registrar(inicio_trecho, proximo, escopo_trecho)
+
 
 # ----------------------------------------------------------------------
 # Representação de árvores de expressão (para debug)
@@ -494,6 +801,10 @@ class ExprNode:
     right : filho direito
     valor : valor associado (nome do identificador, literal, símbolo do operador)
     tipo  : tipo da expressão resultante ('int', 'float', 'string', None, ...)
+
+    Os nós 'id' têm também 'operando': o SimboloSemantico.operando da
+    variável a que o identificador foi resolvido (nome no código
+    intermediário).
     """
     def __init__(self, op, left=None, right=None, valor=None, tipo=None):
         self.op = op
@@ -508,85 +819,426 @@ class ExprNode:
         else:
             return f"{self.valor if self.valor is not None else self.op}"
 
+    # -----------------------------------------------------------------
+    # Serialização (pickle)
+    # -----------------------------------------------------------------
+    def __reduce__(self):
+        """
+        Serializa a árvore inteira como uma lista plana, em pós-ordem. O
+        pickle padrão desce um nível de recursão por nó e não consegue
+        serializar árvores muito profundas (cache incremental, --paralelo).
+        """
+        return (_restaurar_arvore, (_achatar_arvore(self),))
+
+
+def _achatar_arvore(raiz):
+    """
+    Nós da árvore em pós-ordem (left, right, args, nó), cada um como
+    (atributos sem os filhos, tem left, tem right, número de args ou -1).
+    """
+    nos = []
+    pilha = [(raiz, False)]
+    while pilha:
+        node, filhos_prontos = pilha.pop()
+        atributos = dict(vars(node))
+        left = atributos.pop("left")
+        right = atributos.pop("right")
+        args = atributos.pop("args", None)
+        if filhos_prontos:
+            nos.append((atributos, left is not None, right is not None,
+                        -1 if args is None else len(args)))
+            continue
+        pilha.append((node, True))
+        filhos = [f for f in (left, right) if f is not None]
+        filhos.extend(args or ())
+        pilha.extend((filho, False) for filho in reversed(filhos))
+    return nos
+
+
+def _restaurar_arvore(nos):
+    """Reconstrói uma árvore serializada por ExprNode.__reduce__."""
+    pilha = []
+    for atributos, tem_left, tem_right, n_args in nos:
+        node = ExprNode.__new__(ExprNode)
+        node.__dict__.update(atributos)
+        if n_args >= 0:
+            node.args = pilha[len(pilha) - n_args:]
+            del pilha[len(pilha) - n_args:]
+        node.right = pilha.pop() if tem_right else None
+        node.left = pilha.pop() if tem_left else None
+        pilha.append(node)
+    return pilha[0]
+
 
 def print_preordem(node):
     """
     Imprime a árvore de expressão em pré-ordem (para depuração).
     """
+    print(texto_preordem(node), end="")
+
+
+def texto_preordem(node, partes=None):
+    """
+    Texto da árvore de expressão em pré-ordem: cada nó (valor ou operador)
+    seguido de um espaço. Se 'partes' é informada, os pedaços do texto
+    são acrescentados a ela (e nada é retornado).
+
+    Percorre a árvore com uma pilha explícita, sem limite de profundidade
+    (texto_preordem_recursivo é a versão recursiva equivalente).
+    """
+    retornar = partes is None
+    if retornar:
+        partes = []
+    pilha = [node]
+    while pilha:
+        node = pilha.pop()
+        if node is None:
+            continue
+        partes.append(f"{node.valor if node.valor is not None else node.op} ")
+        pilha.append(node.right)
+        pilha.append(node.left)
+    if retornar:
+        return "".join(partes)
+
+
+def texto_preordem_recursivo(node, partes=None):
+    """Mesmo texto de texto_preordem, com uma chamada recursiva por nó."""
+    if partes is None:
+        partes = []
+        texto_preordem_recursivo(node, partes)
+        return "".join(partes)
     if node is None:
         return
-    if node.valor is not None:
-        print(node.valor, end=" ")
-    else:
-        print(node.op, end=" ")
-    print_preordem(node.left)
-    print_preordem(node.right)
+    partes.append(f"{node.valor if node.valor is not None else node.op} ")
+    texto_preordem_recursivo(node.left, partes)
+    texto_preordem_recursivo(node.right, partes)
+
+
+# Títulos das árvores registradas (campos preenchidos só com a saída ativa)
+TITULO_ATRIBUICAO = "Árvore da expressão da atribuição a '{nome}':"
+TITULO_PRINT = "Árvore da expressão no print (linha {tok.l}, coluna {tok.c}):"
+TITULO_IF = "Árvore da expressão da condição do if (linha {tok.l}, coluna {tok.c}):"
+TITULO_FOR = "Árvore da expressão-condição do for (linha {tok.l}, coluna {tok.c}):"
+
+
+def registrar_arvore(relatorio, titulo, node, **campos):
+    """
+    Registra (nível COMPLETO) a árvore 'node' em pré-ordem, precedida do
+    'titulo' preenchido com 'campos'. Com o nível desligado, nada é
+    formatado.
+    """
+    if not relatorio.ativo(COMPLETO):
+        return
+    titulo = titulo.format(**campos)
+    preordem = texto_preordem(node)
+    relatorio.registrar(COMPLETO, "arvore", f"{titulo}\n{preordem}",
+                        titulo=titulo, preordem=preordem)
 
 
 # ----------------------------------------------------------------------
 # Parser de expressões (usado na 2ª passada)
 # ----------------------------------------------------------------------
+#
+# parse_expression analisa uma EXPRESSION sem recursão: um laço com uma
+# pilha explícita de níveis (o nível da expressão, um por parêntese
+# aberto e um por argumento de chamada), cada um com as suas pilhas de
+# operadores e de operandos (precedência de operadores). Parênteses
+# aninhados e cadeias longas de operadores não esbarram no limite de
+# recursão do Python.
+#
+# As funções parse_expression_recursiva, parse_numexpression, parse_term,
+# parse_unaryexpr e parse_factor seguem a gramática uma função por não
+# terminal (descida recursiva) e ficam como referência: parse_expression
+# produz as mesmas árvores, com os mesmos tipos, e lança os mesmos erros
+# (mesma mensagem, mesmo token), na mesma ordem. Cada operador é combinado
+# (combinar_binario) assim que o seu operando direito termina, como na
+# descida recursiva.
+
+# Precedência dos operadores binários; comparações (0) só no nível de uma
+# EXPRESSION e no máximo uma por nível, como em parse_expression_recursiva
+PRECEDENCIA = {
+    "<": 0, ">": 0, "<=": 0, ">=": 0, "==": 0, "!=": 0,
+    "+": 1, "-": 1,
+    "*": 2, "/": 2, "%": 2,
+}
+
+# Tipos de nível de parse_expression
+NIVEL_EXPRESSAO = 0     # a EXPRESSION analisada
+NIVEL_PARENTESES = 1    # ( NUMEXPRESSION )
+NIVEL_ARGUMENTO = 2     # argumento (EXPRESSION) de uma chamada
+
+
+class _NivelExpressao:
+    """
+    Nível da pilha de parse_expression.
+
+    Campos:
+        tipo       : NIVEL_EXPRESSAO, NIVEL_PARENTESES ou NIVEL_ARGUMENTO
+        unario     : operador unário ('+'/'-') aplicado ao resultado do
+                     nível (parêntese ou chamada), ou None
+        operadores : operadores binários ainda não combinados
+        operandos  : subárvores ainda não combinadas
+        comparacao : True se o nível já tem a sua comparação
+        chamada    : (nome, token ident) da chamada (argumentos)
+        args       : argumentos já analisados da chamada
+    """
+    __slots__ = ("tipo", "unario", "operadores", "operandos", "comparacao",
+                 "chamada", "args")
+
+    def __init__(self, tipo, unario=None, chamada=None):
+        self.tipo = tipo
+        self.unario = unario
+        self.operadores = []
+        self.operandos = []
+        self.comparacao = False
+        self.chamada = chamada
+        self.args = []
+
+
+def _reduzir(nivel, precedencia, tok):
+    """
+    Combina os operadores do topo do nível com precedência >= 'precedencia'
+    ('tok' é o token usado nas mensagens de erro de tipo).
+    """
+    operadores = nivel.operadores
+    operandos = nivel.operandos
+    while operadores and PRECEDENCIA[operadores[-1]] >= precedencia:
+        right = operandos.pop()
+        operandos[-1] = combinar_binario(operadores.pop(), operandos[-1], right, tok)
+
+
+def parse_expression(tokens, i, tabela_simbolos, escopo, fim=None):
+    """
+    EXPRESSAO -> NUMEXPRESSION COMPARACAO
+    COMPARACAO opcional: <, >, <=, >=, ==, !=
+
+    As funções parse_* analisam tokens[i:fim] diretamente na lista de tokens
+    do programa, sem copiar a fatia da expressão; fim=None equivale a
+    len(tokens). Retornam (nó, posição do primeiro token não consumido).
+
+    Versão iterativa (ver o comentário acima); o resultado é o mesmo de
+    parse_expression_recursiva.
+    """
+    if fim is None:
+        fim = len(tokens)
+    nivel = _NivelExpressao(NIVEL_EXPRESSAO)
+    niveis = []
+
+    while True:
+        # ---------------- UNARYEXPR -> (+|-) FACTOR | FACTOR ----------------
+        unario = None
+        if i < fim and tokens[i].tipo in ("+", "-"):
+            unario = tokens[i].tipo
+            i += 1
+        if i >= fim:
+            tok = tokens[i - 1]
+            raise SemanticError(
+                f"Fim inesperado da expressão (linha {tok.l}, coluna {tok.c})"
+            )
+        tok = tokens[i]
+        tipo = tok.tipo
+
+        if tipo == "const_inteiro":
+            node = ExprNode("int", None, None, valor=tok.valor)
+            node.tipo = "int"
+            i += 1
+        elif tipo == "const_float":
+            node = ExprNode("float", None, None, valor=tok.valor)
+            node.tipo = "float"
+            i += 1
+        elif tipo == "const_string":
+            node = ExprNode("string", None, None, valor=tok.valor)
+            node.tipo = "string"
+            i += 1
+        elif tipo == "null":
+            node = ExprNode("null", None, None, valor="null")
+            node.tipo = None
+            i += 1
+
+        elif tipo == "(":
+            # ( NUMEXPRESSION ): novo nível, fechado no ')'
+            niveis.append(nivel)
+            nivel = _NivelExpressao(NIVEL_PARENTESES, unario)
+            i += 1
+            continue
+
+        elif tipo == "ident":
+            nome = tabela_simbolos[tok.valor][0]
+            if escopo is None:
+                raise SemanticError(
+                    f"Escopo indefinido ao usar identificador '{nome}' "
+                    f"(linha {tok.l}, coluna {tok.c})"
+                )
+            simbolo = escopo.resolver(tokens, i)
+            if simbolo is None:
+                raise SemanticError(
+                    f"Uso de identificador '{nome}' não declarado "
+                    f"(linha {tok.l}, coluna {tok.c})"
+                )
+            i += 1
+
+            if i < fim and tokens[i].tipo == "(":
+                if simbolo.categoria != "func":
+                    raise SemanticError(
+                        f"Identificador '{nome}' usado como função, mas não é função "
+                        f"(linha {tok.l}, coluna {tok.c})"
+                    )
+                i += 1  # pula '('
+                if i < fim and tokens[i].tipo != ")":
+                    # argumentos: um nível por argumento, fechado no ',' ou ')'
+                    niveis.append(nivel)
+                    nivel = _NivelExpressao(NIVEL_ARGUMENTO, unario, (nome, tok))
+                    continue
+                if i >= fim:
+                    raise SemanticError(
+                        f"')' esperado ao final da chamada de função '{nome}' "
+                        f"(linha {tok.l}, coluna {tok.c})"
+                    )
+                i += 1  # consome ')'
+                node = ExprNode("call", None, None, valor=nome)
+                node.args = []
+                node.tipo = None
+            else:
+                node = ExprNode("id", None, None, valor=nome)
+                node.tipo = simbolo.tipo
+                node.operando = simbolo.operando
+
+        else:
+            raise SemanticError(
+                f"Token inesperado em fator: {tipo} (linha {tok.l}, coluna {tok.c})"
+            )
+
+        # ---------------- operando completo ----------------
+        # Entra no nível atual; se o próximo token não continua o nível,
+        # o nível termina e o seu resultado é o operando do nível de baixo.
+        while True:
+            if unario is not None:
+                operando = ExprNode("unary" + unario, node, None, valor=unario)
+                operando.tipo = node.tipo
+                node = operando
+            nivel.operandos.append(node)
+
+            if i < fim:
+                op = tokens[i].tipo
+                precedencia = PRECEDENCIA.get(op)
+                if precedencia is not None and (
+                        precedencia > 0 or
+                        (nivel.tipo != NIVEL_PARENTESES and not nivel.comparacao)):
+                    _reduzir(nivel, precedencia, tokens[i - 1])
+                    if precedencia == 0:
+                        nivel.comparacao = True
+                    nivel.operadores.append(op)
+                    i += 1
+                    break   # próximo operando
+
+            _reduzir(nivel, 0, tokens[i - 1])
+            node = nivel.operandos[0]
+
+            if nivel.tipo == NIVEL_EXPRESSAO:
+                return node, i
+
+            if nivel.tipo == NIVEL_PARENTESES:
+                if i >= fim or tokens[i].tipo != ")":
+                    tok_err = tokens[i] if i < fim else tokens[i - 1]
+                    raise SemanticError(
+                        f"Parêntese ')' esperado na linha {tok_err.l}, coluna {tok_err.c}"
+                    )
+                i += 1
+            else:
+                nivel.args.append(node)
+                if i < fim and tokens[i].tipo == ",":
+                    # próximo argumento da mesma chamada
+                    i += 1
+                    nivel.operandos = []
+                    nivel.comparacao = False
+                    break
+                nome, tok = nivel.chamada
+                if i >= fim or tokens[i].tipo != ")":
+                    tok_err = tokens[i - 1] if i < fim else tok
+                    raise SemanticError(
+                        f"')' esperado ao final da chamada de função '{nome}' "
+                        f"(linha {tok_err.l}, coluna {tok_err.c})"
+                    )
+                i += 1  # consome ')'
+                args = nivel.args
+                node = ExprNode("call", None, None, valor=nome)
+                node.args = args
+                node.tipo = None
+
+            unario = nivel.unario
+            nivel = niveis.pop()
+
 
-def parse_expression(tokens, i, tabela_simbolos, escopo):
+def parse_expression_recursiva(tokens, i, tabela_simbolos, escopo, fim=None):
     """
     EXPRESSAO -> NUMEXPRESSION COMPARACAO
     COMPARACAO opcional: <, >, <=, >=, ==, !=
+
+    Descida recursiva (referência de parse_expression).
     """
-    node, i = parse_numexpression(tokens, i, tabela_simbolos, escopo)
+    if fim is None:
+        fim = len(tokens)
+    node, i = parse_numexpression(tokens, i, tabela_simbolos, escopo, fim)
     # COMPARACAO opcional
-    if i < len(tokens) and tokens[i].tipo in ("<", ">", "<=", ">=", "==", "!="):
+    if i < fim and tokens[i].tipo in ("<", ">", "<=", ">=", "==", "!="):
         op = tokens[i].tipo
         i += 1
-        right, i = parse_numexpression(tokens, i, tabela_simbolos, escopo)
+        right, i = parse_numexpression(tokens, i, tabela_simbolos, escopo, fim)
         node = combinar_binario(op, node, right, tokens[i - 1])
         # tipo da comparação poderia ser 'bool', se você quiser guardar isso
     return node, i
 
 
-def parse_numexpression(tokens, i, tabela_simbolos, escopo):
+def parse_numexpression(tokens, i, tabela_simbolos, escopo, fim=None):
     """
     NUMEXPRESSION -> TERM NUMEXPRESSION'
     NUMEXPRESSION' -> (+|-) TERM NUMEXPRESSION' | &
     """
-    node, i = parse_term(tokens, i, tabela_simbolos, escopo)
-    while i < len(tokens) and tokens[i].tipo in ("+", "-"):
+    if fim is None:
+        fim = len(tokens)
+    node, i = parse_term(tokens, i, tabela_simbolos, escopo, fim)
+    while i < fim and tokens[i].tipo in ("+", "-"):
         op = tokens[i].tipo
         i += 1
-        right, i = parse_term(tokens, i, tabela_simbolos, escopo)
+        right, i = parse_term(tokens, i, tabela_simbolos, escopo, fim)
         node = combinar_binario(op, node, right, tokens[i - 1])
     return node, i
 
 
-def parse_term(tokens, i, tabela_simbolos, escopo):
+def parse_term(tokens, i, tabela_simbolos, escopo, fim=None):
     """
     TERM -> UNARYEXPR TERM'
     TERM' -> (*|/|%) UNARYEXPR TERM' | &
     """
-    node, i = parse_unaryexpr(tokens, i, tabela_simbolos, escopo)
-    while i < len(tokens) and tokens[i].tipo in ("*", "/", "%"):
+    if fim is None:
+        fim = len(tokens)
+    node, i = parse_unaryexpr(tokens, i, tabela_simbolos, escopo, fim)
+    while i < fim and tokens[i].tipo in ("*", "/", "%"):
         op = tokens[i].tipo
         i += 1
-        right, i = parse_unaryexpr(tokens, i, tabela_simbolos, escopo)
+        right, i = parse_unaryexpr(tokens, i, tabela_simbolos, escopo, fim)
         node = combinar_binario(op, node, right, tokens[i - 1])
     return node, i
 
 
-def parse_unaryexpr(tokens, i, tabela_simbolos, escopo):
+def parse_unaryexpr(tokens, i, tabela_simbolos, escopo, fim=None):
     """
     UNARYEXPR -> (+|-) FACTOR | FACTOR
     """
-    if tokens[i].tipo in ("+", "-"):
+    if fim is None:
+        fim = len(tokens)
+    if i < fim and tokens[i].tipo in ("+", "-"):
         op = tokens[i].tipo
         i += 1
-        factor, i = parse_factor(tokens, i, tabela_simbolos, escopo)
+        factor, i = parse_factor(tokens, i, tabela_simbolos, escopo, fim)
         node = ExprNode("unary" + op, factor, None, valor=op)
         node.tipo = factor.tipo
     else:
-        node, i = parse_factor(tokens, i, tabela_simbolos, escopo)
+        node, i = parse_factor(tokens, i, tabela_simbolos, escopo, fim)
     return node, i
 
 
-def parse_factor(tokens, i, tabela_simbolos, escopo):
+def parse_factor(tokens, i, tabela_simbolos, escopo, fim=None):
     """
     FACTOR -> const_inteiro
             | const_float
@@ -595,6 +1247,13 @@ def parse_factor(tokens, i, tabela_simbolos, escopo):
             | ( NUMEXPRESSION )
             | ident CHAMADA/uso-var
     """
+    if fim is None:
+        fim = len(tokens)
+    if i >= fim:
+        tok = tokens[i - 1]
+        raise SemanticError(
+            f"Fim inesperado da expressão (linha {tok.l}, coluna {tok.c})"
+        )
     tok = tokens[i]
 
     # ---------------- literais ----------------
@@ -620,10 +1279,11 @@ def parse_factor(tokens, i, tabela_simbolos, escopo):
 
     # ---------------- ( NUMEXPRESSION ) ----------------
     if tok.tipo == "(":
-        node, j = parse_numexpression(tokens, i + 1, tabela_simbolos, escopo)
-        if tokens[j].tipo != ")":
+        node, j = parse_numexpression(tokens, i + 1, tabela_simbolos, escopo, fim)
+        if j >= fim or tokens[j].tipo != ")":
+            tok_err = tokens[j] if j < fim else tokens[j - 1]
             raise SemanticError(
-                f"Parêntese ')' esperado na linha {tokens[j].l}, coluna {tokens[j].c}"
+                f"Parêntese ')' esperado na linha {tok_err.l}, coluna {tok_err.c}"
             )
         return node, j + 1
 
@@ -638,7 +1298,7 @@ def parse_factor(tokens, i, tabela_simbolos, escopo):
                 f"(linha {tok.l}, coluna {tok.c})"
             )
 
-        simbolo = escopo.procura(nome)
+        simbolo = escopo.resolver(tokens, i)
         if simbolo is None:
             raise SemanticError(
                 f"Uso de identificador '{nome}' não declarado "
@@ -648,7 +1308,7 @@ def parse_factor(tokens, i, tabela_simbolos, escopo):
         i += 1  # consumimos o ident
 
         # --------- chamada de função: ident( ... ) ---------
-        if i < len(tokens) and tokens[i].tipo == "(":
+        if i < fim and tokens[i].tipo == "(":
             if simbolo.categoria != "func":
                 raise SemanticError(
                     f"Identificador '{nome}' usado como função, mas não é função "
@@ -659,19 +1319,20 @@ def parse_factor(tokens, i, tabela_simbolos, escopo):
             args_nodes = []
 
             # lista de argumentos opcional
-            if i < len(tokens) and tokens[i].tipo != ")":
+            if i < fim and tokens[i].tipo != ")":
                 while True:
                     # aqui permitimos EXPRESSIONS como argumentos
-                    arg_node, i = parse_expression(tokens, i, tabela_simbolos, escopo)
+                    arg_node, i = parse_expression_recursiva(tokens, i, tabela_simbolos,
+                                                             escopo, fim)
                     args_nodes.append(arg_node)
 
-                    if i < len(tokens) and tokens[i].tipo == ",":
+                    if i < fim and tokens[i].tipo == ",":
                         i += 1  # pula ','
                         continue
                     break
 
-            if i >= len(tokens) or tokens[i].tipo != ")":
-                tok_err = tokens[i - 1] if i < len(tokens) else tok
+            if i >= fim or tokens[i].tipo != ")":
+                tok_err = tokens[i - 1] if i < fim else tok
                 raise SemanticError(
                     f"')' esperado ao final da chamada de função '{nome}' "
                     f"(linha {tok_err.l}, coluna {tok_err.c})"
@@ -687,6 +1348,7 @@ def parse_factor(tokens, i, tabela_simbolos, escopo):
         # --------- caso contrário: uso de variável normal ---------
         node = ExprNode("id", None, None, valor=nome)
         node.tipo = simbolo.tipo
+        node.operando = simbolo.operando
         return node, i
 
     # ---------------- erro ----------------
@@ -712,62 +1374,175 @@ def combinar_binario(op, left, right, tok):
     return node
 
 
-# ----------------------------------------------------------------------
-# 2ª passada: análise de expressões e atribuições
-# ----------------------------------------------------------------------
-
-def processar_expressoes(tokens, tabela_simbolos,
-                         escopo_global, tipos_por_indice,
-                         escopo_por_token):
+class CacheExpressoes:
     """
-    Percorre a lista de tokens e:
+    Cache das árvores de expressão já analisadas e tipadas, indexado pela
+    posição do primeiro token da expressão.
 
-      - constrói árvores de expressão para:
-          * atribuições: LVALUE = EXPRESSION ;
-          * comandos print: print EXPRESSION ;
-          * condições de if: if( EXPRESSION ) ...
-          * condição do for: for( ATRIBSTAT ; EXPRESSION ; ATRIBSTAT ) ...
+    O semântico preenche o cache e o gerador de código intermediário o
+    consulta, de modo que cada expressão é analisada (com as buscas de
+    escopo e a verificação de tipos) uma única vez por compilação.
 
-      - faz verificação de tipos dentro das expressões (via parse_expression /
-        combinar_binario)
+    Uma entrada só é reaproveitada se foi analisada no mesmo escopo e se a
+    análise terminou antes do limite 'fim' pedido: nesse caso o resultado
+    de parse_expression seria exatamente o mesmo.
 
-      - imprime as árvores em pré-ordem para depuração.
+    Entradas sem escopo (None) vêm do cache incremental (incremental.py):
+    a unidade a que pertencem não mudou desde a última compilação, e por
+    isso valem em qualquer escopo.
     """
-    pilha_escopos = [escopo_global]
-    pilha_loops = []  # mantido para futura extensão (não é usado aqui)
 
-    i = 0
-    n = len(tokens)
+    def __init__(self):
+        self.arvores = {}   # início -> (nó, escopo, posição final)
+        self.acertos = 0
+        self.falhas = 0
 
-    while i < n:
-        tok = tokens[i]
+    def analisar(self, tokens, inicio, tabela_simbolos, escopo, fim):
+        """
+        Equivalente a parse_expression(tokens, inicio, tabela_simbolos,
+        escopo, fim), consultando e preenchendo o cache.
+        """
+        entrada = self.arvores.get(inicio)
+        if entrada is not None and entrada[2] <= fim and \
+                (entrada[1] is escopo or entrada[1] is None):
+            self.acertos += 1
+            return entrada[0], entrada[2]
+
+        self.falhas += 1
+        node, j = parse_expression(tokens, inicio, tabela_simbolos, escopo, fim)
+        self.arvores[inicio] = (node, escopo, j)
+        return node, j
+
+    def extrair(self, intervalos):
+        """
+        Árvores das expressões que começam em cada intervalo (inicio, fim)
+        de 'intervalos' (ordenados e disjuntos), com posições relativas ao
+        início do intervalo.
 
-        # Escopo correto para este ponto do código
-        escopo_corrente = escopo_por_token[i] or escopo_global
+        Retorna:
+            uma lista por intervalo, de (início, nó, posição final)
+        """
+        inicios = [inicio for inicio, _ in intervalos]
+        resultado = [[] for _ in intervalos]
+        for k, (no, _, j) in self.arvores.items():
+            u = bisect_right(inicios, k) - 1
+            if u >= 0 and k < intervalos[u][1]:
+                inicio = inicios[u]
+                resultado[u].append((k - inicio, no, j - inicio))
+        return resultado
+
+    def preencher(self, inicio, arvores):
+        """
+        Acrescenta árvores obtidas com extrair (de outra compilação),
+        deslocadas para 'inicio' e válidas em qualquer escopo.
+        """
+        for k, no, j in arvores:
+            self.arvores[inicio + k] = (no, None, inicio + j)
 
-        # ---------------------------------------------------------
-        # 1) ATRIBUIÇÃO: LVALUE = EXPRESSION ;
-        # ---------------------------------------------------------
-        if tok.tipo == "ident":
-            j = i + 1
+    def __repr__(self):
+        return (f"CacheExpressoes({len(self.arvores)} árvores, "
+                f"{self.acertos} acertos, {self.falhas} falhas)")
 
-            # pula possíveis [ NUMEXPRESSION ] do LVALUE (acesso a vetores)
-            while j < n and tokens[j].tipo == "[":
-                j += 1
-                while j < n and tokens[j].tipo != "]":
-                    j += 1
-                j += 1  # pula ']'
 
-            # verifica se é mesmo uma atribuição
-            if j < n and tokens[j].tipo == "=":
-                idx_ts = tok.valor
-                nome = tabela_simbolos[idx_ts][0]
-                simbolo = escopo_corrente.procura(nome)
-                if simbolo is None:
-                    raise SemanticError(
-                        f"Variável '{nome}' não declarada na atribuição "
-                        f"(linha {tok.l}, coluna {tok.c})"
-                    )
+# ----------------------------------------------------------------------
+# 2ª passada: análise de expressões e atribuições
+# ----------------------------------------------------------------------
+
+def pular_indices(tokens, j, n):
+    """
+    Pula os possíveis [ NUMEXPRESSION ] de um LVALUE a partir de tokens[j]
+    e devolve a posição do primeiro token depois deles.
+    """
+    while j < n and tokens[j].tipo == "[":
+        j += 1
+        while j < n and tokens[j].tipo != "]":
+            j += 1
+        j += 1  # pula ']'
+    return j
+
+
+def procurar_alvo_atribuicao(tokens, i, tabela_simbolos, escopo):
+    """
+    Procura o símbolo do identificador tokens[i] do lado esquerdo de uma
+    atribuição; lança SemanticError se ele não estiver declarado.
+    """
+    tok = tokens[i]
+    simbolo = escopo.resolver(tokens, i)
+    if simbolo is None:
+        nome = tabela_simbolos[tok.valor][0]
+        raise SemanticError(
+            f"Variável '{nome}' não declarada na atribuição "
+            f"(linha {tok.l}, coluna {tok.c})"
+        )
+    return simbolo
+
+
+def verificar_atribuicao(tokens, i, inicio, fim, simbolo, tabela_simbolos, escopo, cache,
+                         relatorio=SAIDA_PADRAO):
+    """
+    Verifica a expressão tokens[inicio:fim] do lado direito da atribuição
+    cujo identificador está em tokens[i] (símbolo já resolvido em 'simbolo'),
+    comparando o tipo da expressão com o da variável, e imprime a árvore.
+    """
+    tok = tokens[i]
+    nome = tabela_simbolos[tok.valor][0]
+
+    if inicio < fim:
+        node, _ = cache.analisar(tokens, inicio, tabela_simbolos, escopo, fim)
+
+        # Verificação de tipos: tipo da expressão vs tipo da variável
+        if node.tipo is not None and simbolo.tipo is not None and node.tipo != simbolo.tipo:
+            raise SemanticError(
+                f"Tipo da expressão ({node.tipo}) incompatível com variável '{nome}' "
+                f"de tipo {simbolo.tipo} (linha {tok.l}, coluna {tok.c})"
+            )
+
+        registrar_arvore(relatorio, TITULO_ATRIBUICAO, node, nome=nome)
+
+
+def processar_expressoes(tokens, tabela_simbolos,
+                         escopo_global, tipos_por_indice,
+                         escopo_por_token, cache, pares, relatorio=SAIDA_PADRAO):
+    """
+    Percorre a lista de tokens e:
+
+      - constrói árvores de expressão para:
+          * atribuições: LVALUE = EXPRESSION ;
+          * comandos print: print EXPRESSION ;
+          * condições de if: if( EXPRESSION ) ...
+          * condição do for: for( ATRIBSTAT ; EXPRESSION ; ATRIBSTAT ) ...
+
+      - faz verificação de tipos dentro das expressões (via parse_expression /
+        combinar_binario), guardando as árvores em 'cache'
+
+      - registra as árvores em pré-ordem em 'relatorio' (depuração).
+    """
+    pilha_escopos = [escopo_global]
+    pilha_loops = []  # mantido para futura extensão (não é usado aqui)
+
+    i = 0
+    n = len(tokens)
+    escopo_trecho, fim_trecho = None, 0
+
+    while i < n:
+        tok = tokens[i]
+
+        # Escopo correto para este ponto do código (o índice só é
+        # consultado quando i sai do trecho do escopo anterior)
+        if i >= fim_trecho:
+            escopo_trecho, fim_trecho = escopo_por_token.trecho(i)
+        escopo_corrente = escopo_trecho or escopo_global
+
+        # ---------------------------------------------------------
+        # 1) ATRIBUIÇÃO: LVALUE = EXPRESSION ;
+        # ---------------------------------------------------------
+        if tok.tipo == "ident":
+            # pula possíveis [ NUMEXPRESSION ] do LVALUE (acesso a vetores)
+            j = pular_indices(tokens, i + 1, n)
+
+            # verifica se é mesmo uma atribuição
+            if j < n and tokens[j].tipo == "=":
+                simbolo = procurar_alvo_atribuicao(tokens, i, tabela_simbolos, escopo_corrente)
 
                 # procura o ';' que encerra a atribuição
                 k = j + 1
@@ -776,21 +1551,8 @@ def processar_expressoes(tokens, tabela_simbolos,
                 if k >= n:
                     raise SemanticError("';' esperado ao final de atribuição")
 
-                expr_tokens = tokens[j + 1:k]
-
-                if expr_tokens:
-                    node, _ = parse_expression(expr_tokens, 0, tabela_simbolos, escopo_corrente)
-
-                    # Verificação de tipos: tipo da expressão vs tipo da variável
-                    if node.tipo is not None and simbolo.tipo is not None and node.tipo != simbolo.tipo:
-                        raise SemanticError(
-                            f"Tipo da expressão ({node.tipo}) incompatível com variável '{nome}' "
-                            f"de tipo {simbolo.tipo} (linha {tok.l}, coluna {tok.c})"
-                        )
-
-                    print(f"Árvore da expressão da atribuição a '{nome}':")
-                    print_preordem(node)
-                    print()
+                verificar_atribuicao(tokens, i, j + 1, k, simbolo,
+                                     tabela_simbolos, escopo_corrente, cache, relatorio)
 
                 i = k + 1
                 continue
@@ -808,13 +1570,10 @@ def processar_expressoes(tokens, tabela_simbolos,
                     f"';' esperado ao final do comando print (linha {tok.l}, coluna {tok.c})"
                 )
 
-            expr_tokens = tokens[start_expr:j]
-
-            if expr_tokens:
-                node, _ = parse_expression(expr_tokens, 0, tabela_simbolos, escopo_corrente)
-                print(f"Árvore da expressão no print (linha {tok.l}, coluna {tok.c}):")
-                print_preordem(node)
-                print()
+            if start_expr < j:
+                node, _ = cache.analisar(tokens, start_expr, tabela_simbolos,
+                                         escopo_corrente, j)
+                registrar_arvore(relatorio, TITULO_PRINT, node, tok=tok)
 
             i = j + 1
             continue
@@ -831,30 +1590,18 @@ def processar_expressoes(tokens, tabela_simbolos,
                     f"'(' esperado após 'if' (linha {tok.l}, coluna {tok.c})"
                 )
 
-            start_expr = j + 1
-            k = start_expr
-            nivel_paren = 1
-            while k < n and nivel_paren > 0:
-                if tokens[k].tipo == "(":
-                    nivel_paren += 1
-                elif tokens[k].tipo == ")":
-                    nivel_paren -= 1
-                k += 1
-
-            if nivel_paren != 0:
+            if pares[j] < 0:
                 raise SemanticError(
                     f"')' esperado para fechar condição do if "
                     f"(linha {tok.l}, coluna {tok.c})"
                 )
 
-            end_expr = k - 1
-            expr_tokens = tokens[start_expr:end_expr]
-
-            if expr_tokens:
-                node, _ = parse_expression(expr_tokens, 0, tabela_simbolos, escopo_corrente)
-                print(f"Árvore da expressão da condição do if (linha {tok.l}, coluna {tok.c}):")
-                print_preordem(node)
-                print()
+            start_expr = j + 1
+            end_expr = pares[j]
+            if start_expr < end_expr:
+                node, _ = cache.analisar(tokens, start_expr, tabela_simbolos,
+                                         escopo_corrente, end_expr)
+                registrar_arvore(relatorio, TITULO_IF, node, tok=tok)
 
             i += 1
             continue
@@ -896,15 +1643,578 @@ def processar_expressoes(tokens, tabela_simbolos,
             second_semicolon = k
             end_expr = second_semicolon
 
-            expr_tokens = tokens[start_expr:end_expr]
-
-            if expr_tokens:
-                node, _ = parse_expression(expr_tokens, 0, tabela_simbolos, escopo_corrente)
-                print(f"Árvore da expressão-condição do for (linha {tok.l}, coluna {tok.c}):")
-                print_preordem(node)
-                print()
+            if start_expr < end_expr:
+                node, _ = cache.analisar(tokens, start_expr, tabela_simbolos,
+                                         escopo_corrente, end_expr)
+                registrar_arvore(relatorio, TITULO_FOR, node, tok=tok)
 
             i = second_semicolon + 1
             continue
 
         i += 1
+
+
+# ----------------------------------------------------------------------
+# Análise semântica fundida (uma única passada sobre os tokens)
+# ----------------------------------------------------------------------
+#
+# Alternativa às duas passadas de analisador_semantico: declarações,
+# escopos, 'break' e verificação de expressões são feitos no mesmo laço.
+# Cada expressão é analisada assim que é encontrada, com o escopo que está
+# no topo da pilha naquele ponto, e o laço salta direto para o fim dela.
+#
+# Diferença em relação às duas passadas: um símbolo só é visível depois de
+# declarado (na 2ª passada, todas as declarações do escopo já existem).
+
+def verificar_atribstat(tokens, i, fim, tabela_simbolos, escopo, cache, relatorio=SAIDA_PADRAO):
+    """
+    Verifica um ATRIBSTAT (LVALUE = EXPRESSION) do cabeçalho de um 'for',
+    ocupando tokens[i:fim].
+    """
+    if i >= fim or tokens[i].tipo != "ident":
+        return
+    j = pular_indices(tokens, i + 1, fim)
+    if j < fim and tokens[j].tipo == "=":
+        simbolo = procurar_alvo_atribuicao(tokens, i, tabela_simbolos, escopo)
+        verificar_atribuicao(tokens, i, j + 1, fim, simbolo, tabela_simbolos, escopo, cache,
+                             relatorio)
+
+
+def imprimir_arvore_expressao(tokens, inicio, fim, tabela_simbolos, escopo, cache,
+                              relatorio, titulo, tok):
+    """
+    Analisa a expressão tokens[inicio:fim] (se não vazia) e registra a sua
+    árvore em pré-ordem, precedida de 'titulo' (um dos TITULO_*, preenchido
+    com a linha e a coluna de 'tok').
+    """
+    if inicio < fim:
+        node, _ = cache.analisar(tokens, inicio, tabela_simbolos, escopo, fim)
+        registrar_arvore(relatorio, titulo, node, tok=tok)
+
+
+def analisador_semantico_fundido(tokens, tabela_simbolos, cache=None, pares=None,
+                                 relatorio=None):
+    """
+    Executa a análise semântica em uma única passada sobre os tokens.
+
+    Faz o mesmo trabalho de processar_declaracoes_e_escopos e de
+    processar_expressoes, mas verifica cada atribuição, print e condição
+    de if/for no momento em que ela aparece. Por isso uma variável só pode
+    ser usada depois da sua declaração; as funções, não: as assinaturas
+    'def ident' são declaradas no escopo global antes da passada, e uma
+    função pode ser chamada antes da sua def, como nas duas passadas e na
+    AST. As árvores ficam em 'cache';
+    'pares' é o índice de delimitadores casados (calculado se omitido).
+    As árvores e mensagens vão para 'relatorio' (padrão: saída padrão).
+
+    Retorna:
+        IndiceEscopos com o Escopo de cada posição visitada (as demais
+        valem None).
+    """
+    if cache is None:
+        cache = CacheExpressoes()
+    if pares is None:
+        pares = casar_delimitadores(tokens)
+    if relatorio is None:
+        relatorio = SAIDA_PADRAO
+
+    escopo_global = Escopo("global", None, "global")
+    pilha_escopos = [escopo_global]
+    pilha_loops = []
+    tipos_por_indice = {}
+    escopos = IndiceEscopos(escopo_global)
+
+    n = len(tokens)
+
+    # Funções do programa, declaradas antes da passada (chamadas adiante)
+    for i in range(n - 1):
+        if tokens[i].tipo == "def" and tokens[i + 1].tipo == "ident":
+            ident_tok = tokens[i + 1]
+            declara_funcao(tabela_simbolos[ident_tok.valor][0], ident_tok, pilha_escopos)
+
+    i = 0
+    inicio_trecho, proximo, escopo_trecho = 0, 0, None
+
+    while i < n:
+        escopo_corrente = pilha_escopos[-1]
+        if escopo_corrente is not escopo_trecho or i != proximo:
+            escopos.registrar(inicio_trecho, proximo, escopo_trecho)
+            inicio_trecho, escopo_trecho = i, escopo_corrente
+        proximo = i + 1
+
+        tok = tokens[i]
+        tipo_tok = tok.tipo
+
+        # Remove laços "simples" cujo corpo já foi totalmente percorrido
+        while pilha_loops and pilha_loops[-1].get("tipo") == "simples" \
+                and i >= pilha_loops[-1].get("fim", n + 1):
+            pilha_loops.pop()
+
+        # ---------------------------------------------------------
+        # 1) Início de função: def ident ( PARAMS ) { ... }
+        # ---------------------------------------------------------
+        if tipo_tok == "def" and i + 1 < n and tokens[i + 1].tipo == "ident":
+            ident_tok = tokens[i + 1]
+            nome = tabela_simbolos[ident_tok.valor][0]
+
+            # A função já foi declarada antes da passada
+            pilha_escopos.append(Escopo(f"func_{nome}", pilha_escopos[-1], "func"))
+
+            j = i + 2
+            while j < n and tokens[j].tipo != "(":
+                j += 1
+            j += 1  # pula '('
+
+            while j < n and tokens[j].tipo != ")":
+                if tokens[j].tipo in ("int", "float", "string") and j + 1 < n and tokens[j + 1].tipo == "ident":
+                    ident_param = tokens[j + 1]
+                    nome_param = tabela_simbolos[ident_param.valor][0]
+                    declara_parametro(nome_param, tokens[j].tipo, ident_param, pilha_escopos)
+                    tipos_por_indice[ident_param.valor] = tokens[j].tipo
+                    j += 2
+                else:
+                    j += 1
+
+            i = j  # continua a partir do ')'
+            continue
+
+        # ---------------------------------------------------------
+        # 2) Blocos: '{' abre e '}' fecha escopo
+        # ---------------------------------------------------------
+        if tipo_tok == "{":
+            novo = Escopo(f"bloco_{tok.l}_{tok.c}", escopo_corrente, "bloco")
+            pilha_escopos.append(novo)
+
+            if pilha_loops and pilha_loops[-1].get("tipo") == "bloco" \
+                    and pilha_loops[-1].get("escopo") is None:
+                pilha_loops[-1]["escopo"] = novo
+
+        elif tipo_tok == "}":
+            if escopo_corrente.tipo == "bloco":
+                escopo_fechado = pilha_escopos.pop()
+
+                if pilha_loops and pilha_loops[-1].get("tipo") == "bloco" \
+                        and pilha_loops[-1].get("escopo") is escopo_fechado:
+                    pilha_loops.pop()
+
+                if escopo_fechado.pai is not None and escopo_fechado.pai.tipo == "func":
+                    pilha_escopos.pop()  # fecha escopo da função
+            else:
+                pilha_escopos.pop()
+
+        # ---------------------------------------------------------
+        # 3) Declaração de variável: TIPO ident ...
+        # ---------------------------------------------------------
+        elif tipo_tok in ("int", "float", "string") and i + 1 < n and tokens[i + 1].tipo == "ident":
+            ident_tok = tokens[i + 1]
+            nome = tabela_simbolos[ident_tok.valor][0]
+            declara_variavel(nome, tipo_tok, ident_tok, pilha_escopos)
+            tipos_por_indice[ident_tok.valor] = tipo_tok
+            i += 1  # pula o ident
+
+        # ---------------------------------------------------------
+        # 4) Atribuição: LVALUE = EXPRESSION ;
+        # ---------------------------------------------------------
+        elif tipo_tok == "ident":
+            j = pular_indices(tokens, i + 1, n)
+            if j < n and tokens[j].tipo == "=":
+                simbolo = procurar_alvo_atribuicao(tokens, i, tabela_simbolos, escopo_corrente)
+
+                k = j + 1
+                while k < n and tokens[k].tipo != ";":
+                    k += 1
+                if k >= n:
+                    raise SemanticError("';' esperado ao final de atribuição")
+
+                verificar_atribuicao(tokens, i, j + 1, k, simbolo,
+                                     tabela_simbolos, escopo_corrente, cache, relatorio)
+                i = k  # o i += 1 abaixo pula o ';'
+
+        # ---------------------------------------------------------
+        # 5) Print: print EXPRESSION ;
+        # ---------------------------------------------------------
+        elif tipo_tok == "print":
+            j = i + 1
+            while j < n and tokens[j].tipo != ";":
+                j += 1
+            if j >= n:
+                raise SemanticError(
+                    f"';' esperado ao final do comando print (linha {tok.l}, coluna {tok.c})"
+                )
+            imprimir_arvore_expressao(
+                tokens, i + 1, j, tabela_simbolos, escopo_corrente, cache,
+                relatorio, TITULO_PRINT, tok,
+            )
+            i = j
+
+        # ---------------------------------------------------------
+        # 6) If: if ( EXPRESSION ) STATEMENT ...
+        #    Depois da condição, o corpo é percorrido normalmente.
+        # ---------------------------------------------------------
+        elif tipo_tok == "if":
+            j = i + 1
+            while j < n and tokens[j].tipo != "(":
+                j += 1
+            if j >= n:
+                raise SemanticError(
+                    f"'(' esperado após 'if' (linha {tok.l}, coluna {tok.c})"
+                )
+
+            if pares[j] < 0:
+                raise SemanticError(
+                    f"')' esperado para fechar condição do if "
+                    f"(linha {tok.l}, coluna {tok.c})"
+                )
+            k = pares[j] + 1
+
+            imprimir_arvore_expressao(
+                tokens, j + 1, k - 1, tabela_simbolos, escopo_corrente, cache,
+                relatorio, TITULO_IF, tok,
+            )
+            i = k
+            continue
+
+        # ---------------------------------------------------------
+        # 7) For: for( ATRIBSTAT ; EXPRESSION ; ATRIBSTAT ) STATEMENT
+        #    Verifica as três partes do cabeçalho e registra o laço.
+        # ---------------------------------------------------------
+        elif tipo_tok == "for":
+            j = i + 1
+            while j < n and tokens[j].tipo != "(":
+                j += 1
+            if j >= n:
+                raise SemanticError(
+                    f"'(' esperado após 'for' (linha {tok.l}, coluna {tok.c})"
+                )
+
+            # primeiro ';' (final da inicialização)
+            k1 = j + 1
+            while k1 < n and tokens[k1].tipo != ";":
+                k1 += 1
+            if k1 >= n:
+                raise SemanticError(
+                    f"Primeiro ';' esperado no cabeçalho do for "
+                    f"(linha {tok.l}, coluna {tok.c})"
+                )
+
+            # segundo ';' (final da condição)
+            k2 = k1 + 1
+            while k2 < n and tokens[k2].tipo != ";":
+                k2 += 1
+            if k2 >= n:
+                raise SemanticError(
+                    f"Segundo ';' esperado no cabeçalho do for "
+                    f"(linha {tok.l}, coluna {tok.c})"
+                )
+
+            # ')' que fecha o cabeçalho (final do passo)
+            k3 = pares[j]
+            if k3 < k2:
+                raise SemanticError(
+                    f"')' esperado para fechar cabeçalho do for "
+                    f"(linha {tok.l}, coluna {tok.c})"
+                )
+
+            verificar_atribstat(tokens, j + 1, k1, tabela_simbolos, escopo_corrente, cache,
+                                relatorio)
+            imprimir_arvore_expressao(
+                tokens, k1 + 1, k2, tabela_simbolos, escopo_corrente, cache,
+                relatorio, TITULO_FOR, tok,
+            )
+            verificar_atribstat(tokens, k2 + 1, k3, tabela_simbolos, escopo_corrente, cache,
+                                relatorio)
+
+            body_start = k3 + 1
+            if body_start < n:
+                if tokens[body_start].tipo == "{":
+                    pilha_loops.append({"tipo": "bloco", "escopo": None})
+                else:
+                    fim = encontrar_fim_statement(tokens, body_start, pares)
+                    pilha_loops.append({"tipo": "simples", "fim": fim})
+
+            i = body_start
+            continue
+
+        # ---------------------------------------------------------
+        # 8) Break: deve estar dentro de algum laço
+        # ---------------------------------------------------------
+        elif tipo_tok == "break":
+            if not pilha_loops:
+                raise SemanticError(
+                    f"Comando 'break' fora de laço de repetição na linha {tok.l}, coluna {tok.c}"
+                )
+
+        i += 1
+
+    escopos.registrar(inicio_trecho, proximo, escopo_trecho)
+    imprimir_resumo_semantico(tabela_simbolos, tipos_por_indice, relatorio)
+
+    return escopos
+
+
+# ----------------------------------------------------------------------
+# Análise semântica sobre a AST (arvore.py)
+# ----------------------------------------------------------------------
+#
+# Alternativa às duas passadas sobre a lista de tokens: percorre a árvore
+# montada pelo analisador sintático (analisador_sintatico com
+# construir_ast=True). As mesmas duas etapas são mantidas:
+#   1) declarações, escopos e 'break' (declarar_ast), que guarda em cada
+#      FuncDef/Bloco o Escopo criado para ele;
+#   2) tipos das expressões (verificar_ast), que anota o campo 'tipo' dos
+#      ExprNode da árvore e imprime as árvores de expressão.
+# Assim, como nas passadas por tokens, todos os símbolos de um escopo já
+# estão declarados quando as expressões são verificadas. As árvores de
+# expressão anotadas são reaproveitadas pelo gerador de código.
+
+def analisador_semantico_ast(programa, tokens, tabela_simbolos, relatorio=None):
+    """
+    Executa a análise semântica percorrendo a AST 'programa'.
+
+    Produz as mesmas verificações e mensagens de analisador_semantico, mas
+    imprime a árvore de toda atribuição (inclusive as do cabeçalho do for),
+    print, condição de if e condição de for, na ordem do código-fonte.
+    As árvores e mensagens vão para 'relatorio' (padrão: saída padrão).
+    """
+    if relatorio is None:
+        relatorio = SAIDA_PADRAO
+
+    escopo_global = Escopo("global", None, "global")
+    pilha_escopos = [escopo_global]
+    tipos_por_indice = {}
+
+    declarar_ast(programa, tokens, tabela_simbolos, pilha_escopos, tipos_por_indice)
+
+    for func in programa.funcoes:
+        verificar_ast(func.corpo, tokens, tabela_simbolos, func.escopo, relatorio)
+    for cmd in programa.comandos:
+        verificar_ast(cmd, tokens, tabela_simbolos, escopo_global, relatorio)
+
+    imprimir_resumo_semantico(tabela_simbolos, tipos_por_indice, relatorio)
+
+
+def declarar_ast(programa, tokens, tabela_simbolos, pilha_escopos, tipos_por_indice):
+    """
+    1ª etapa sobre a AST: funções, parâmetros, variáveis, escopos e 'break'.
+    """
+    for func in programa.funcoes:
+        ident_tok = tokens[func.tok]
+        nome = tabela_simbolos[ident_tok.valor][0]
+
+        # Registra a função no escopo global e cria o escopo da função
+        declara_funcao(nome, ident_tok, pilha_escopos)
+        escopo_func = Escopo(f"func_{nome}", pilha_escopos[-1], "func")
+        pilha_escopos.append(escopo_func)
+        func.escopo = escopo_func
+
+        for tipo, idx_tok in func.params:
+            ident_param = tokens[idx_tok]
+            nome_param = tabela_simbolos[ident_param.valor][0]
+            declara_parametro(nome_param, tipo, ident_param, pilha_escopos)
+            tipos_por_indice[ident_param.valor] = tipo
+
+        declarar_comando_ast(func.corpo, tokens, tabela_simbolos,
+                             pilha_escopos, tipos_por_indice, False)
+        pilha_escopos.pop()
+
+    for cmd in programa.comandos:
+        declarar_comando_ast(cmd, tokens, tabela_simbolos,
+                             pilha_escopos, tipos_por_indice, False)
+
+
+def declarar_comando_ast(no, tokens, tabela_simbolos, pilha_escopos,
+                         tipos_por_indice, em_laco):
+    """
+    Processa as declarações de um comando da AST (e dos seus subcomandos).
+
+    em_laco indica se o comando está dentro do corpo de algum 'for'.
+
+    Sem recursão, como gerar_comandos_ast: 'pendentes' guarda os pares
+    (nó, em_laco) ainda não processados, em pré-ordem; um par com nó None
+    fecha o escopo do bloco cujos comandos acabaram.
+    """
+    pendentes = [(no, em_laco)]
+    while pendentes:
+        no, em_laco = pendentes.pop()
+        if no is None:
+            pilha_escopos.pop()
+            continue
+
+        tipo_no = type(no).__name__
+
+        if tipo_no == "Bloco":
+            tok = tokens[no.tok]
+            novo = Escopo(f"bloco_{tok.l}_{tok.c}", pilha_escopos[-1], "bloco")
+            pilha_escopos.append(novo)
+            no.escopo = novo
+            pendentes.append((None, em_laco))
+            pendentes.extend((cmd, em_laco) for cmd in reversed(no.comandos))
+
+        elif tipo_no == "VarDecl":
+            ident_tok = tokens[no.tok]
+            declara_variavel(tabela_simbolos[ident_tok.valor][0], no.tipo,
+                             ident_tok, pilha_escopos)
+            tipos_por_indice[ident_tok.valor] = no.tipo
+
+        elif tipo_no == "If":
+            if no.senao is not None:
+                pendentes.append((no.senao, em_laco))
+            pendentes.append((no.entao, em_laco))
+
+        elif tipo_no == "For":
+            pendentes.append((no.corpo, True))
+
+        elif tipo_no == "Break":
+            if not em_laco:
+                tok = tokens[no.tok]
+                raise SemanticError(
+                    f"Comando 'break' fora de laço de repetição na linha {tok.l}, coluna {tok.c}"
+                )
+
+
+def verificar_ast(no, tokens, tabela_simbolos, escopo, relatorio=SAIDA_PADRAO):
+    """
+    2ª etapa sobre a AST: verifica os tipos das expressões de um comando
+    (e dos seus subcomandos) e registra as árvores em pré-ordem.
+
+    Os pares (nó, escopo) ainda não verificados ficam na pilha
+    'pendentes' (sem recursão), na ordem do código-fonte.
+    """
+    pendentes = [(no, escopo)]
+    while pendentes:
+        no, escopo = pendentes.pop()
+        tipo_no = type(no).__name__
+
+        if tipo_no == "Bloco":
+            pendentes.extend((cmd, no.escopo) for cmd in reversed(no.comandos))
+
+        elif tipo_no == "Atrib":
+            verificar_atribuicao_ast(no, tokens, tabela_simbolos, escopo, relatorio)
+
+        elif tipo_no == "Print":
+            tok = tokens[no.tok]
+            tipar_expr(no.expr, tokens, escopo)
+            registrar_arvore(relatorio, TITULO_PRINT, no.expr, tok=tok)
+
+        elif tipo_no == "If":
+            tok = tokens[no.tok]
+            tipar_expr(no.cond, tokens, escopo)
+            registrar_arvore(relatorio, TITULO_IF, no.cond, tok=tok)
+            if no.senao is not None:
+                pendentes.append((no.senao, escopo))
+            pendentes.append((no.entao, escopo))
+
+        elif tipo_no == "For":
+            tok = tokens[no.tok]
+            verificar_atribuicao_ast(no.init, tokens, tabela_simbolos, escopo, relatorio)
+            tipar_expr(no.cond, tokens, escopo)
+            registrar_arvore(relatorio, TITULO_FOR, no.cond, tok=tok)
+            verificar_atribuicao_ast(no.passo, tokens, tabela_simbolos, escopo, relatorio)
+            pendentes.append((no.corpo, escopo))
+
+
+def verificar_atribuicao_ast(no, tokens, tabela_simbolos, escopo, relatorio=SAIDA_PADRAO):
+    """Verifica uma atribuição LVALUE = EXPRESSION da AST."""
+    tok = tokens[no.tok]
+    nome = tabela_simbolos[tok.valor][0]
+    simbolo = escopo.resolver(tokens, no.tok)
+    if simbolo is None:
+        raise SemanticError(
+            f"Variável '{nome}' não declarada na atribuição "
+            f"(linha {tok.l}, coluna {tok.c})"
+        )
+    no.simbolo = simbolo
+
+    for indice in no.indices:
+        tipar_expr(indice, tokens, escopo)
+
+    node = no.expr
+    tipar_expr(node, tokens, escopo)
+
+    # Verificação de tipos: tipo da expressão vs tipo da variável
+    if node.tipo is not None and simbolo.tipo is not None and node.tipo != simbolo.tipo:
+        raise SemanticError(
+            f"Tipo da expressão ({node.tipo}) incompatível com variável '{nome}' "
+            f"de tipo {simbolo.tipo} (linha {tok.l}, coluna {tok.c})"
+        )
+
+    registrar_arvore(relatorio, TITULO_ATRIBUICAO, node, nome=nome)
+
+
+def tipar_expr(node, tokens, escopo):
+    """
+    Preenche node.tipo em uma árvore de expressão da AST, com as mesmas
+    regras (e mensagens de erro) de parse_factor e combinar_binario.
+
+    Percorre a árvore com uma pilha explícita de (nó, etapa): na etapa 0
+    o nó é verificado e os filhos são empilhados; na etapa 1 (filhos já
+    tipados) o tipo de um operador é calculado. Os erros saem na mesma
+    ordem de um percurso recursivo.
+    """
+    pilha = [(node, 0)]
+    while pilha:
+        node, etapa = pilha.pop()
+        op = node.op
+
+        if op in ("int", "float", "string"):
+            node.tipo = op
+            continue
+
+        if op == "null":
+            node.tipo = None
+            continue
+
+        if op == "id" or op == "call":
+            tok = tokens[node.tok]
+            nome = node.valor
+            simbolo = escopo.resolver(tokens, node.tok)
+            if simbolo is None:
+                raise SemanticError(
+                    f"Uso de identificador '{nome}' não declarado "
+                    f"(linha {tok.l}, coluna {tok.c})"
+                )
+
+            if op == "call":
+                if simbolo.categoria != "func":
+                    raise SemanticError(
+                        f"Identificador '{nome}' usado como função, mas não é função "
+                        f"(linha {tok.l}, coluna {tok.c})"
+                    )
+                filhos = node.args
+                node.tipo = None
+            else:
+                filhos = getattr(node, "indices", ())
+                node.tipo = simbolo.tipo
+                node.operando = simbolo.operando
+            pilha.extend((filho, 0) for filho in reversed(filhos))
+            continue
+
+        if op == "new":
+            # Alocação não faz parte das expressões aritméticas tratadas aqui
+            tok = tokens[node.tok]
+            raise SemanticError(
+                f"Token inesperado em fator: new (linha {tok.l}, coluna {tok.c})"
+            )
+
+        if op.startswith("unary"):
+            if etapa == 0:
+                pilha.append((node, 1))
+                pilha.append((node.left, 0))
+            else:
+                node.tipo = node.left.tipo
+            continue
+
+        # operador binário
+        if etapa == 0:
+            pilha.append((node, 1))
+            pilha.append((node.right, 0))
+            pilha.append((node.left, 0))
+            continue
+        if node.left.tipo != node.right.tipo:
+            # mesma posição de combinar_binario: último token do operando direito
+            tok = tokens[node.right.fim]
+            raise SemanticError(
+                f"Operação '{op}' com tipos incompatíveis: {node.left.tipo} e {node.right.tipo} "
+                f"(linha {tok.l}, coluna {tok.c})"
+            )
+        node.tipo = node.left.tipo
@@ -1,93 +1,239 @@
+from array import array
+
 from lexico import *
 from dicionario_tabelall1 import *
+from arvore import ConstrutorAST
+from relatorio import RESUMO, SAIDA_PADRAO
+
+
+# -----------------------------------------------------------------------------
+# Tabela LL(1) pré-compilada
+#
+# A tabela de dicionario_tabelall1.dicionario() (não-terminal -> terminal ->
+# lista de símbolos) é convertida uma única vez, na importação do módulo, para
+# uma forma indexada por inteiros:
+#
+#   - terminais recebem os códigos 0 .. T-1 (inclui "$");
+#   - não-terminais recebem os códigos T .. T+N-1;
+#   - TABELA_LL1[nt - T][terminal] é o número da produção (ou -1 = erro);
+#   - PRODUCOES[p] é a tupla de códigos da produção p, já invertida e sem
+#     o "&" (epsilon), pronta para ser empilhada.
+# -----------------------------------------------------------------------------
+
+SIMBOLO_INICIAL = "PROGRAM"
+
+
+def compilar_tabela(tabela):
+    """
+    Converte a tabela LL(1) em dicionário para a forma indexada por inteiros.
+
+    Retorna:
+        (simbolos, codigo_simbolo, n_terminais, linhas, producoes)
+
+        simbolos       : tupla código -> nome do símbolo
+        codigo_simbolo : dicionário nome -> código
+        n_terminais    : quantidade de terminais (códigos 0 .. T-1)
+        linhas         : lista (uma por não-terminal) de array('h') com o
+                         número da produção para cada terminal, ou -1
+        producoes      : lista de tuplas de códigos, invertidas e sem '&'
+    """
+    nao_terminais = list(tabela)
+
+    terminais = {"$"}
+    for linha in tabela.values():
+        terminais.update(linha)
+        for producao in linha.values():
+            terminais.update(s for s in producao if s not in tabela and s != "&")
+    terminais = sorted(terminais)
+
+    simbolos = tuple(terminais + nao_terminais)
+    codigo_simbolo = {nome: codigo for codigo, nome in enumerate(simbolos)}
+    n_terminais = len(terminais)
+
+    producoes = []
+    codigo_producao = {}
+    linhas = []
+    for nt in nao_terminais:
+        linha = array("h", [-1] * n_terminais)
+        for terminal, producao in tabela[nt].items():
+            chave = tuple(producao)
+            if chave not in codigo_producao:
+                codigo_producao[chave] = len(producoes)
+                producoes.append(tuple(
+                    codigo_simbolo[s] for s in reversed(producao) if s != "&"
+                ))
+            linha[codigo_simbolo[terminal]] = codigo_producao[chave]
+        linhas.append(linha)
+
+    return simbolos, codigo_simbolo, n_terminais, linhas, producoes
+
+
+SIMBOLOS_LL1, CODIGO_SIMBOLO, N_TERMINAIS, TABELA_LL1, PRODUCOES = compilar_tabela(dicionario())
+
+# Código de tipo do TokenStream (lexico.CODIGO_TIPO) -> código de terminal
+_TERMINAL_DO_TIPO = array("h", [CODIGO_SIMBOLO[tipo] for tipo in TIPOS_TOKEN])
+
 
-def analisador_sintatico(tokens):
+class PilhaContada(list):
+    """
+    Pilha de análise que conta os símbolos desempilhados (passos) e guarda
+    a sua profundidade máxima. Usada apenas quando há contadores (perfil.py),
+    para não pesar no laço da análise comum.
+    """
+
+    def __init__(self, simbolos):
+        super().__init__(simbolos)
+        self.passos = 0
+        self.profundidade = len(self)
+
+    def pop(self):
+        self.passos += 1
+        return super().pop()
+
+    def extend(self, simbolos):
+        super().extend(simbolos)
+        if len(self) > self.profundidade:
+            self.profundidade = len(self)
+
+    def append(self, simbolo):
+        super().append(simbolo)
+        if len(self) > self.profundidade:
+            self.profundidade = len(self)
+
+
+def analisador_sintatico(tokens, tabela_simbolos=None, construir_ast=False, contadores=None,
+                         relatorio=None):
     """
     Implementa um analisador sintático preditivo LL(1) baseado em tabela.
 
     Entrada:
-        tokens: lista de objetos Token produzidos pelo analisador léxico.
+        tokens          : lista de objetos Token (ou TokenStream) produzidos
+                          pelo analisador léxico.
+        tabela_simbolos : tabela léxica (necessária apenas para construir a AST)
+        construir_ast   : se True, monta a AST (arvore.py) na mesma passada.
+        contadores      : dicionário opcional (perfil.py) em que são
+                          registrados os passos da análise e a profundidade
+                          máxima da pilha.
+        relatorio       : Relatorio (relatorio.py) que recebe a mensagem de
+                          sucesso (padrão: saída padrão).
 
     Comportamento:
-        - Usa uma pilha de símbolos (terminais e não-terminais);
-        - Consulta a tabela LL(1) (dicionário em dicionario_tabelall1.py);
+        - Usa uma pilha de códigos inteiros de símbolos (terminais e não-terminais);
+        - Consulta a tabela LL(1) pré-compilada (TABELA_LL1, gerada a partir
+          do dicionário em dicionario_tabelall1.py);
         - Em caso de erro, lança Exception com mensagem clara de linha/coluna;
-        - Em caso de sucesso, imprime "Análise sintática ocorreu com sucesso!".
+        - Em caso de sucesso, registra "Análise sintática ocorreu com sucesso!".
+
+    Construção da AST:
+        Ao expandir um não-terminal, empilha-se antes da produção um marcador
+        (~código do não-terminal). Terminais consumidos empilham o seu índice
+        em 'valores'; quando o marcador volta ao topo, todos os símbolos da
+        produção já foram reconhecidos e a ação de redução de ConstrutorAST
+        transforma os valores dos filhos no valor do não-terminal.
 
     Saída:
-        Nenhuma estrutura é retornada (reconhecimento apenas). Em caso de erro,
-        uma exceção é lançada.
+        Sem construir_ast, nenhuma estrutura é retornada (reconhecimento
+        apenas). Com construir_ast, retorna o nó arvore.Programa.
+        Em caso de erro, uma exceção é lançada.
     """
 
+    if relatorio is None:
+        relatorio = SAIDA_PADRAO
+
     # Adiciona símbolo de fim de entrada na lista de tokens
-    tokens.append(Token("$", "None", 0, 0))
+    tokens.append(Token("$", "None", SEM_POSICAO))
+
+    # Sequência de códigos de terminal da entrada, um por token
+    if isinstance(tokens, TokenStream):
+        entrada = (_TERMINAL_DO_TIPO[t] for t in tokens.tipos)
+    else:
+        entrada = (CODIGO_SIMBOLO[t.tipo] for t in tokens)
 
-    # Carrega tabela LL(1) (não-terminais x terminais -> produção)
-    tabela_ll1 = dicionario()
+    tabela = TABELA_LL1
+    producoes = PRODUCOES
+    n_terminais = N_TERMINAIS
+    fim_entrada = CODIGO_SIMBOLO["$"]
 
-    # Índice do token atual na lista
+    # Índice do token atual na lista e código do lookahead
     token_atual = 0
+    lookahead = next(entrada)
 
     # Pilha de análise: começa com o símbolo inicial da gramática
-    pilha = ["PROGRAM"]
-
-    # Conjunto de terminais conhecidos pela gramática
-    terminais = [
-        '!=', '%', '(', ')', '*', '+', ',', '-', '/', ';', '<', '<=', '=', '==',
-        '>', '>=', '[', ']', 'break', 'const_float', 'const_inteiro',
-        'const_string', 'def', 'else', 'float', 'for', 'ident', 'if', 'int',
-        'new', 'null', 'print', 'read', 'return', 'string', '{', '}'
-    ]
+    pilha = [CODIGO_SIMBOLO[SIMBOLO_INICIAL]]
+    if contadores is not None:
+        pilha = PilhaContada(pilha)
+
+    # Construção da AST: ações por código de não-terminal, pilha de valores
+    # e, para cada marcador empilhado, a base dos seus filhos em 'valores'
+    acoes = None
+    if construir_ast:
+        por_nome = ConstrutorAST(tokens, tabela_simbolos).acoes()
+        acoes = [por_nome.get(nome) for nome in SIMBOLOS_LL1]
+        valores = []
+        bases = []
 
     while True:
         # Caso de sucesso: esgotou a pilha e chegou ao fim da entrada
-        if tokens[token_atual].tipo == "$" and len(pilha) == 0:
-            print("Análise sintática ocorreu com sucesso!")
-            break
-
-        # Se a pilha acabou, mas ainda há tokens, temos erro
-        if len(pilha) == 0:
+        if not pilha:
+            if lookahead == fim_entrada:
+                relatorio.registrar(RESUMO, "mensagem", "Análise sintática ocorreu com sucesso!")
+                if contadores is not None:
+                    contadores["sintatico_passos"] = pilha.passos
+                    contadores["sintatico_pilha_max"] = pilha.profundidade
+                if acoes is not None:
+                    return valores[0]
+                break
+
+            # Se a pilha acabou, mas ainda há tokens, temos erro
             tok = tokens[token_atual]
             raise Exception(
                 f"Erro sintático na linha {tok.l}, coluna {tok.c}: "
                 f"token inesperado '{tok.tipo}' após fim da análise."
             )
 
-        topo = pilha[-1]
-        lookahead = tokens[token_atual].tipo
+        topo = pilha.pop()
+
+        # ---------------------------------------------------------------------
+        # Caso 0: marcador de fim de produção (apenas com construir_ast)
+        #         -> reduz os valores dos filhos ao valor do não-terminal.
+        # ---------------------------------------------------------------------
+        if topo < 0:
+            base = bases.pop()
+            filhos = valores[base:]
+            del valores[base:]
+            valores.append(acoes[~topo](filhos, token_atual - 1))
 
         # ---------------------------------------------------------------------
         # Caso 1: o topo da pilha é um terminal
         #         -> deve casar exatamente com o token corrente.
         # ---------------------------------------------------------------------
-        if topo in terminais:
+        elif topo < n_terminais:
             if topo == lookahead:
                 # Consome o terminal e avança no input
-                pilha.pop()
+                if acoes is not None:
+                    valores.append(token_atual)
                 token_atual += 1
+                lookahead = next(entrada)
             else:
                 tok = tokens[token_atual]
                 raise Exception(
                     f"Erro sintático na linha {tok.l}, coluna {tok.c}: "
-                    f"esperado '{topo}', encontrado '{tok.tipo}'."
+                    f"esperado '{SIMBOLOS_LL1[topo]}', encontrado '{tok.tipo}'."
                 )
 
         # ---------------------------------------------------------------------
         # Caso 2: o topo da pilha é um não-terminal
         #         -> consulta a tabela LL(1) para decidir qual produção usar.
+        #            A produção já está invertida (a pilha é LIFO) e sem '&'.
         # ---------------------------------------------------------------------
         else:
-            producao = tabela_ll1.get(topo, {}).get(lookahead)
-
-            if producao:
-                # Remove o não-terminal do topo
-                pilha.pop()
+            producao = tabela[topo - n_terminais][lookahead]
 
-                # Empilha a produção correspondente em ordem reversa
-                # (pois a pilha é LIFO)
-                for simbolo in reversed(producao):
-                    if simbolo != "&":  # & representa epsilon (produção vazia)
-                        pilha.append(simbolo)
+            if producao >= 0:
+                if acoes is not None:
+                    pilha.append(~topo)
+                    bases.append(len(valores))
+                pilha.extend(producoes[producao])
             else:
                 tok = tokens[token_atual]
                 raise Exception(
@@ -0,0 +1,1367 @@
+# test_compilador.py
+#
+# Testes de regressão do compilador (pytest):
+#
+#   python -m pytest -q test_compilador.py      (ou: make testes)
+#
+# Cada teste compila um programa com o main.py num subprocesso, com a
+# saída em JSON (--saida jsonl), e compara o código intermediário gerado
+# em modos diferentes de compilação. Os programas profundos passam do
+# limite de recursão do Python: as fases não podem depender da pilha de
+# chamadas para seguir o aninhamento.
+
+
+import io
+import json
+import os
+import pickle
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from alocacao import alocar_temporarios
+from dicionario_tabelall1 import dicionario
+from fluxo import construir_cfg, definicao, unidades, usos, vivacidade
+from bench_expressoes import FORMATOS, preparar, texto_expressao
+from benchmark import EIXOS
+from gerador import PADRAO, gerar_programa
+from incremental import CacheIncremental
+from instrucoes import *
+from intermediario import analisador_intermediario, gerar_expr, gerar_expr_recursiva
+from lexico import (TabelaSimbolos, Token, TokenStream, adicionarsimbolo, analisar,
+                    analisar_arquivo, casar_delimitadores, iter_tokens)
+from otimizador import NOMES_PASSES, otimizar
+from relatorio import COMPLETO, NIVEIS, RESUMO, SILENCIOSO, Relatorio
+from semantico import (CacheExpressoes, Escopo, IndiceEscopos, SemanticError,
+                       SimboloSemantico, analisador_semantico, analisador_semantico_fundido,
+                       parse_expression, parse_expression_recursiva, texto_preordem,
+                       texto_preordem_recursivo)
+from sintatico import (CODIGO_SIMBOLO, N_TERMINAIS, PRODUCOES, SIMBOLOS_LL1, TABELA_LL1,
+                       analisador_sintatico)
+
+
+PASTA = Path(__file__).resolve().parent
+
+# Aninhamento dos programas profundos (o limite de recursão padrão é 1000)
+PROFUNDIDADE = 3000
+
+
+def executar(tmp_path, texto, *opcoes):
+    """
+    Executa o main.py sobre 'texto' com as 'opcoes' dadas.
+
+    Retorna:
+        os registros JSON da saída (--saida jsonl); o teste falha, com o
+        fim da saída, se a compilação não terminou com sucesso
+    """
+    arquivo = tmp_path / "programa.conv"
+    arquivo.write_text(texto, encoding="utf-8")
+    processo = subprocess.run(
+        [sys.executable, str(PASTA / "main.py"), str(arquivo), "--saida", "jsonl", *opcoes],
+        capture_output=True, text=True, encoding="utf-8", cwd=tmp_path,
+    )
+    assert processo.returncode == 0, processo.stdout[-500:] + processo.stderr[-500:]
+    return [json.loads(linha) for linha in processo.stdout.splitlines()]
+
+
+def compilar(tmp_path, texto, *opcoes):
+    """Linhas do código intermediário gerado para 'texto' (ver executar)."""
+    for registro in executar(tmp_path, texto, *opcoes):
+        if registro["tipo"] == "codigo":
+            return registro["linhas"]
+    raise AssertionError("nenhum código intermediário na saída")
+
+
+def impressos(tmp_path, texto, *opcoes):
+    """Valores impressos ao executar 'texto' na máquina virtual (--executar)."""
+    registros = executar(tmp_path, texto, "--executar", *opcoes)
+    return [r["texto"] for r in registros if r["tipo"] == "saida"]
+
+
+def cadeia_else_if(elos):
+    """Programa com um if seguido de 'elos' else if e um else final."""
+    linhas = ["def main(){", "    int x;", "    x = 0;", "    if (x < 0) x = 0;"]
+    linhas += [f"    else if (x < {k}) x = {k};" for k in range(1, elos + 1)]
+    linhas += ["    else x = 1;", "    print x;", "    return;", "}"]
+    return "\n".join(linhas) + "\n"
+
+
+def blocos_vazios(profundidade):
+    """
+    Programa com duas funções; em main, 'profundidade' blocos { }
+    aninhados sem comandos, exceto o mais interno.
+    """
+    linhas = ["def f(){", "    int y;", "    y = 1;", "}",
+              "def main(){", "    int x;", "    x = 0;"]
+    linhas += ["{"] * profundidade
+    linhas += ["x = x + 1;", "print x;"]
+    linhas += ["}"] * profundidade
+    linhas += ["    return;", "}"]
+    return "\n".join(linhas) + "\n"
+
+
+def cadeia_sem_chaves(profundidade):
+    """
+    Programa com 'profundidade' comandos if/for encadeados sem chaves (o
+    corpo de cada um é o seguinte), terminando num if/else.
+    """
+    linhas = ["def main(){", "    int x;", "    x = 0;"]
+    for k in range(profundidade):
+        linhas.append("for (x = 0; x < 2; x = x + 1)" if k % 2 else f"if (x < {k})")
+    linhas += ["if (x < 1) print x; else print x + 1;", "    return;", "}"]
+    return "\n".join(linhas) + "\n"
+
+
+# ---------------------------------------------------------------------
+# Aninhamento profundo
+# ---------------------------------------------------------------------
+
+def test_cadeia_sem_chaves_profunda(tmp_path):
+    texto = cadeia_sem_chaves(PROFUNDIDADE)
+    codigo = compilar(tmp_path, texto)
+    assert codigo == compilar(tmp_path, texto, "--fundido")
+    assert codigo == compilar(tmp_path, texto, "--ast")
+    assert codigo.count("print x") == 1
+
+
+def test_blocos_profundos_ast(tmp_path):
+    texto = gerar_programa(1, funcoes=1, comandos=PROFUNDIDADE + 10,
+                           profundidade=PROFUNDIDADE)
+    assert compilar(tmp_path, texto, "--ast") == compilar(tmp_path, texto)
+
+
+def test_blocos_profundos_paralelo(tmp_path):
+    # Os blocos intermediários não têm comandos: só o mais interno é
+    # alcançável pelo estado semântico, e os demais apenas pela cadeia
+    # de escopos pais
+    texto = blocos_vazios(PROFUNDIDADE)
+    codigo = compilar(tmp_path, texto)
+    assert compilar(tmp_path, texto, "--paralelo", "2") == codigo
+    assert compilar(tmp_path, texto, "--fundido", "--paralelo", "2") == codigo
+
+
+VETORES = """\
+def main(){
+    int v[10];
+    int m[2][3];
+    int i;
+    i = 0;
+    v[2] = 3;
+    m[i][i + 1] = v[1];
+    for (v[0] = 1; i < 2; v[1] = i) {
+        v[i] = i + 1;
+        i = i + 1;
+    }
+    for (i = 0; i < 2; i = i + 1)
+        m[1][i] = i;
+    print i;
+    return;
+}
+"""
+
+
+def test_atribuicao_indexada_ast(tmp_path):
+    # As quádruplas não têm operações sobre vetores: nenhum dos dois
+    # caminhos gera código para v[...] = ... (nem sobrescreve 'v')
+    codigo = compilar(tmp_path, VETORES)
+    assert compilar(tmp_path, VETORES, "--ast") == codigo
+    assert not [linha for linha in codigo if linha.startswith(("v =", "m ="))]
+
+
+def test_cadeia_else_if_ast(tmp_path):
+    texto = cadeia_else_if(PROFUNDIDADE)
+    assert compilar(tmp_path, texto, "--ast") == compilar(tmp_path, texto)
+
+
+def test_cadeia_else_if_otimizada(tmp_path):
+    # Os rótulos de fim dos 'elos' ficam todos seguidos no fim da cadeia
+    texto = cadeia_else_if(PROFUNDIDADE)
+    saidas = []
+    for opcoes in ((), ("-O",)):
+        registros = executar(tmp_path, texto, "--executar", *opcoes)
+        saidas.append([r["texto"] for r in registros if r["tipo"] == "saida"])
+    assert saidas[0] == saidas[1] == ["1"]
+    otimizacoes, = [r for r in registros if r["tipo"] == "otimizacoes"]
+    assert otimizacoes["depois"] < otimizacoes["antes"]
+
+
+# ---------------------------------------------------------------------
+# Caminhos da análise semântica
+# ---------------------------------------------------------------------
+
+CHAMADA_ADIANTE = """\
+def main(){
+    int x;
+    int y;
+    int r;
+    x = 2;
+    y = 3;
+    r = f(x, y);
+    print x;
+    return;
+}
+def f(int a, int b){
+    int c;
+    c = a * b;
+    print c;
+    c = g(c);
+}
+def g(int n){
+    print n;
+}
+"""
+
+
+def test_chamada_antes_da_def(tmp_path):
+    # main chama f e f chama g antes das suas defs, nos três caminhos
+    codigo = compilar(tmp_path, CHAMADA_ADIANTE)
+    for opcoes in (("--fundido",), ("--ast",)):
+        assert compilar(tmp_path, CHAMADA_ADIANTE, *opcoes) == codigo
+        assert impressos(tmp_path, CHAMADA_ADIANTE, *opcoes) == ["6", "6", "2"]
+
+
+# ---------------------------------------------------------------------
+# Máquina virtual
+# ---------------------------------------------------------------------
+
+SOMBREAMENTO = """\
+def main(){
+    int x;
+    x = 1;
+    {
+        int x;
+        x = 2;
+        print x;
+        {
+            int x;
+            print x;
+            x = 3;
+        }
+        print x;
+    }
+    {
+        int x;
+        print x;
+    }
+    for (x = x; x < 3; x = x + 1) {
+        int x;
+        x = 10;
+    }
+    print x;
+    return;
+}
+"""
+
+
+@pytest.mark.parametrize("opcoes", [(), ("-O",), ("--fundido",), ("--ast",),
+                                    ("--paralelo", "2"), ("--alocar",)])
+def test_variaveis_sombreadas(tmp_path, opcoes):
+    # Cada declaração é uma variável distinta: as internas começam null
+    # e não alteram a externa
+    assert impressos(tmp_path, SOMBREAMENTO, *opcoes) == ["2", "null", "2", "null", "3"]
+
+
+# ---------------------------------------------------------------------
+# Otimizador
+# ---------------------------------------------------------------------
+
+def montar(linhas):
+    """
+    CodigoIntermediario com as quádruplas das 'linhas' de 3 endereços
+    (tN: temporário, LN: rótulo, número: constante inteira; o restante
+    é variável).
+    """
+    codigo = CodigoIntermediario()
+
+    def operando(nome):
+        if nome[0] == "t" and nome[1:].isdigit():
+            return codigo.operando(TEMP, nome)
+        if nome[0] == "L" and nome[1:].isdigit():
+            return codigo.operando(ROTULO, nome)
+        if nome.isdigit():
+            return codigo.operando(CONST_INT, nome)
+        return codigo.variavel(nome)
+
+    for linha in linhas:
+        partes = linha.split()
+        if linha.endswith(":"):
+            codigo.emitir(OP_ROTULO, arg1=operando(linha[:-1]))
+        elif partes[0] == "goto":
+            codigo.emitir(OP_GOTO, arg1=operando(partes[1]))
+        elif partes[0] == "if":
+            codigo.emitir(OP_SE_FALSO, arg1=operando(partes[2]), arg2=operando(partes[4]))
+        elif partes[0] == "print":
+            codigo.emitir(OP_PRINT, arg1=operando(partes[1]))
+        elif partes[0] == "return":
+            codigo.emitir(OP_RETURN)
+        elif partes[2] == "call":
+            codigo.emitir(OP_CALL, operando(partes[0]), codigo.operando(FUNCAO, partes[3]))
+        elif len(partes) == 3:
+            codigo.emitir(OP_COPIA, operando(partes[0]), operando(partes[2]))
+        else:
+            codigo.emitir(OP_BINARIO[partes[3]], operando(partes[0]),
+                          operando(partes[2]), operando(partes[4]))
+    return codigo
+
+
+def so(passe, linhas):
+    """Linhas de 'linhas' otimizadas só pelo passe 'passe'."""
+    codigo = montar(linhas)
+    otimizar(codigo, [nome for nome in NOMES_PASSES if nome != passe])
+    return codigo.linhas()
+
+
+def test_passe_constantes():
+    assert so("constantes", ["t0 = 2", "t1 = t0 * 3", "x = t1", "t2 = x + 1", "print t2"]) \
+        == ["x = 6", "print 7"]
+
+
+def test_passe_copias():
+    # a fusão 't0 = a + b; x = t0' dá uma instrução nova, e não a mesma
+    # Quadrupla em duas posições
+    codigo = montar(["t0 = a + b", "x = t0", "t1 = a * b", "y = t1", "z = x", "print z"])
+    otimizar(codigo, [nome for nome in NOMES_PASSES if nome != "copias"])
+    assert codigo.linhas() == ["x = a + b", "y = a * b", "z = x", "print x"]
+    assert len({id(q) for q in codigo}) == len(codigo)
+
+
+def test_passe_cse():
+    assert so("cse", ["t0 = a * b", "t1 = b * a", "t2 = t0 + t1", "x = a * b", "print t2"]) \
+        == ["t0 = a * b", "t2 = t0 + t0", "x = t0", "print t2"]
+
+
+def test_passe_temporarios():
+    assert so("temporarios", ["t0 = a + b", "t1 = t0 * 2", "print a"]) == ["print a"]
+
+
+def test_passe_saltos():
+    assert so("saltos", ["goto L0", "print a", "L0:", "goto L1", "L1:", "L2:", "print b"]) \
+        == ["print b"]
+
+
+LACO = ["i = 0", "L0:", "t0 = n * 2", "t1 = t0 + 1", "t2 = i < t1", "if not t2 goto L1",
+        "t3 = n * 2", "i = i + t3", "goto L0", "L1:", "return"]
+
+
+def test_passe_invariantes():
+    # Só o cabeçalho do laço sai dele; 'n * 2' do corpo só roda se a
+    # condição for verdadeira
+    assert so("invariantes", LACO) == [
+        "i = 0", "t0 = n * 2", "t1 = t0 + 1", "L0:", "t2 = i < t1", "if not t2 goto L1",
+        "t3 = n * 2", "i = i + t3", "goto L0", "L1:", "return"]
+
+
+@pytest.mark.parametrize("corpo", [["n = i"], ["t4 = call f"]])
+def test_passe_invariantes_variavel_alterada(corpo):
+    # n muda no laço (diretamente ou por uma chamada): nada sai do laço
+    laco = LACO[:6] + corpo + LACO[6:]
+    assert so("invariantes", laco) == laco
+
+
+OTIMIZAVEL = """\
+def main(){
+    int a;
+    int b;
+    int x;
+    int i;
+    a = 3;
+    b = a + 4;
+    x = a * b + a * b;
+    for (i = 0; i < b * 2; i = i + 1) {
+        if (i < 2) {
+            x = x + i;
+        } else {
+            x = x - 1;
+        }
+    }
+    print x;
+    return;
+}
+"""
+
+
+@pytest.mark.parametrize("passe", NOMES_PASSES)
+def test_desligar_passe(tmp_path, passe):
+    registros = executar(tmp_path, OTIMIZAVEL, "-O", "--desligar", passe, "--executar")
+    otimizacoes, = [r for r in registros if r["tipo"] == "otimizacoes"]
+    assert passe not in otimizacoes["removidas"]
+    assert set(otimizacoes["removidas"]) == set(NOMES_PASSES) - {passe}
+    assert [r["texto"] for r in registros if r["tipo"] == "saida"] == ["31"]
+
+
+# ---------------------------------------------------------------------
+# Vivacidade e alocação de temporários
+# ---------------------------------------------------------------------
+
+def gerar_codigo(texto):
+    """Código intermediário de 'texto', gerado no próprio processo."""
+    tokens, tabela = analisar(texto)
+    cache = CacheExpressoes()
+    silencioso = Relatorio(SILENCIOSO)
+    escopos = analisador_semantico(tokens, tabela, cache, relatorio=silencioso)
+    return analisador_intermediario(tokens, tabela, escopos, cache, relatorio=silencioso)
+
+
+def interferencias(codigo):
+    """
+    Pares de temporários vivos ao mesmo tempo: o definido por cada
+    instrução e cada um dos que estão vivos logo depois dela.
+    """
+    classes = codigo.classes
+    pares = set()
+    for _, inicio, fim in unidades(codigo):
+        blocos = construir_cfg(codigo, inicio, fim)
+        _, vivos_saida = vivacidade(codigo, blocos, TEMP)
+        for b, bloco in enumerate(blocos):
+            vivos = set(vivos_saida[b])
+            for i in range(bloco.fim - 1, bloco.inicio - 1, -1):
+                q = codigo[i]
+                d = definicao(q)
+                if d != NENHUM and classes[d] == TEMP:
+                    pares.update((d, t) for t in vivos if t != d)
+                    vivos.discard(d)
+                vivos.update(u for u in usos(q) if classes[u] == TEMP)
+    return pares
+
+
+def test_vivacidade():
+    codigo = montar(["t0 = 1", "L0:", "t1 = t0 + x", "if not t1 goto L1",
+                     "t2 = t0 * 2", "print t2", "goto L0", "L1:", "return"])
+    blocos = construir_cfg(codigo)
+    assert [(b.inicio, b.fim, b.sucessores) for b in blocos] == \
+        [(0, 1, [1]), (1, 4, [2, 3]), (4, 7, [1]), (7, 9, [])]
+    vivos_entrada, vivos_saida = vivacidade(codigo, blocos, TEMP)
+    nomes = lambda conjuntos: [sorted(codigo.nomes[t] for t in c) for c in conjuntos]
+    # t0 atravessa o laço; t1 e t2 morrem no próprio bloco
+    assert nomes(vivos_entrada) == [[], ["t0"], ["t0"], []]
+    assert nomes(vivos_saida) == [["t0"], ["t0"], ["t0"], []]
+
+
+@pytest.mark.parametrize("otimizado", [False, True])
+def test_alocacao_sem_interferencia(otimizado):
+    codigo = gerar_codigo(gerar_programa(3, funcoes=4, comandos=30) + "\n")
+    if otimizado:
+        otimizar(codigo)
+    pares = interferencias(codigo)
+    assert pares
+
+    alocado = pickle.loads(pickle.dumps(codigo))
+    antes, depois, _ = alocar_temporarios(alocado)
+    assert depois < antes
+
+    # Nome novo de cada temporário, conferido em todas as posições
+    novo = {}
+    for q, r in zip(codigo, alocado):
+        for campo in ("dest", "arg1", "arg2"):
+            t = getattr(q, campo)
+            if t != NENHUM and codigo.classes[t] == TEMP:
+                nome = alocado.nomes[getattr(r, campo)]
+                assert novo.setdefault(t, nome) == nome
+    # Temporários vivos ao mesmo tempo nunca dividem uma posição
+    assert all(novo[a] != novo[b] for a, b in pares)
+
+
+@pytest.mark.parametrize("texto", [OTIMIZAVEL, SOMBREAMENTO, CHAMADA_ADIANTE] + [
+    (PASTA / "programas" / f"programa{k}.conv").read_text(encoding="utf-8") for k in (1, 3)])
+def test_alocar_executa_igual(tmp_path, texto):
+    esperado = impressos(tmp_path, texto)
+    assert esperado
+    assert impressos(tmp_path, texto, "--alocar") == esperado
+    assert impressos(tmp_path, texto, "-O", "--alocar") == esperado
+
+
+# ---------------------------------------------------------------------
+# Motores do léxico
+# ---------------------------------------------------------------------
+
+def _resumo(tokens):
+    return [(t.tipo, t.valor, t.l, t.c) for t in tokens]
+
+
+def _lexico(analise):
+    """Tokens e tabela de símbolos de analise(), ou a mensagem do erro."""
+    try:
+        tokens, tabela = analise()
+    except Exception as erro:
+        return str(erro)
+    return _resumo(tokens), [(nome, list(posicoes)) for nome, posicoes in tabela]
+
+
+# Lexemas fora dos casos rápidos do motor regex vão para determinar_token
+LEXEMAS = [
+    "x1_a = 1.5 ; y=x1_a<=2!=3",
+    "q==r>=s<t>u!=v;{[()]} % - * / ,",
+    "int é; é = _x9;",
+    "x = 07;",
+    "a = 12abc;",
+    "b = 1.5.3;",
+    "c = 3.;",
+    "d = .5;",
+    "e = a$b;",
+    "x = 1e5;",
+    "x = 1 !! 2;",
+    's = "a b";\nt = "";',
+    's = "várias\nlinhas";\nprint s;',
+    "w=x\ny = 2;",
+    "abc\n",
+]
+
+
+@pytest.mark.parametrize("texto", LEXEMAS + [
+    (PASTA / "programas" / f"programa{k}.conv").read_text(encoding="utf-8") for k in (1, 2, 3)])
+def test_motores_lexicos_equivalentes(texto):
+    esperado = _lexico(lambda: analisar(texto, motor="afd"))
+    assert _lexico(lambda: analisar(texto, motor="regex")) == esperado
+    assert _lexico(lambda: analisar(texto, motor="regex", compacto=True)) == esperado
+    for tamanho in (1, 2, 7, 4096):
+        assert _lexico(lambda: analisar_arquivo(io.StringIO(texto),
+                                                tamanho_bloco=tamanho)) == esperado
+
+
+# ---------------------------------------------------------------------
+# Tabela de símbolos e TokenStream
+# ---------------------------------------------------------------------
+
+def test_tabela_simbolos_internada():
+    tokens, tabela = analisar("int a;\na = b + a;\nb = a;")
+    # um índice por lexema, na ordem da primeira ocorrência
+    assert [t.valor for t in tokens if t.tipo == "ident"] == [0, 0, 1, 0, 1, 0]
+    assert tabela.indices == {"a": 0, "b": 1}
+    assert tabela.indice("b") == 1 and tabela.indice("c") is None
+    # cada entrada guarda as posições (deslocamentos) das ocorrências, em
+    # ordem; linha e coluna só aparecem na impressão
+    assert [(lexema, list(posicoes)) for lexema, posicoes in tabela] == \
+        [("a", [4, 7, 15, 22]), ("b", [11, 18])]
+    assert tabela.ocorrencias(0) == 4
+    assert repr(tabela) == "[['a', (1, 5), (2, 1), (2, 9), (3, 5)], ['b', (2, 5), (3, 1)]]"
+
+    assert adicionarsimbolo("b", 30, tabela) == 1
+    assert adicionarsimbolo("c", 31, tabela) == 2
+    assert list(tabela[1][1]) == [11, 18, 30] and list(tabela[2][1]) == [31]
+
+
+def test_token_stream():
+    lista, _ = analisar('def f(){ float x; x = 1.5; print "oi"; }\nint y;')
+    tokens = TokenStream(lista)
+    assert len(tokens) == len(lista)
+    assert _resumo(tokens) == _resumo(lista)
+    assert [tokens.tipo(i) for i in range(len(tokens))] == [t.tipo for t in lista]
+    assert _resumo([tokens[-1]]) == _resumo([lista[-1]])
+    # só os tokens com valor ocupam a tabela lateral
+    assert tokens.valores == [t.valor for t in lista if t.valor is not None]
+    assert list(tokens.refs).count(-1) == sum(t.valor is None for t in lista)
+
+    fatia = tokens[3:9]
+    assert isinstance(fatia, TokenStream)
+    assert _resumo(fatia) == _resumo(lista[3:9])
+    assert _resumo(pickle.loads(pickle.dumps(tokens))) == _resumo(lista)
+
+    # tokens criados fora do léxico não têm posição
+    tokens.append(Token("$", None, -1))
+    assert (tokens[-1].tipo, tokens[-1].l, tokens[-1].c) == ("$", 0, 0)
+
+    compactos, _ = analisar(' x = "a b";\n', compacto=True)
+    assert isinstance(compactos, TokenStream)
+    assert _resumo(compactos) == _resumo(analisar(' x = "a b";\n')[0])
+
+
+# ---------------------------------------------------------------------
+# Tabela LL(1) compilada
+# ---------------------------------------------------------------------
+
+def _analise_por_dicionario(tokens):
+    """Análise LL(1) direto sobre o dicionário, como antes da compilação."""
+    tabela = dicionario()
+    tokens = list(tokens) + [Token("$", "None", -1)]
+    pilha = ["PROGRAM"]
+    atual = 0
+    while pilha:
+        topo = pilha.pop()
+        tok = tokens[atual]
+        if topo not in tabela:
+            if topo != tok.tipo:
+                return f"esperado '{topo}', encontrado '{tok.tipo}' ({tok.l}, {tok.c})"
+            atual += 1
+        elif tok.tipo in tabela[topo]:
+            pilha.extend(s for s in reversed(tabela[topo][tok.tipo]) if s != "&")
+        else:
+            return f"token inesperado '{tok.tipo}' ({tok.l}, {tok.c})"
+    if tokens[atual].tipo != "$":
+        return "após fim da análise"
+    return "ok"
+
+
+def _analise_compilada(tokens):
+    try:
+        analisador_sintatico(tokens, relatorio=Relatorio(SILENCIOSO))
+    except Exception as erro:
+        mensagem = str(erro)
+        tok = mensagem.split("linha ")[1]
+        linha, coluna = tok.split(", coluna ")
+        coluna, detalhe = coluna.split(": ", 1)
+        if "após fim" in detalhe:
+            return "após fim da análise"
+        detalhe = detalhe.rstrip(".")
+        return f"{detalhe} ({linha}, {coluna})"
+    return "ok"
+
+
+def test_tabela_compilada_igual_ao_dicionario():
+    tabela = dicionario()
+    for nt, linha in tabela.items():
+        compilada = TABELA_LL1[CODIGO_SIMBOLO[nt] - N_TERMINAIS]
+        assert CODIGO_SIMBOLO[nt] >= N_TERMINAIS
+        for codigo in range(N_TERMINAIS):
+            terminal = SIMBOLOS_LL1[codigo]
+            if terminal not in linha:
+                assert compilada[codigo] == -1
+                continue
+            producao = [s for s in reversed(linha[terminal]) if s != "&"]
+            assert [SIMBOLOS_LL1[c] for c in PRODUCOES[compilada[codigo]]] == producao
+
+
+PROGRAMAS_SINTATICOS = [
+    (PASTA / "programas" / f"programa{k}.conv").read_text(encoding="utf-8") for k in (1, 2, 3)
+] + [cadeia_else_if(3), VETORES, CHAMADA_ADIANTE, SOMBREAMENTO, OTIMIZAVEL]
+
+
+@pytest.mark.parametrize("texto", PROGRAMAS_SINTATICOS)
+def test_analise_compilada_igual_ao_dicionario(texto):
+    tokens, _ = analisar(texto)
+    assert _analise_compilada(list(tokens)) == _analise_por_dicionario(tokens) == "ok"
+    assert _analise_compilada(TokenStream(tokens)) == "ok"
+    # sem um token (ou com um token repetido), os dois erram no mesmo lugar
+    for i in range(0, len(tokens), 3):
+        sem = tokens[:i] + tokens[i + 1:]
+        assert _analise_compilada(list(sem)) == _analise_por_dicionario(sem)
+        repetido = tokens[:i] + [tokens[i]] + tokens[i:]
+        assert _analise_compilada(TokenStream(repetido)) == _analise_por_dicionario(repetido)
+
+
+# ---------------------------------------------------------------------
+# Expressões com limite explícito (fim)
+# ---------------------------------------------------------------------
+
+PARSERS_EXPRESSAO = [parse_expression, parse_expression_recursiva]
+
+
+def expressao_delimitada(texto):
+    """Tokens, tabela e escopo de 'texto', e a posição logo após o primeiro '='."""
+    tokens, tabela = analisar(texto)
+    escopos = analisador_semantico(tokens, tabela, relatorio=Relatorio(SILENCIOSO))
+    inicio = [t.tipo for t in tokens].index("=") + 1
+    return tokens, tabela, escopos[inicio], inicio
+
+
+@pytest.mark.parametrize("parse", PARSERS_EXPRESSAO)
+def test_expressao_termina_no_fim(parse):
+    tokens, tabela, escopo, inicio = expressao_delimitada(
+        "def main(){ int a; a = a + 2 * 3; print a; }")
+    fim = [t.tipo for t in tokens].index(";", inicio)
+    no, j = parse(tokens, inicio, tabela, escopo, fim)
+    assert j == fim
+    assert texto_preordem(no).split() == ["+", "a", "*", "2", "3"]
+    # sem 'fim' a análise para no ';', o primeiro token fora da expressão
+    assert texto_preordem(parse(tokens, inicio, tabela, escopo)[0]) == texto_preordem(no)
+
+
+@pytest.mark.parametrize("parse", PARSERS_EXPRESSAO)
+def test_expressao_continua_depois_do_fim(parse):
+    tokens, tabela, escopo, inicio = expressao_delimitada(
+        "def main(){ int a; a = a + 2 * 3 < 10; print a; }")
+    tipos = [t.tipo for t in tokens]
+    # 'fim' antes do operador: a expressão é só o que vem antes dele
+    for corte, esperado in ((tipos.index("*"), ["+", "a", "2"]),
+                            (tipos.index("<"), ["+", "a", "*", "2", "3"]),
+                            (inicio + 1, ["a"])):
+        no, j = parse(tokens, inicio, tabela, escopo, corte)
+        assert j == corte
+        assert texto_preordem(no).split() == esperado
+
+
+@pytest.mark.parametrize("parse", PARSERS_EXPRESSAO)
+@pytest.mark.parametrize("texto, ultimo", [
+    ("def main(){ int a; a = a + 2; }", "+"),     # operador binário sem o operando
+    ("def main(){ int a; a = -a; }", "-"),        # unário sem o operando
+    ("def main(){ int a; a = (a); }", "("),       # parêntese aberto no fim
+    ("def main(){ int a; a = a; }", "="),         # expressão vazia
+])
+def test_fim_inesperado_da_expressao(parse, texto, ultimo):
+    tokens, tabela, escopo, inicio = expressao_delimitada(texto)
+    fim = [t.tipo for t in tokens].index(ultimo, inicio - 1) + 1
+    tok = tokens[fim - 1]
+    with pytest.raises(SemanticError) as erro:
+        parse(tokens, inicio, tabela, escopo, fim)
+    assert str(erro.value) == f"Fim inesperado da expressão (linha {tok.l}, coluna {tok.c})"
+
+
+# ---------------------------------------------------------------------
+# Expressões profundas e largas (pilha explícita x recursão)
+# ---------------------------------------------------------------------
+
+def expressao_pelas_duas_versoes(formato, tamanho, parse, gerar, preordem):
+    """
+    Árvore em pré-ordem (pelas duas funções de pré-ordem), código e
+    operando do resultado de uma expressão de bench_expressoes, analisada
+    com 'parse' e gerada com 'gerar'.
+    """
+    tokens, tabela, escopo = preparar(texto_expressao(formato, tamanho))
+    fim = len(tokens) - 1
+    no, j = parse(tokens, 0, tabela, escopo, fim)
+    assert j == fim
+    codigo = CodigoIntermediario()
+    resultado = gerar(no, codigo)
+    return preordem(no), codigo.linhas(), codigo.nomes[resultado]
+
+
+def com_recursao_ampliada(funcao):
+    """Resultado de funcao() numa thread com pilha grande e limite de recursão alto."""
+    resultado = []
+    limite = sys.getrecursionlimit()
+    tamanho_pilha = threading.stack_size(256 * 1024 * 1024)
+    try:
+        sys.setrecursionlimit(100 * PROFUNDIDADE)
+        thread = threading.Thread(target=lambda: resultado.append(funcao()))
+        thread.start()
+        thread.join()
+    finally:
+        sys.setrecursionlimit(limite)
+        threading.stack_size(tamanho_pilha)
+    assert resultado, "a versão recursiva não terminou"
+    return resultado[0]
+
+
+@pytest.mark.parametrize("formato", sorted(FORMATOS))
+@pytest.mark.parametrize("tamanho", [1, 2, 10, 50])
+def test_expressoes_iterativas_iguais_as_recursivas(formato, tamanho):
+    iterativa = expressao_pelas_duas_versoes(formato, tamanho, parse_expression,
+                                             gerar_expr, texto_preordem)
+    recursiva = expressao_pelas_duas_versoes(formato, tamanho, parse_expression_recursiva,
+                                             gerar_expr_recursiva, texto_preordem_recursivo)
+    assert iterativa == recursiva
+
+
+@pytest.mark.parametrize("formato", sorted(FORMATOS))
+def test_expressoes_alem_do_limite_de_recursao(formato):
+    recursiva = (formato, PROFUNDIDADE, parse_expression_recursiva,
+                 gerar_expr_recursiva, texto_preordem_recursivo)
+    # com o limite padrão a versão recursiva não chega ao fim
+    with pytest.raises(RecursionError):
+        expressao_pelas_duas_versoes(*recursiva)
+    iterativa = expressao_pelas_duas_versoes(formato, PROFUNDIDADE, parse_expression,
+                                             gerar_expr, texto_preordem)
+    assert iterativa == com_recursao_ampliada(lambda: expressao_pelas_duas_versoes(*recursiva))
+
+
+# ---------------------------------------------------------------------
+# Cache de expressões
+# ---------------------------------------------------------------------
+
+@pytest.mark.parametrize("texto", PROGRAMAS_SINTATICOS)
+def test_cache_expressoes_compartilhado(texto):
+    tokens, tabela = analisar(texto)
+    cache = CacheExpressoes()
+    silencioso = Relatorio(SILENCIOSO)
+    escopos = analisador_semantico(tokens, tabela, cache, relatorio=silencioso)
+    do_semantico = dict(cache.arvores)
+    assert cache.acertos == 0 and cache.falhas == len(do_semantico)
+
+    codigo = analisador_intermediario(tokens, tabela, escopos, cache, relatorio=silencioso)
+    # o gerador reaproveita as árvores do semântico: só falha nas
+    # expressões que o semântico não analisou, e não as substitui
+    assert cache.acertos > 0
+    assert cache.falhas - len(do_semantico) == len(cache.arvores) - len(do_semantico)
+    assert all(cache.arvores[k] is entrada for k, entrada in do_semantico.items())
+
+    # e gera o mesmo código que analisando cada expressão de novo
+    tokens, tabela = analisar(texto)
+    escopos = analisador_semantico(tokens, tabela, relatorio=silencioso)
+    refeito = analisador_intermediario(tokens, tabela, escopos, CacheExpressoes(),
+                                       relatorio=silencioso)
+    assert refeito.linhas() == codigo.linhas()
+
+
+def test_cache_expressoes_escopo_e_limite():
+    tokens, tabela = analisar("def main(){ int a; a = a * 2 + 1; print a; }")
+    cache = CacheExpressoes()
+    escopos = analisador_semantico(tokens, tabela, cache, relatorio=Relatorio(SILENCIOSO))
+    inicio = [t.tipo for t in tokens].index("=") + 1
+    no, escopo, fim = cache.arvores[inicio]
+    assert escopo is escopos[inicio]
+
+    assert cache.analisar(tokens, inicio, tabela, escopo, fim) == (no, fim)
+    assert (cache.acertos, cache.falhas) == (1, len(cache.arvores))
+
+    # outro escopo ou um limite antes do fim da expressão: analisa de novo
+    falhas = cache.falhas
+    outro = Escopo("outro", escopo)
+    assert cache.analisar(tokens, inicio, tabela, outro, fim)[0] is not no
+    parcial, j = cache.analisar(tokens, inicio, tabela, outro, fim - 2)
+    assert j == fim - 2 and cache.falhas == falhas + 2
+    assert cache.arvores[inicio] == (parcial, outro, j)
+
+    # árvores vindas de outra compilação valem em qualquer escopo
+    copia = CacheExpressoes()
+    copia.preencher(10, cache.extrair([(0, len(tokens))])[0])
+    assert copia.analisar(tokens, inicio + 10, tabela, escopo, fim + 10) == (parcial, j + 10)
+    assert (copia.acertos, copia.falhas) == (1, 0)
+
+
+# ---------------------------------------------------------------------
+# Índice de delimitadores
+# ---------------------------------------------------------------------
+
+ABERTURA = {")": "(", "]": "[", "}": "{"}
+
+
+@pytest.mark.parametrize("texto", PROGRAMAS_SINTATICOS + [
+    "def f(int a){ { ( ( a ) ) } { } if ((a) < (1)) { print ((a)); } }",
+    "def main(){ " + "{ ( " * 50 + "1" + " ) }" * 50 + " }",
+])
+def test_delimitadores_simetricos(texto):
+    tokens, _ = analisar(texto)
+    pares = casar_delimitadores(tokens)
+    assert list(casar_delimitadores(TokenStream(tokens))) == list(pares)
+    for i, tok in enumerate(tokens):
+        j = pares[i]
+        if tok.tipo in ABERTURA.values():
+            assert j > i and pares[j] == i
+            assert ABERTURA[tokens[j].tipo] == tok.tipo
+        elif tok.tipo in ABERTURA:
+            assert j < i and pares[j] == i
+        else:
+            assert j == -1
+    # num programa bem formado todo delimitador tem par
+    assert all(pares[i] >= 0 for i, tok in enumerate(tokens)
+               if tok.tipo in "()[]{}")
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("def main(){ ( }", [-1, -1, 3, 2, -1, -1, -1]),
+    (") ( ]", [-1, -1, -1]),
+    ("{ ( ) [", [-1, 2, 1, -1]),
+    ("( { ) } )", [4, 3, -1, 1, 0]),
+    ("( ( ) ) )", [3, 2, 1, 0, -1]),
+])
+def test_delimitadores_sem_par(texto, esperado):
+    tokens, _ = analisar(texto)
+    assert list(casar_delimitadores(tokens)) == esperado
+
+
+# ---------------------------------------------------------------------
+# Cache incremental
+# ---------------------------------------------------------------------
+
+def com_cache(tmp_path, texto):
+    """Código gerado com --cache e as estatísticas do cache incremental."""
+    registros = executar(tmp_path, texto, "--cache", str(tmp_path / "cache"))
+    codigo = next(r["linhas"] for r in registros if r["tipo"] == "codigo")
+    estatisticas = next(r for r in registros if r["tipo"] == "cache_incremental")
+    return codigo, tuple(estatisticas[campo] for campo in ("acertos", "falhas", "gravadas"))
+
+
+def test_cache_incremental_acertos_e_invalidacao(tmp_path):
+    # três defs e o trecho final fora de funções
+    esperado = compilar(tmp_path, CHAMADA_ADIANTE)
+    assert com_cache(tmp_path, CHAMADA_ADIANTE) == (esperado, (0, 4, 4))
+    assert com_cache(tmp_path, CHAMADA_ADIANTE) == (esperado, (4, 0, 0))
+
+    # mudar o corpo de g só invalida g
+    alterado = CHAMADA_ADIANTE.replace("print n;", "print n;\n    print n;")
+    assert com_cache(tmp_path, alterado) == (compilar(tmp_path, alterado), (3, 1, 1))
+
+    # mudar só linhas e colunas não invalida nada
+    movido = "\n\n" + alterado.replace("    ", "\t")
+    assert com_cache(tmp_path, movido) == (compilar(tmp_path, movido), (4, 0, 0))
+
+    # mudar a assinatura de uma função invalida todas as unidades
+    assinatura = movido.replace("def g(int n)", "def g(float n)")
+    assert com_cache(tmp_path, assinatura)[1] == (0, 4, 4)
+
+
+def test_cache_incremental_limpeza(tmp_path):
+    cache = CacheIncremental(tmp_path, max_bytes=250, max_idade=1000)
+    agora = time.time()
+    for nome, idade in (("velha", 2000), ("a", 30), ("b", 20), ("c", 10)):
+        arquivo = tmp_path / f"{nome}.pkl"
+        arquivo.write_bytes(b"x" * 100)
+        os.utime(arquivo, (agora - idade, agora - idade))
+    (tmp_path / "outro.txt").write_bytes(b"x" * 1000)
+
+    # a velha sai pela idade; das restantes, a usada há mais tempo, até
+    # o diretório caber em max_bytes (os arquivos que não são entradas
+    # não contam)
+    cache.limpar()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["b.pkl", "c.pkl", "outro.txt"]
+    assert cache.removidas == 2
+
+
+# ---------------------------------------------------------------------
+# Perfil (--perfil)
+# ---------------------------------------------------------------------
+
+CONTADORES_PERFIL = {
+    "tokens", "sintatico_passos", "sintatico_pilha_max", "escopos_criados",
+    "procuras", "procuras_nao_encontradas", "procuras_profundidade_total",
+    "procuras_profundidade_max", "expressoes_cache_acertos", "expressoes_cache_falhas",
+    "temporarios", "rotulos", "instrucoes", "instrucoes_otimizadas",
+}
+
+
+def verificar_perfil(dados, fases):
+    assert [f["nome"] for f in dados["fases"]] == fases
+    for fase in dados["fases"]:
+        assert set(fase) == {"nome", "tempo", "cpu", "memoria_pico"}
+        assert fase["tempo"] >= 0 and fase["cpu"] >= 0 and fase["memoria_pico"] > 0
+    assert set(dados["total"]) == {"tempo", "cpu", "memoria_pico"}
+    assert dados["total"]["tempo"] == pytest.approx(sum(f["tempo"] for f in dados["fases"]))
+    assert dados["total"]["memoria_pico"] == max(f["memoria_pico"] for f in dados["fases"])
+    contadores = dados["contadores"]
+    assert set(contadores) == CONTADORES_PERFIL
+    assert list(contadores) == sorted(contadores)
+    assert all(isinstance(valor, int) and valor >= 0 for valor in contadores.values())
+
+
+def test_perfil_json(tmp_path):
+    executar(tmp_path, OTIMIZAVEL, "-O", "--executar", "--perfil", "perfil.json")
+    dados = json.loads((tmp_path / "perfil.json").read_text(encoding="utf-8"))
+    assert dados["arquivo"].endswith("programa.conv")
+    verificar_perfil(dados, ["lexico", "impressao", "sintatico", "semantico",
+                             "intermediario", "otimizador", "execucao"])
+
+    tokens, _ = analisar(OTIMIZAVEL)
+    contadores = dados["contadores"]
+    assert contadores["tokens"] == len(tokens)
+    assert contadores["instrucoes"] == len(gerar_codigo(OTIMIZAVEL))
+    assert contadores["instrucoes_otimizadas"] < contadores["instrucoes"]
+    assert contadores["procuras_profundidade_max"] <= contadores["escopos_criados"]
+
+
+def test_perfil_no_relatorio_do_lote(tmp_path):
+    pasta = tmp_path / "lote"
+    pasta.mkdir()
+    (pasta / "a.conv").write_text(OTIMIZAVEL, encoding="utf-8")
+    processo = subprocess.run(
+        [sys.executable, str(PASTA / "main.py"), "--batch", str(pasta), "-j", "1", "-O",
+         "--perfil", "-", "--relatorio", str(tmp_path / "lote.json")],
+        capture_output=True, text=True, encoding="utf-8",
+    )
+    assert processo.returncode == 0, processo.stdout[-500:] + processo.stderr[-500:]
+    relatorio = json.loads((tmp_path / "lote.json").read_text(encoding="utf-8"))
+    (resultado,) = relatorio["resultados"]
+    verificar_perfil(resultado["perfil"], ["lexico", "impressao", "sintatico",
+                                           "semantico", "intermediario", "otimizador"])
+
+
+# ---------------------------------------------------------------------
+# Gerador de programas e benchmark
+# ---------------------------------------------------------------------
+
+def test_gerador_deterministico():
+    eixos = {"funcoes": 3, "comandos": 15, "profundidade": 3}
+    texto = gerar_programa(7, **eixos)
+    assert gerar_programa(7, **eixos) == texto
+    assert gerar_programa(8, **eixos) != texto
+    # a linha de comando do gerador imprime o mesmo programa
+    processo = subprocess.run(
+        [sys.executable, str(PASTA / "gerador.py"), "--semente", "7", "--funcoes", "3",
+         "--comandos", "15", "--profundidade", "3"],
+        capture_output=True, text=True, encoding="utf-8", check=True,
+    )
+    assert processo.stdout == texto
+    with pytest.raises(ValueError):
+        gerar_programa(7, linhas=10)
+
+
+@pytest.mark.parametrize("eixo", sorted(PADRAO))
+def test_gerador_compila_em_todos_os_modos(tmp_path, eixo):
+    # o menor tamanho que o benchmark percorre no eixo, com os outros pequenos
+    eixos = {"funcoes": 2, "comandos": 10, eixo: EIXOS[eixo][0]}
+    texto = gerar_programa(11, **eixos)
+    codigo = compilar(tmp_path, texto)
+    assert codigo
+    assert compilar(tmp_path, texto, "--ast") == codigo
+    assert compilar(tmp_path, texto, "--fundido") == codigo
+
+
+def test_benchmark_rejeita_eixo_desconhecido():
+    processo = subprocess.run(
+        [sys.executable, str(PASTA / "benchmark.py"), "--eixo", "linhas"],
+        capture_output=True, text=True, encoding="utf-8",
+    )
+    assert processo.returncode == 2
+    assert "--eixo" in processo.stderr and "'linhas'" in processo.stderr
+
+
+# ---------------------------------------------------------------------
+# Relatório e verbosidade
+# ---------------------------------------------------------------------
+
+def registrar_exemplos(relatorio):
+    relatorio.registrar(RESUMO, "mensagem", "ok")
+    relatorio.registrar(COMPLETO, "codigo", "t0 = 1", linhas=["t0 = 1"])
+    relatorio.registrar(SILENCIOSO, "erro", "nunca some")
+
+
+@pytest.mark.parametrize("nivel, esperado", [
+    (SILENCIOSO, ["nunca some"]),
+    (RESUMO, ["ok", "nunca some"]),
+    (COMPLETO, ["ok", "t0 = 1", "nunca some"]),
+])
+def test_relatorio_filtra_por_nivel(nivel, esperado):
+    destino = io.StringIO()
+    relatorio = Relatorio(nivel, destino=destino)
+    assert [relatorio.ativo(n) for n in (RESUMO, COMPLETO)] == [nivel >= RESUMO,
+                                                                nivel >= COMPLETO]
+    registrar_exemplos(relatorio)
+    # acumula até descarregar
+    assert destino.getvalue() == ""
+    relatorio.descarregar()
+    assert destino.getvalue().splitlines() == esperado
+
+    destino = io.StringIO()
+    relatorio = Relatorio(nivel, "jsonl", destino, imediato=True)
+    registrar_exemplos(relatorio)
+    registros = [json.loads(linha) for linha in destino.getvalue().splitlines()]
+    assert [r.get("texto") or r["linhas"][0] for r in registros] == esperado
+    assert all(NIVEIS[r["nivel"]] <= nivel for r in registros)
+
+
+def test_relatorio_sem_saida():
+    destino = io.StringIO()
+    relatorio = Relatorio(COMPLETO, "nenhuma", destino)
+    assert relatorio.nivel == SILENCIOSO
+    relatorio.registrar(RESUMO, "mensagem", "ok")
+    relatorio.descarregar()
+    assert destino.getvalue() == ""
+
+
+def test_verbosidade_na_linha_de_comando(tmp_path):
+    tipos = {}
+    for nome, nivel in NIVEIS.items():
+        registros = executar(tmp_path, OTIMIZAVEL, "-O", "--executar", "--verbosidade", nome)
+        assert all(NIVEIS[r["nivel"]] <= nivel for r in registros)
+        tipos[nome] = {r["tipo"] for r in registros}
+    assert tipos["silencioso"] == set()
+    assert {"saida", "otimizacoes"} <= tipos["resumo"]
+    assert "codigo" not in tipos["resumo"] and "codigo" in tipos["completo"]
+    assert tipos["resumo"] < tipos["completo"]
+    assert executar(tmp_path, OTIMIZAVEL, "-q") == []
+
+
+# ---------------------------------------------------------------------
+# Resolução de identificadores
+# ---------------------------------------------------------------------
+
+def declarar(escopo, indice, nome):
+    simbolo = SimboloSemantico(nome, "int", "var", escopo, None, escopo.qualificar(nome))
+    escopo.declarar(indice, simbolo)
+    return simbolo
+
+
+def test_escopo_guarda_procuras():
+    globais = Escopo("global", tipo="global")
+    funcao = Escopo("func_f", globais, "func")
+    bloco = Escopo("bloco", funcao)
+    interno = Escopo("interno", bloco)
+    x = declarar(globais, 0, "x")
+
+    assert interno.percorrer(0) == (x, 4)
+    # o resultado ficou guardado em todo o caminho
+    assert interno.percorrer(0) == (x, 1)
+    assert Escopo("irmao", bloco).percorrer(0) == (x, 2)
+    assert interno.percorrer(1) == (None, 4)
+    assert interno.percorrer(1) == (None, 1)
+
+    # uma nova declaração invalida o que foi guardado
+    x_funcao = declarar(funcao, 0, "x")
+    assert interno.percorrer(0) == (x_funcao, 3)
+    assert globais.procura(0) is x
+    y = declarar(globais, 1, "y")
+    assert interno.procura(1) is y
+
+    # nomes no código: x na primeira declaração da unidade, x#1 depois
+    assert (x.operando, x_funcao.operando) == ("x", "x")
+    assert declarar(interno, 0, "x").operando == "x#1"
+    assert declarar(bloco, 0, "x").operando == "x#2"
+
+
+def test_escopo_liga_token_ao_simbolo():
+    tokens, tabela = analisar("x = x + y;")
+    globais = Escopo("global", tipo="global")
+    bloco = Escopo("bloco", globais)
+    x = declarar(globais, tabela.indice("x"), "x")
+
+    assert bloco.resolver(tokens, 2) is x
+    assert globais.resolucao.ligacoes == {2: (bloco, x)}
+    # a ligação vale no mesmo escopo, mesmo depois de outra declaração
+    x_bloco = declarar(bloco, tabela.indice("x"), "x")
+    assert bloco.resolver(tokens, 2) is x
+    assert Escopo("outro", bloco).resolver(tokens, 2) is x_bloco
+    # identificadores não declarados não são ligados
+    assert bloco.resolver(tokens, 4) is None
+    assert 4 not in globais.resolucao.ligacoes
+
+
+def procura_simples(escopo, indice):
+    while escopo is not None:
+        if escopo.contem(indice):
+            return escopo.simbolos[indice]
+        escopo = escopo.pai
+    return None
+
+
+@pytest.mark.parametrize("texto", [SOMBREAMENTO, CHAMADA_ADIANTE, VETORES, OTIMIZAVEL,
+                                   cadeia_else_if(3)])
+def test_ligacoes_do_semantico(texto):
+    tokens, tabela = analisar(texto)
+    escopos = analisador_semantico(tokens, tabela, relatorio=Relatorio(SILENCIOSO))
+    ligacoes = escopos.padrao.resolucao.ligacoes
+    usos_ident = [p for p in ligacoes if tokens[p].tipo == "ident"]
+    assert usos_ident and len(usos_ident) == len(ligacoes)
+    for posicao, (escopo, simbolo) in ligacoes.items():
+        # o mesmo símbolo de uma procura sem nada guardado
+        assert simbolo is procura_simples(escopo, tokens[posicao].valor)
+        assert simbolo.nome == tabela[tokens[posicao].valor][0]
+
+
+def test_ligacoes_sombreadas():
+    tokens, tabela = analisar(SOMBREAMENTO)
+    escopos = analisador_semantico(tokens, tabela, relatorio=Relatorio(SILENCIOSO))
+    ligacoes = escopos.padrao.resolucao.ligacoes
+    # (linha, operando) de cada uso ligado, na ordem do programa
+    assert [(tokens[p].l, ligacoes[p][1].operando) for p in sorted(ligacoes)] == [
+        (3, "x"), (6, "x#1"), (7, "x#1"), (10, "x#2"), (11, "x#2"), (13, "x#1"),
+        (17, "x#3"), (19, "x"), (19, "x"), (19, "x"), (21, "x#4"), (23, "x"),
+    ]
+
+
+# ---------------------------------------------------------------------
+# Índice de escopos por posição
+# ---------------------------------------------------------------------
+
+def test_indice_escopos():
+    globais = Escopo("global", tipo="global")
+    funcao = Escopo("func_f", globais, "func")
+    bloco = Escopo("bloco", funcao)
+    indice = IndiceEscopos(globais)
+    indice.registrar(0, 3, globais)
+    indice.registrar(5, 8, funcao)
+    indice.registrar(8, 8, bloco)       # trecho vazio: ignorado
+    indice.registrar(8, 10, bloco)
+    indice.registrar(10, 12, funcao)
+
+    assert [indice[i] for i in range(13)] == \
+        [globais] * 3 + [None] * 2 + [funcao] * 3 + [bloco] * 2 + [funcao] * 2 + [None]
+    # o intervalo entre dois trechos conta como um trecho sem escopo
+    assert len(indice) == 5 and indice.fim == 12
+    assert indice.padrao is globais
+    assert indice.trecho(1) == (globais, 3)
+    assert indice.trecho(3) == (None, 5)
+    assert indice.trecho(9) == (bloco, 10)
+    assert indice.trecho(11) == (funcao, 12)
+    assert indice.trecho(40) == (None, 41)
+
+
+@pytest.mark.parametrize("analise", [analisador_semantico, analisador_semantico_fundido])
+@pytest.mark.parametrize("texto", [SOMBREAMENTO, CHAMADA_ADIANTE, VETORES,
+                                   cadeia_else_if(3), blocos_vazios(50)])
+def test_indice_escopos_trechos(analise, texto):
+    tokens, tabela = analisar(texto)
+    escopos = analise(tokens, tabela, relatorio=Relatorio(SILENCIOSO))
+    assert list(escopos.inicios) == sorted(set(escopos.inicios))
+
+    # percorrer por trechos dá o mesmo escopo que consultar cada posição
+    por_trecho = []
+    i = 0
+    while i < len(tokens):
+        escopo, fim = escopos.trecho(i)
+        assert fim > i
+        por_trecho.extend([escopo] * (min(fim, len(tokens)) - i))
+        i = fim
+    assert por_trecho == [escopos[i] for i in range(len(tokens))]
+
+    # o corpo de cada bloco é analisado no escopo do bloco
+    for i, tok in enumerate(tokens):
+        if tok.tipo == "{" and escopos[i + 1] is not None and tokens[i - 1].tipo != ")":
+            assert escopos[i + 1].tipo == "bloco"
+
+
+# ---------------------------------------------------------------------
+# Léxico em blocos
+# ---------------------------------------------------------------------
+
+
+def test_tokens_longos_em_blocos_pequenos():
+    texto = ("int " + "a" * 500 + ";\n" + " " * 300 + "x = " + "9" * 400
+             + ";\nprint \"" + "s\n" * 200 + "\";\n")
+    esperado, _ = analisar(texto)
+    for tamanho in (1, 3, 16):
+        tokens, _ = analisar_arquivo(io.StringIO(texto), tamanho_bloco=tamanho)
+        assert _resumo(tokens) == _resumo(esperado)
+
+
+def test_string_nao_terminada_em_blocos_pequenos():
+    inicio = "def main(){\n    print 1;\n    print "
+    texto = inicio + '"nunca fecha;\n' + "    x = 1;\n" * 200 + "}\n"
+    with pytest.raises(Exception) as esperado:
+        analisar(texto)
+    assert "String não terminada na linha 3" in str(esperado.value)
+
+    antes, _ = analisar(inicio)
+    gerador = iter_tokens(io.StringIO(texto), TabelaSimbolos(), tamanho_bloco=8)
+    lidos = []
+    with pytest.raises(Exception) as erro:
+        for token in gerador:
+            lidos.append(token)
+    assert str(erro.value) == str(esperado.value)
+    # os tokens anteriores à string saem antes do erro
+    assert _resumo(lidos) == _resumo(antes)
+
+
+# ---------------------------------------------------------------------
+# Linha e coluna calculadas das posições (IndiceLinhas)
+# ---------------------------------------------------------------------
+
+# (texto, token conferido, posição dele, (linha, coluna)) e o que o léxico
+# original, que contava linha e coluna durante a varredura, dava para o
+# texto: (tipo, linha, coluna) de cada token e a tabela de símbolos impressa
+LINHAS_ORIGINAIS = {
+    # posição 0
+    "inicio": ("int a;\nb = 1;\nprint b", 0, 0, (1, 1),
+               [("int", 1, 1), ("ident", 1, 5), (";", 1, 6), ("ident", 2, 1), ("=", 2, 3),
+                ("const_inteiro", 2, 5), (";", 2, 6), ("print", 3, 1), ("ident", 3, 7)],
+               "[['a', (1, 5)], ['b', (2, 1), (3, 7)]]"),
+    # a string termina no fim da linha: a posição do token é o próprio '\n'
+    "quebra": ('a = "ab"\nprint a;', 2, 8, (1, 9),
+               [("ident", 1, 1), ("=", 1, 3), ("const_string", 1, 9), ("print", 2, 1),
+                ("ident", 2, 7), (";", 2, 8)],
+               "[['a', (1, 1), (2, 7)]]"),
+    # primeiro caractere depois de uma quebra
+    "depois_da_quebra": ("x = 1;\ny = 2;", 4, 7, (2, 1),
+                         [("ident", 1, 1), ("=", 1, 3), ("const_inteiro", 1, 5), (";", 1, 6),
+                          ("ident", 2, 1), ("=", 2, 3), ("const_inteiro", 2, 5), (";", 2, 6)],
+                         "[['x', (1, 1)], ['y', (2, 1)]]"),
+    # última posição de um arquivo sem '\n' no final
+    "ultima": ("print x;\nprint y", 4, 15, (2, 7),
+               [("print", 1, 1), ("ident", 1, 7), (";", 1, 8), ("print", 2, 1), ("ident", 2, 7)],
+               "[['x', (1, 7)], ['y', (2, 7)]]"),
+    # const_string fica na posição logo após as aspas de fechamento; a
+    # quebra dentro da string não conta como linha
+    "string": ('b = "xy";\nz = "q\nr";', 6, 19, (2, 10),
+               [("ident", 1, 1), ("=", 1, 3), ("const_string", 1, 9), (";", 1, 9),
+                ("ident", 2, 1), ("=", 2, 3), ("const_string", 2, 10), (";", 2, 10)],
+               "[['b', (1, 1)], ['z', (2, 1)]]"),
+}
+
+
+@pytest.mark.parametrize("motor", ["regex", "afd"])
+@pytest.mark.parametrize("caso", sorted(LINHAS_ORIGINAIS))
+def test_linha_coluna_igual_ao_lexico_original(caso, motor):
+    texto, k, pos, esperado, original, tabela_original = LINHAS_ORIGINAIS[caso]
+    tokens, tabela = analisar(texto, motor=motor)
+    assert [(t.tipo, t.l, t.c) for t in tokens] == original
+    assert repr(tabela) == tabela_original
+
+    assert tokens[k].pos == pos
+    assert tabela.linhas.linha_coluna(pos) == tokens[k].linha_coluna() == esperado
+    assert (TokenStream(tokens)[k].l, TokenStream(tokens)[k].c) == esperado
+    # lido em blocos pequenos, o índice de linhas é o mesmo
+    em_blocos, _ = analisar_arquivo(io.StringIO(texto), tamanho_bloco=3)
+    assert [(t.tipo, t.l, t.c) for t in em_blocos] == original
+
+
+def test_casos_de_linha_coluna_cobrem_as_bordas():
+    textos = {caso: (dados[0], dados[2]) for caso, dados in LINHAS_ORIGINAIS.items()}
+    texto, pos = textos["inicio"]
+    assert pos == 0
+    texto, pos = textos["quebra"]
+    assert texto[pos] == "\n" and texto[pos - 1] == '"'
+    texto, pos = textos["depois_da_quebra"]
+    assert texto[pos - 1] == "\n"
+    texto, pos = textos["ultima"]
+    assert pos == len(texto) - 1 and not texto.endswith("\n")
+    texto, pos = textos["string"]
+    assert texto[pos - 1] == '"' and "\n" in texto[texto.rindex('"', 0, pos - 1):pos]
+
+
+# ---------------------------------------------------------------------
+# Compilação em lote
+# ---------------------------------------------------------------------
+
+# Programas do lote: todos usam 'x' (e rótulos, temporários); o último
+# para com erro semântico depois de já ter registrado mensagens
+LOTE = {
+    "a.conv": cadeia_else_if(3),
+    "b.conv": cadeia_else_if(5),
+    "c.conv": SOMBREAMENTO,
+    "d.conv": CHAMADA_ADIANTE,
+    "e.conv": "def main(){\n    int x;\n    x = 1;\n    print x;\n    x = y + 1;\n}\n",
+}
+
+
+def compilar_sozinho(arquivo):
+    """Registros JSON e mensagem de erro (ou None) de 'arquivo' compilado sozinho."""
+    processo = subprocess.run(
+        [sys.executable, str(PASTA / "main.py"), str(arquivo), "--saida", "jsonl"],
+        capture_output=True, text=True, encoding="utf-8",
+    )
+    linhas = processo.stdout.splitlines()
+    erro = None
+    if processo.returncode != 0:
+        assert linhas[-2] == "Erro semântico na compilação:"
+        linhas, erro = linhas[:-2], linhas[-1]
+    return [json.loads(linha) for linha in linhas], erro
+
+
+def test_lote_igual_a_arquivos_isolados(tmp_path):
+    pasta = tmp_path / "lote"
+    pasta.mkdir()
+    for nome, texto in LOTE.items():
+        (pasta / nome).write_text(texto, encoding="utf-8")
+    relatorio = tmp_path / "relatorio.json"
+    processo = subprocess.run(
+        [sys.executable, str(PASTA / "main.py"), "--batch", str(pasta), "-j", "2",
+         "--saida", "jsonl", "--relatorio", str(relatorio)],
+        capture_output=True, text=True, encoding="utf-8",
+    )
+    assert processo.returncode == 1      # um arquivo com erro
+    resultados = json.loads(relatorio.read_text(encoding="utf-8"))["resultados"]
+    assert [Path(r["arquivo"]).name for r in resultados] == sorted(LOTE)
+
+    for r in resultados:
+        registros, erro = compilar_sozinho(r["arquivo"])
+        # mesmas mensagens, árvores e código que compilando o arquivo sozinho
+        assert [json.loads(linha) for linha in r["saida"].splitlines()] == registros
+        if erro is None:
+            assert r["sucesso"] and r["erro"] is None
+            codigo = next(reg["linhas"] for reg in registros if reg["tipo"] == "codigo")
+            # temporários e rótulos recomeçam em t0 e L0 em cada arquivo
+            assert codigo[0].startswith("t0 = ")
+            rotulos = [linha for linha in codigo if linha[:1] == "L" and linha.endswith(":")]
+            assert rotulos == [] or rotulos[0] == "L0:"
+        else:
+            assert Path(r["arquivo"]).name == "e.conv"
+            assert r["erro"] == {"tipo": "semântico", "mensagem": erro}
+            assert "'y' não declarado" in erro
+
+
+# ---------------------------------------------------------------------
+# Linha de comando
+# ---------------------------------------------------------------------
+
+def test_ast_rejeita_opcoes_do_caminho_por_tokens(tmp_path):
+    arquivo = tmp_path / "programa.conv"
+    arquivo.write_text(cadeia_else_if(2), encoding="utf-8")
+    for opcoes in (["--fundido"], ["--estatisticas"], ["--paralelo", "2"],
+                   ["--cache", str(tmp_path / "cache")]):
+        processo = subprocess.run(
+            [sys.executable, str(PASTA / "main.py"), str(arquivo), "--ast", *opcoes],
+            capture_output=True, text=True, encoding="utf-8",
+        )
+        assert processo.returncode == 2
+        assert f"--ast não pode ser usada com {opcoes[0]}" in processo.stderr